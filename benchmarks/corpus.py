@@ -0,0 +1,116 @@
+"""
+Gerador de corpus sintético para os benchmarks.
+
+Os documentos imitam o formato dos textos retornados pela api do TCU: html com
+tags e entidades, tabulações, quebras de linha, espaços não separáveis (\\xa0),
+aspas simples e CPFs no formato 000.000.000-00. Os tamanhos seguem uma
+distribuição log-normal com medianas próximas às dos campos reais (relatorio
+~24KB, voto ~10KB, acordao ~3KB, sumario ~600B). Com a mesma semente o corpus
+gerado é sempre o mesmo.
+
+Para usar textos reais, `load_corpus` lê uma amostra do banco de coleta.
+"""
+import math
+import random
+import sqlite3
+from pathlib import Path
+from typing import Dict, List
+
+from scripts.storage import detect_layout, document_source
+
+YEARS = list(range(1992, 2020))
+# mediana do tamanho (bytes) e desvio do log do tamanho por campo
+FIELD_SIZES = {
+    "sumario": (600, 0.6),
+    "acordao": (3000, 0.8),
+    "relatorio": (24000, 1.0),
+    "voto": (10000, 0.9),
+}
+WORDS = (
+    "tribunal contas união acórdão relator processo licitação contrato "
+    "prestação tomada especial recurso reconsideração responsável débito multa "
+    "irregularidade convênio município secretaria execução fiscalização auditoria "
+    "ministro plenário câmara unidade técnica representação denúncia"
+).split()
+TAGS = ("p", "b", "i", "span", "strong", "em")
+ENTITIES = ("&nbsp;", "&amp;", "&quot;", "&#186;", "&#xaa;")
+RELATORES = ("BENJAMIN ZYMLER", "WALTON ALENCAR RODRIGUES", "AUGUSTO NARDES", "ANA ARRAES")
+UNIDADES = ("SECEX-SP", "SECEX-RJ", "SEMAG", "SELOG", "SERUR")
+COLEGIADOS = ("Plenário", "Primeira Câmara", "Segunda Câmara")
+
+
+def random_cpf(rng: random.Random) -> str:
+    digits = "".join(str(rng.randint(0, 9)) for _ in range(11))
+    return f"{digits[:3]}.{digits[3:6]}.{digits[6:9]}-{digits[9:]}"
+
+
+def random_text(rng: random.Random, size: int, html: bool = True) -> str:
+    """
+    Texto com aproximadamente `size` caracteres.
+    """
+    parts = []
+    length = 0
+    while length < size:
+        roll = rng.random()
+        if roll < 0.002:
+            token = random_cpf(rng)
+        elif html and roll < 0.03:
+            tag = rng.choice(TAGS)
+            token = f"<{tag}>{rng.choice(WORDS)}</{tag}>"
+        elif html and roll < 0.04:
+            token = rng.choice(ENTITIES)
+        elif roll < 0.05:
+            token = rng.choice(("\t", "\n", "\xa0", "'"))
+        else:
+            token = rng.choice(WORDS)
+        parts.append(token)
+        length += len(token) + 1
+    return " ".join(parts)
+
+
+def field_size(rng: random.Random, field: str) -> int:
+    median, sigma = FIELD_SIZES[field]
+    return max(50, int(rng.lognormvariate(math.log(median), sigma)))
+
+
+def generate_document(rng: random.Random, index: int) -> Dict[str, str]:
+    year = rng.choice(YEARS)
+    urn = f"urn:lex:br:tribunal.contas.uniao:acordao:{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d};{index}"
+    document = {
+        "urn": urn,
+        "url_lexml": f"https://www.lexml.gov.br/urn/{urn}",
+        "urn_year": year,
+        "numero_acordao": f"{index}/{year}",
+        "relator": rng.choice(RELATORES),
+        "processo": f"{rng.randint(1000, 99999):06d}/{year}-{rng.randint(0, 9)}",
+        "data_sessao": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{year}",
+        # derivado do índice, sem consumir o gerador, para não mudar o restante do corpus
+        "numero_ata": f"{index % 50}/{year}-{COLEGIADOS[index % len(COLEGIADOS)]}",
+        "unidade_tecnica": rng.choice(UNIDADES),
+        "interessado_reponsavel_recorrente": f"Fulano de Tal (CPF {random_cpf(rng)})",
+        "repr_legal": f"Beltrano (CPF {random_cpf(rng)}), OAB {rng.randint(1000, 99999)}",
+    }
+    for field in FIELD_SIZES:
+        document[field] = random_text(rng, field_size(rng, field))
+    return document
+
+
+def generate_corpus(n_documents: int = 200, seed: int = 42) -> List[Dict[str, str]]:
+    rng = random.Random(seed)
+    return [generate_document(rng, index) for index in range(n_documents)]
+
+
+def load_corpus(strcnx: str, n_documents: int = 200) -> List[Dict[str, str]]:
+    """
+    Amostra de documentos baixados do banco de coleta (layout single ou split).
+    """
+    conn = sqlite3.connect(f"file:{Path(strcnx).resolve().as_posix()}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    rows = cursor.execute(
+        f"SELECT * FROM {document_source(detect_layout(cursor))} "
+        "WHERE was_downloaded = 1 ORDER BY id LIMIT ?",
+        (n_documents,),
+    ).fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
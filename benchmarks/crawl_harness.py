@@ -0,0 +1,297 @@
+"""
+Roda o ApiSpider e o pipeline reais contra o servidor local de
+benchmarks/standin_server.py e mede a vazão sustentada da coleta.
+
+O harness cria um banco de coleta temporário com `--documents` urns pendentes
+(url_lexml apontando para o servidor local) e, com --downloaded-rate, uma
+fração delas repetida como já baixada (coleta sobreposta) e, com --alias-rate,
+uma fração cujo documento já foi gravado sob outra urn (mesma chave da api em
+url_tcu), sobe o servidor em um processo separado e executa o spider com
+DB_PATH e TCU_API_URL sobrescritos. Nenhuma requisição sai da máquina.
+
+Relatório:
+    documentos/s sustentados (entre 10% e 90% dos itens gravados) e totais,
+    pico de memória (RSS) do processo do scrapy,
+    tempo de escrita e de commit no banco (métricas de scripts/metrics.py),
+    respostas por status, retries e documentos gravados no banco.
+
+Uso:
+    python -m benchmarks.crawl_harness --documents 2000 --concurrency 16
+        [--latency-ms 50 --error-rate 0.01 --throttle-rate 0.02 --payload-scale 1.0]
+        [--layout single] [--downloaded-rate 0.2] [--alias-rate 0.1]
+        [--output benchmarks/results/crawl.json]
+        [--set LARGE_FIELD_THRESHOLD=100000 --set MEMORY_INFLIGHT_BUDGET=50000000]
+"""
+import argparse
+import json
+import os
+import resource
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.standin_server import API_PATH, TCU_LINK
+from scripts.storage import create_tables, insert_documents
+
+ROOT_PATH = Path(__file__).resolve().parents[1]
+SCRAPY_PROJECT_PATH = ROOT_PATH / "crawlers" / "projects" / "api_acordaos" / "apiacordao"
+YEARS = list(range(1992, 2020))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"O servidor local não respondeu na porta {port}.")
+
+
+def create_crawl_db(
+    path: Path,
+    documents: int,
+    base_url: str,
+    layout: str,
+    downloaded_rate: float = 0.0,
+    alias_rate: float = 0.0,
+) -> None:
+    conn = sqlite3.connect(str(path))
+    cursor = conn.cursor()
+    create_tables(cursor, layout)
+    rows = []
+    downloaded = int(documents * downloaded_rate)
+    aliases = int(documents * alias_rate)
+    for index in range(documents):
+        year = YEARS[index % len(YEARS)]
+        urn = f"urn:lex:br:tribunal.contas.uniao:acordao:{year}-01-01;{index}"
+        rows.append((urn, f"{base_url}/urn/{urn}", year, 0, None))
+        if index < downloaded:
+            # a mesma urn já gravada por outra coleta
+            rows.append((urn, f"{base_url}/urn/{urn}", year, 1, None))
+        elif index < downloaded + aliases:
+            # o mesmo documento já gravado sob outra urn: mesma chave da api
+            base_id = str(zlib.crc32(urn.encode("utf8")) % 10 ** 7)
+            alias = f"urn:lex:br:tribunal.contas.uniao:acordao:{year}-01-02;{index}"
+            rows.append((alias, f"{base_url}/urn/{alias}", year, 1, TCU_LINK.format(base_id=base_id)))
+    insert_documents(
+        cursor, layout, ["urn", "url_lexml", "urn_year", "was_downloaded", "url_tcu"], rows
+    )
+    conn.commit()
+    conn.close()
+
+
+def sustained_rate(timestamps: List[float], low: float = 0.1, high: float = 0.9) -> float:
+    """
+    Documentos por segundo entre os percentis `low` e `high` dos itens gravados,
+    excluindo a partida e a cauda da coleta.
+    """
+    if len(timestamps) < 10:
+        return 0.0
+    first = int(len(timestamps) * low)
+    last = int(len(timestamps) * high)
+    elapsed = timestamps[last] - timestamps[first]
+    return (last - first) / elapsed if elapsed > 0 else 0.0
+
+
+def run_spider(settings_overrides: Dict) -> Dict:
+    """
+    Executa o ApiSpider no processo atual e retorna as medições.
+    """
+    sys.path.insert(0, str(SCRAPY_PROJECT_PATH))
+    os.environ["SCRAPY_SETTINGS_MODULE"] = "apiacordao.settings"
+    from scrapy import signals
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    from scripts.metrics import RESPONSES, STAGE_SECONDS
+
+    settings = get_project_settings()
+    settings.setdict(settings_overrides, priority="cmdline")
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler("api")
+    timestamps = []
+    window = {}
+
+    # o scrapy guarda referências fracas aos receptores: as funções precisam
+    # continuar referenciadas durante a coleta
+    def item_scraped(item, response, spider):
+        timestamps.append(time.perf_counter())
+
+    def spider_opened(spider):
+        window["inicio"] = time.perf_counter()
+
+    def spider_closed(spider):
+        window["fim"] = time.perf_counter()
+
+    crawler.signals.connect(item_scraped, signal=signals.item_scraped)
+    crawler.signals.connect(spider_opened, signal=signals.spider_opened)
+    crawler.signals.connect(spider_closed, signal=signals.spider_closed)
+    process.crawl(crawler)
+    process.start()
+    elapsed = window["fim"] - window["inicio"]
+
+    stats = crawler.stats.get_stats()
+    stage_seconds = {}
+    for stage in ("lexml_fetch", "api_fetch", "parse", "db_write", "db_commit"):
+        state = STAGE_SECONDS.values.get(("api", stage))
+        if state:
+            stage_seconds[stage] = {"total_s": state[1], "count": state[2]}
+    responses = {}
+    for (crawler_name, stage, status), count in RESPONSES.values.items():
+        responses[f"{stage}:{status}"] = count
+    # inclui as respostas consumidas pelo RetryMiddleware (429, 500), que não chegam ao spider
+    prefix = "downloader/response_status_count/"
+    downloader_responses = {
+        key[len(prefix):]: value for key, value in stats.items() if key.startswith(prefix)
+    }
+    return {
+        "tempo_total_s": elapsed,
+        "itens": len(timestamps),
+        "docs_por_s_sustentado": sustained_rate(timestamps),
+        "docs_por_s_total": len(timestamps) / elapsed if elapsed else 0.0,
+        # ru_maxrss em KB no Linux
+        "pico_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "etapas": stage_seconds,
+        "respostas": responses,
+        "respostas_downloader": downloader_responses,
+        "retries": stats.get("retry/count", 0),
+        "retries_esgotados": stats.get("retry/max_reached", 0),
+        "pausas_por_memoria": stats.get("inflight_budget/pauses", 0),
+        "descartados_ja_baixados": stats.get("downloaded_filter/filtered", 0),
+        "descartados_chave_tcu": stats.get("downloaded_filter/filtered_tcu_key", 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Harness de carga da coleta com servidor local.")
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--payload-scale", type=float, default=1.0)
+    parser.add_argument("--layout", default="single", choices=("single", "split"))
+    parser.add_argument(
+        "--downloaded-rate", type=float, default=0.0,
+        help="fração das urns pendentes que também aparecem como já baixadas",
+    )
+    parser.add_argument(
+        "--alias-rate", type=float, default=0.0,
+        help="fração das urns pendentes cujo documento já foi baixado sob outra urn",
+    )
+    parser.add_argument(
+        "--profile-rate", type=float, default=0.0, help="ativa o CallbackProfiling com essa taxa"
+    )
+    parser.add_argument(
+        "--set", action="append", default=[], metavar="NOME=VALOR",
+        help="sobrescreve uma configuração do scrapy (pode ser repetido)",
+    )
+    parser.add_argument("--output", default=None, help="grava o relatório em json")
+    args = parser.parse_args()
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    tmp_dir = Path(tempfile.mkdtemp(prefix="crawl_harness_"))
+    db_path = tmp_dir / "acordaos-download.db"
+    create_crawl_db(
+        db_path, args.documents, base_url, args.layout, args.downloaded_rate, args.alias_rate
+    )
+
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.standin_server",
+            "--port", str(port),
+            "--latency-ms", str(args.latency_ms),
+            "--error-rate", str(args.error_rate),
+            "--throttle-rate", str(args.throttle_rate),
+            "--payload-scale", str(args.payload_scale),
+        ],
+        cwd=str(ROOT_PATH),
+        stdout=subprocess.DEVNULL,
+    )
+    settings_overrides = {}
+    if args.profile_rate:
+        settings_overrides.update(
+            {
+                "PROFILE_ENABLED": True,
+                "PROFILE_SAMPLE_RATE": args.profile_rate,
+                "PROFILE_REPORT_DIR": str(tmp_dir / "profile"),
+            }
+        )
+    for assignment in args.set:
+        name, _, value = assignment.partition("=")
+        settings_overrides[name] = value
+    try:
+        wait_for_port(port)
+        report = run_spider(
+            {
+                **settings_overrides,
+                "DB_PATH": str(db_path),
+                "DB_SHARDS_DIR": None,
+                "TCU_API_URL": f"{base_url}{API_PATH}",
+                "CONCURRENT_REQUESTS": args.concurrency,
+                "CONCURRENT_REQUESTS_PER_DOMAIN": args.concurrency,
+                "LOG_LEVEL": "WARNING",
+                "TELNETCONSOLE_ENABLED": False,
+                # ativa a extensão de métricas (latência por etapa e respostas por status)
+                "METRICS_TEXTFILE": str(tmp_dir / "apiacordao.prom"),
+            }
+        )
+    finally:
+        server.terminate()
+        server.wait()
+
+    conn = sqlite3.connect(str(db_path))
+    report["gravados_no_banco"] = conn.execute(
+        "SELECT count(DISTINCT urn) FROM download_acordaos WHERE was_downloaded = 1"
+    ).fetchone()[0]
+    conn.close()
+    report["parametros"] = vars(args)
+
+    print(
+        f"{report['itens']} documentos em {report['tempo_total_s']:.1f}s: "
+        f"{report['docs_por_s_sustentado']:.1f} docs/s sustentado, "
+        f"{report['docs_por_s_total']:.1f} docs/s total"
+    )
+    print(f"pico de memória: {report['pico_rss_mb']:.0f}MB")
+    for stage, values in report["etapas"].items():
+        mean_ms = values["total_s"] / values["count"] * 1000 if values["count"] else 0
+        print(f"  {stage:<12} {values['total_s']:8.2f}s em {values['count']} chamadas ({mean_ms:.2f} ms)")
+    print(f"respostas ao spider: {report['respostas']}")
+    print(f"respostas no downloader: {report['respostas_downloader']}")
+    print(f"retries: {report['retries']} (esgotados: {report['retries_esgotados']})")
+    if report["descartados_ja_baixados"]:
+        print(f"requisições descartadas (já baixadas): {report['descartados_ja_baixados']}")
+    if report["descartados_chave_tcu"]:
+        print(
+            "requisições à api descartadas (documento já baixado sob outra urn): "
+            f"{report['descartados_chave_tcu']}"
+        )
+    if report["pausas_por_memoria"]:
+        print(f"pausas por orçamento de memória: {report['pausas_por_memoria']}")
+    print(f"gravados no banco: {report['gravados_no_banco']} de {args.documents}")
+    if args.profile_rate:
+        print(f"relatório de profiling: {tmp_dir / 'profile' / 'report.txt'}")
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "w", encoding="utf8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
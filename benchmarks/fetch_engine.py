@@ -0,0 +1,150 @@
+"""
+Mede o motor asyncio de scripts/fetch_engine.py contra o servidor local de
+benchmarks/standin_server.py e, com --compare-scrapy, roda o
+benchmarks/crawl_harness.py (ApiSpider) com os mesmos parâmetros.
+
+O banco temporário tem `--documents` urns com url_tcu já preenchido (a chave
+que o LexML do servidor local devolveria), de forma que o motor só consulta a
+api; o ApiSpider continua visitando o LexML e o robots.txt, como em produção.
+
+Uso:
+    python -m benchmarks.fetch_engine --documents 2000 --concurrency 16
+        [--latency-ms 50 --error-rate 0.01 --throttle-rate 0.02 --payload-scale 1.0]
+        [--rate 0] [--batch-size 50] [--layout single] [--compare-scrapy]
+        [--output benchmarks/results/fetch_engine.json]
+"""
+import argparse
+import asyncio
+import json
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import zlib
+from pathlib import Path
+
+from benchmarks.crawl_harness import ROOT_PATH, YEARS, free_port, wait_for_port
+from benchmarks.standin_server import API_PATH, TCU_LINK
+from scripts.fetch_engine import BatchWriter, FetchEngine, tasks_from_db
+from scripts.storage import create_tables, insert_documents
+
+
+def create_refresh_db(path: Path, documents: int, layout: str) -> None:
+    conn = sqlite3.connect(str(path))
+    cursor = conn.cursor()
+    create_tables(cursor, layout)
+    rows = []
+    for index in range(documents):
+        year = YEARS[index % len(YEARS)]
+        urn = f"urn:lex:br:tribunal.contas.uniao:acordao:{year}-01-01;{index}"
+        # mesma chave que a página do LexML do servidor local aponta
+        base_id = str(zlib.crc32(urn.encode("utf8")) % 10 ** 7)
+        rows.append((urn, year, 0, TCU_LINK.format(base_id=base_id)))
+    insert_documents(cursor, layout, ["urn", "urn_year", "was_downloaded", "url_tcu"], rows)
+    conn.commit()
+    conn.close()
+
+
+def run_scrapy(args) -> dict:
+    with tempfile.TemporaryDirectory(prefix="fetch_engine_scrapy_") as tmp_dir:
+        output = Path(tmp_dir) / "crawl.json"
+        subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.crawl_harness",
+                "--documents", str(args.documents),
+                "--concurrency", str(args.concurrency),
+                "--latency-ms", str(args.latency_ms),
+                "--error-rate", str(args.error_rate),
+                "--throttle-rate", str(args.throttle_rate),
+                "--payload-scale", str(args.payload_scale),
+                "--layout", args.layout,
+                "--output", str(output),
+            ],
+            cwd=str(ROOT_PATH),
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        with open(output, encoding="utf8") as f:
+            return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do motor asyncio de coleta.")
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--payload-scale", type=float, default=1.0)
+    parser.add_argument("--rate", type=float, default=0.0, help="requisições/s do motor (0 sem limite)")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--layout", default="single", choices=("single", "split"))
+    parser.add_argument("--compare-scrapy", action="store_true")
+    parser.add_argument("--output", default=None, help="grava o relatório em json")
+    args = parser.parse_args()
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    tmp_dir = Path(tempfile.mkdtemp(prefix="fetch_engine_"))
+    db_path = tmp_dir / "acordaos-download.db"
+    create_refresh_db(db_path, args.documents, args.layout)
+
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.standin_server",
+            "--port", str(port),
+            "--latency-ms", str(args.latency_ms),
+            "--error-rate", str(args.error_rate),
+            "--throttle-rate", str(args.throttle_rate),
+            "--payload-scale", str(args.payload_scale),
+        ],
+        cwd=str(ROOT_PATH),
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port)
+        tasks = tasks_from_db(str(db_path))
+        writer = BatchWriter(str(db_path), batch_size=args.batch_size)
+        # backoff curto: o servidor local pede Retry-After de 1s nos 429
+        engine = FetchEngine(
+            writer, f"{base_url}{API_PATH}", args.concurrency, args.rate, args.concurrency, backoff=0.1
+        )
+        report = asyncio.run(engine.run(tasks))
+    finally:
+        server.terminate()
+        server.wait()
+    report["pico_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    conn = sqlite3.connect(str(db_path))
+    report["gravados_no_banco"] = conn.execute(
+        "SELECT count(*) FROM download_acordaos WHERE was_downloaded = 1"
+    ).fetchone()[0]
+    conn.close()
+
+    print(
+        f"motor asyncio: {report['gravados']} documentos em {report['tempo_total_s']:.1f}s "
+        f"({report['docs_por_s']:.1f} docs/s), {report['conexoes']} conexões, "
+        f"gravação {report['gravacao_s']:.2f}s em {report['lotes']} lotes, "
+        f"pico de memória {report['pico_rss_mb']:.0f}MB"
+    )
+    print(f"  respostas: {report['respostas']}, retentativas: {report.get('retentativas', 0)}")
+    print(f"  gravados no banco: {report['gravados_no_banco']} de {args.documents}")
+    result = {"motor": report, "parametros": vars(args)}
+    if args.compare_scrapy:
+        scrapy_report = run_scrapy(args)
+        result["scrapy"] = scrapy_report
+        print(
+            f"scrapy (ApiSpider): {scrapy_report['itens']} documentos em "
+            f"{scrapy_report['tempo_total_s']:.1f}s ({scrapy_report['docs_por_s_total']:.1f} docs/s), "
+            f"pico de memória {scrapy_report['pico_rss_mb']:.0f}MB"
+        )
+        print(f"  respostas: {scrapy_report['respostas_downloader']}")
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "w", encoding="utf8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
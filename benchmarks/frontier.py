@@ -0,0 +1,119 @@
+"""
+Benchmark da consulta da fronteira de coleta (linhas com was_downloaded = 0).
+
+Compara o plano antigo (índice urnyear / varredura da tabela) com o índice
+parcial pendingyear. Sem --db, gera um banco sintético com textos do tamanho
+de relatorio/voto; com --db, usa um banco existente (o índice pendingyear é
+criado se não existir, nenhum outro dado é alterado).
+
+Uso:
+    python -m benchmarks.frontier --rows 200000 --text-kb 8
+    python -m benchmarks.frontier --db ./db/acordaos-download.db
+"""
+import argparse
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from scripts.schema import DOWNLOAD_INDEXES, DOWNLOAD_TABLE, create_indexes
+
+YEARS = list(range(1992, 2020))
+
+QUERIES = {
+    "fronteira por ano": (
+        "SELECT url_lexml from download_acordaos INDEXED BY urnyear "
+        "where urn_year = ? and was_downloaded = 0",
+        "SELECT url_lexml from download_acordaos where urn_year = ? and was_downloaded = 0",
+    ),
+    "fronteira completa": (
+        "SELECT url_lexml from download_acordaos NOT INDEXED where was_downloaded = 0",
+        "SELECT url_lexml from download_acordaos where was_downloaded = 0",
+    ),
+}
+
+
+def create_synthetic_db(path: Path, rows: int, text_kb: int, pending: float, seed: int) -> None:
+    rng = random.Random(seed)
+    conn = sqlite3.connect(str(path))
+    cursor = conn.cursor()
+    cursor.execute(DOWNLOAD_TABLE)
+    create_indexes(cursor, DOWNLOAD_INDEXES, ["urnindex", "urnyear"])
+    words = ["tribunal", "contas", "uniao", "acordao", "relator", "processo", "licitacao", "contrato"]
+    text = " ".join(rng.choice(words) for _ in range(text_kb * 128))
+    batch = []
+    for i in range(rows):
+        year = rng.choice(YEARS)
+        urn = f"urn:lex:br:tribunal.contas.uniao:acordao:{year}-01-01;{i}"
+        was_downloaded = 0 if rng.random() < pending else 1
+        batch.append(
+            (urn, f"https://www.lexml.gov.br/urn/{urn}", year, text, text, was_downloaded)
+        )
+        if len(batch) == 1000:
+            cursor.executemany(
+                "INSERT INTO download_acordaos (urn, url_lexml, urn_year, relatorio, voto, was_downloaded) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                batch,
+            )
+            batch = []
+    if batch:
+        cursor.executemany(
+            "INSERT INTO download_acordaos (urn, url_lexml, urn_year, relatorio, voto, was_downloaded) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            batch,
+        )
+    conn.commit()
+    conn.close()
+
+
+def time_query(cursor: sqlite3.Cursor, query_string: str, params: tuple, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(query_string, params).fetchall()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da fronteira de coleta.")
+    parser.add_argument("--db", help="banco existente (padrão: banco sintético)")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--text-kb", type=int, default=4)
+    parser.add_argument("--pending", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmpdir = None
+    if args.db:
+        path = Path(args.db)
+    else:
+        tmpdir = tempfile.TemporaryDirectory()
+        path = Path(tmpdir.name) / "frontier.db"
+        print(f"Gerando banco sintético com {args.rows} linhas de {args.text_kb}KB...")
+        create_synthetic_db(path, args.rows, args.text_kb, args.pending, args.seed)
+
+    conn = sqlite3.connect(str(path))
+    cursor = conn.cursor()
+    create_indexes(cursor, DOWNLOAD_INDEXES, ["pendingyear"])
+    cursor.execute("ANALYZE")
+    conn.commit()
+
+    year = cursor.execute("SELECT urn_year FROM download_acordaos GROUP BY urn_year ORDER BY count(*) DESC LIMIT 1").fetchone()[0]
+    for name, (before, after) in QUERIES.items():
+        params = (year,) if "?" in before else ()
+        before_time = time_query(cursor, before, params, args.repeat)
+        after_time = time_query(cursor, after, params, args.repeat)
+        plan = cursor.execute(f"EXPLAIN QUERY PLAN {after}", params).fetchall()[-1][-1]
+        print(f"{name}: antes {before_time * 1000:.2f} ms, depois {after_time * 1000:.2f} ms "
+              f"({before_time / after_time:.1f}x) [{plan}]")
+    conn.close()
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Teste de carga do serviço de consulta (scripts.service).
+
+Abre `--concurrency` conexões keep-alive e dispara, durante `--duration`
+segundos, uma mistura de buscas por urn, por numero_acordao e páginas da
+listagem. Ao final mostra a vazão (req/s) e as latências p50/p95/p99.
+
+Uso:
+    python -m scripts.service --db ./db/tcu-acordaos.db --port 8080 &
+    python -m benchmarks.load_service --db ./db/tcu-acordaos.db --port 8080
+"""
+import argparse
+import asyncio
+import random
+import sqlite3
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List, Tuple
+from urllib.parse import quote
+
+
+def sample_targets(strcnx: str, size: int, seed: int) -> List[str]:
+    """
+    Sorteia urns e números de acórdão existentes para montar as requisições.
+    """
+    conn = sqlite3.connect(f"file:{Path(strcnx).resolve().as_posix()}?mode=ro", uri=True)
+    rows = conn.execute(
+        "SELECT id, urn, numero_acordao FROM acordaos ORDER BY random() LIMIT ?", (size,)
+    ).fetchall()
+    conn.close()
+    rng = random.Random(seed)
+    targets = []
+    for id_, urn, numero in rows:
+        targets.append(f"/acordao?urn={quote(urn)}")
+        if numero:
+            targets.append(f"/acordao?numero_acordao={quote(numero)}&fields=urn,numero_acordao,relator")
+        targets.append(f"/acordaos?after={max(id_ - 1, 0)}&limit=50")
+    rng.shuffle(targets)
+    return targets
+
+
+async def fetch(reader, writer, host: str, target: str) -> int:
+    writer.write(
+        f"GET {target} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode("latin1")
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    status = int(status_line.split()[1])
+    content_length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin1").partition(":")
+        if name.lower() == "content-length":
+            content_length = int(value)
+    await reader.readexactly(content_length)
+    return status
+
+
+async def worker(host: str, port: int, targets: List[str], deadline: float, offset: int):
+    latencies = []
+    statuses = Counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    index = offset
+    try:
+        while time.perf_counter() < deadline:
+            target = targets[index % len(targets)]
+            index += 1
+            start = time.perf_counter()
+            status = await fetch(reader, writer, host, target)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+    finally:
+        writer.close()
+    return latencies, statuses
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def run(args) -> Tuple[List[float], Counter, float]:
+    targets = sample_targets(args.db, args.sample, args.seed)
+    if not targets:
+        raise ValueError("O banco não possui acórdãos.")
+    start = time.perf_counter()
+    deadline = start + args.duration
+    results = await asyncio.gather(
+        *[
+            worker(args.host, args.port, targets, deadline, i * len(targets) // args.concurrency)
+            for i in range(args.concurrency)
+        ]
+    )
+    elapsed = time.perf_counter() - start
+    latencies = [lat for worker_lat, _ in results for lat in worker_lat]
+    statuses = sum((worker_status for _, worker_status in results), Counter())
+    return latencies, statuses, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do serviço de consulta.")
+    parser.add_argument("--db", default="./db/tcu-acordaos.db")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--sample", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    latencies, statuses, elapsed = asyncio.run(run(args))
+    print(f"requisições: {len(latencies)} em {elapsed:.1f}s ({len(latencies) / elapsed:.1f} req/s)")
+    print(f"status: {dict(statuses)}")
+    for pct in (50, 95, 99):
+        print(f"p{pct}: {percentile(latencies, pct) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Micro-benchmarks das funções mais chamadas na coleta e no tratamento dos dados.
+
+Cada caso roda sobre o corpus de benchmarks/corpus.py (sintético ou amostra do
+banco de coleta com --db). O tempo registrado é a mediana de `repeat` rodadas,
+cada uma com `number` chamadas calibradas para durar ~0,2s, dividido pelo
+número de chamadas.
+
+Uso:
+    python -m benchmarks.micro run [--output benchmarks/results/atual.json]
+        [--only mask_cnpj,search_for_urn] [--documents 200] [--db ./db/acordaos-download.db]
+    python -m benchmarks.micro compare benchmarks/results/baseline.json benchmarks/results/atual.json
+        [--threshold 0.1]
+
+O compare retorna código de saída 1 quando algum caso ficou mais lento que o
+limite (10% por padrão) em relação à referência.
+"""
+import argparse
+import json
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.corpus import generate_corpus, load_corpus
+
+ROOT_PATH = Path(__file__).resolve().parents[1]
+SCRAPY_PROJECT_PATH = ROOT_PATH / "crawlers" / "projects" / "api_acordaos" / "apiacordao"
+TEXT_FIELDS = ("sumario", "acordao", "relatorio", "voto", "interessado_reponsavel_recorrente", "repr_legal")
+
+
+def bench_clean_text(corpus: List[Dict]) -> Callable:
+    sys.path.insert(0, str(SCRAPY_PROJECT_PATH))
+    from apiacordao.spiders.api import ApiSpider
+
+    spider = ApiSpider()
+    texts = [doc[field] for doc in corpus for field in ("relatorio", "voto")]
+
+    def run():
+        for text in texts:
+            spider.clean_text(text)
+
+    return run
+
+
+def bench_remove_tags_html(corpus: List[Dict]) -> Callable:
+    sys.path.insert(0, str(SCRAPY_PROJECT_PATH))
+    from apiacordao.spiders.api import ApiSpider
+
+    spider = ApiSpider()
+    texts = [doc[field] for doc in corpus for field in ("relatorio", "voto")]
+
+    def run():
+        for text in texts:
+            spider.remove_tags_html(text)
+
+    return run
+
+
+def bench_mask_cnpj(corpus: List[Dict]) -> Callable:
+    from scripts.core import mask_cnpj
+
+    texts = [doc[field] for doc in corpus for field in TEXT_FIELDS]
+
+    def run():
+        for text in texts:
+            mask_cnpj(text)
+
+    return run
+
+
+def bench_get_urn(corpus: List[Dict]) -> Callable:
+    import pandas as pd
+    from scripts.funcs import get_urn
+
+    df = pd.DataFrame(
+        {"urn": [doc["urn"] for doc in corpus], "url": [doc["url_lexml"] for doc in corpus]}
+    )
+
+    def run():
+        get_urn("tribunal.contas.uniao:acordao", df)
+
+    return run
+
+
+def bench_search_for_urn(corpus: List[Dict]) -> Callable:
+    from scripts.core import search_for_urn
+
+    messages = [f"Finalizado a coleta do link {doc['url_lexml']}." for doc in corpus]
+
+    def run():
+        for message in messages:
+            search_for_urn(message)
+
+    return run
+
+
+def bench_insert_into_db(corpus: List[Dict]) -> Callable:
+    from scripts.core import insert_into_db
+    from scripts.schema import DOWNLOAD_TABLE
+
+    cols_names = ["urn", "url_lexml", "urn_year", "relatorio", "voto"]
+    data = [tuple(doc[col] for col in cols_names) for doc in corpus]
+
+    def run():
+        conn = sqlite3.connect(":memory:")
+        cursor = conn.cursor()
+        cursor.execute(DOWNLOAD_TABLE)
+        insert_into_db(data, "download_acordaos", cols_names, cursor)
+        conn.commit()
+        conn.close()
+
+    return run
+
+
+def bench_format_update_string(corpus: List[Dict]) -> Callable:
+    from scripts.crawler import AcordaosTCU
+
+    containers = [
+        {key: str(value) for key, value in doc.items() if key not in ("url_lexml", "urn_year")}
+        for doc in corpus
+    ]
+
+    def run():
+        for container in containers:
+            AcordaosTCU.format_update_string(container)
+
+    return run
+
+
+def bench_store_db(corpus: List[Dict]) -> Callable:
+    sys.path.insert(0, str(SCRAPY_PROJECT_PATH))
+    from apiacordao.pipelines import ApiacordaoPipeline
+    from scripts.storage import create_tables, insert_documents
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_store_db_")
+    db_path = str(Path(tmp_dir) / "acordaos-download.db")
+    conn = sqlite3.connect(db_path)
+    create_tables(conn.cursor(), "single")
+    insert_documents(
+        conn.cursor(),
+        "single",
+        ["urn", "url_lexml", "urn_year"],
+        [(doc["urn"], doc["url_lexml"], doc["urn_year"]) for doc in corpus],
+    )
+    conn.commit()
+    conn.close()
+    pipeline = ApiacordaoPipeline(db_path)
+    pipeline.crawler_name = "benchmark"
+    items = [dict(doc, was_downloaded=1, downloaded_at="2019-08-31") for doc in corpus]
+
+    def run():
+        for item in items:
+            pipeline.store_db(item)
+
+    return run
+
+
+BENCHMARKS = {
+    "clean_text": bench_clean_text,
+    "remove_tags_html": bench_remove_tags_html,
+    "mask_cnpj": bench_mask_cnpj,
+    "get_urn": bench_get_urn,
+    "search_for_urn": bench_search_for_urn,
+    "insert_into_db": bench_insert_into_db,
+    "format_update_string": bench_format_update_string,
+    "store_db": bench_store_db,
+}
+
+
+def measure(func: Callable, repeat: int, min_time: float = 0.2) -> Tuple[float, float, int]:
+    """
+    Retorna mediana e mínimo por chamada (segundos) e o número de chamadas por rodada.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1000:
+            break
+        number = min(1000, max(number * 2, int(number * min_time / max(elapsed, 1e-9))))
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return statistics.median(timings), min(timings), number
+
+
+def run_benchmarks(
+    names: List[str], corpus: List[Dict], repeat: int
+) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name in names:
+        func = BENCHMARKS[name](corpus)
+        median, best, number = measure(func, repeat)
+        results[name] = {"median_s": median, "min_s": best, "number": number, "repeat": repeat}
+        print(f"{name:<22} {median * 1000:10.3f} ms (mín. {best * 1000:.3f} ms, {number} chamadas)")
+    return results
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> int:
+    """
+    Imprime a variação de cada caso e retorna a quantidade de regressões.
+    """
+    regressions = 0
+    for name, result in current["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            print(f"{name:<22} sem referência")
+            continue
+        ratio = result["median_s"] / reference["median_s"]
+        status = "REGRESSÃO" if ratio > 1 + threshold else "ok"
+        regressions += status != "ok"
+        print(
+            f"{name:<22} {reference['median_s'] * 1000:10.3f} ms -> "
+            f"{result['median_s'] * 1000:10.3f} ms ({(ratio - 1) * 100:+6.1f}%) {status}"
+        )
+    if baseline.get("meta", {}).get("corpus") != current.get("meta", {}).get("corpus"):
+        print("Atenção: os resultados foram gerados com corpus diferentes.")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks das funções auxiliares.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run")
+    run_parser.add_argument("--output", default="benchmarks/results/atual.json")
+    run_parser.add_argument("--only", default=None, help="casos separados por vírgula")
+    run_parser.add_argument("--documents", type=int, default=200)
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--db", default=None, help="usa documentos do banco de coleta")
+    compare_parser = subparsers.add_parser("compare")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.baseline, encoding="utf8") as f:
+            baseline = json.load(f)
+        with open(args.current, encoding="utf8") as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        print(f"{regressions} regressão(ões) acima de {args.threshold:.0%}.")
+        sys.exit(1 if regressions else 0)
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"casos desconhecidos: {', '.join(unknown)}")
+    if args.db:
+        corpus = load_corpus(args.db, args.documents)
+        corpus_description = f"{args.db}:{len(corpus)}"
+    else:
+        corpus = generate_corpus(args.documents, args.seed)
+        corpus_description = f"sintetico:{args.documents}:{args.seed}"
+    results = run_benchmarks(names, corpus, args.repeat)
+    output = {
+        "meta": {
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "plataforma": platform.platform(),
+            "corpus": corpus_description,
+        },
+        "results": results,
+    }
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf8") as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+    print(f"Resultados gravados em {output_path}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compara a varredura de scripts/scan.py com a leitura sequencial por uma
+conexão sqlite comum (sem mmap, cache padrão), para uma contagem de regex nos
+campos de texto. Mede 1, 2, ... até `--max-workers` processos e confere que
+todas as execuções retornam a mesma contagem.
+
+Uso:
+    python -m benchmarks.scan [--db ./db/tcu-acordaos.db] [--pattern "débito"]
+        [--max-workers 4] [--output benchmarks/results/scan.json]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+from scripts.scan import TEXT_FIELDS, count_matches, scan
+
+
+def sequential_count(strcnx: str, pattern: str) -> dict:
+    conn = sqlite3.connect(f"file:{Path(strcnx).resolve().as_posix()}?mode=ro", uri=True)
+    cursor = conn.execute(f"SELECT {', '.join(TEXT_FIELDS)} FROM acordaos ORDER BY id")
+    counts = None
+    while True:
+        rows = cursor.fetchmany(200)
+        if not rows:
+            break
+        partial_counts = count_matches(pattern, rows)
+        counts = partial_counts if counts is None else counts + partial_counts
+    conn.close()
+    return dict(counts or {})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das varreduras paralelas.")
+    parser.add_argument("--db", default="./db/tcu-acordaos.db")
+    parser.add_argument("--pattern", default="débito")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default=None, help="grava os resultados em json")
+    args = parser.parse_args()
+
+    results = {}
+    start = time.perf_counter()
+    expected = sequential_count(args.db, args.pattern)
+    results["sequencial"] = time.perf_counter() - start
+    print(f"{'sequencial':<14} {results['sequencial']:7.2f}s")
+    for workers in range(1, args.max_workers + 1):
+        start = time.perf_counter()
+        counts = scan(args.db, partial(count_matches, args.pattern), TEXT_FIELDS, workers=workers)
+        elapsed = time.perf_counter() - start
+        if dict(counts) != expected:
+            print(f"{workers} processos: contagem diferente da sequencial", file=sys.stderr)
+            sys.exit(1)
+        results[f"{workers} processos"] = elapsed
+        print(f"{workers} processos{'':<4} {elapsed:7.2f}s ({results['sequencial'] / elapsed:.2f}x)")
+
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "w", encoding="utf8") as f:
+            json.dump({"cpus": os.cpu_count(), "padrao": args.pattern, "tempos_s": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark do layout split (scripts.storage) contra o layout single.
+
+Gera um banco sintético no layout single, copia e migra a cópia para o
+layout split e mede, nos dois:
+    - a varredura da fronteira sem índice (was_downloaded = 0);
+    - a fronteira pelo índice parcial pendingyear;
+    - `--updates` atualizações de status (was_downloaded/downloaded_at) por urn.
+
+Uso:
+    python -m benchmarks.split_state --rows 50000 --text-kb 16 --updates 2000
+"""
+import argparse
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.frontier import create_synthetic_db
+from scripts.schema import DOWNLOAD_INDEXES, create_indexes
+from scripts.storage import migrate_to_split
+
+
+def time_query(path: Path, query_string: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        # conexão nova a cada repetição para não reaproveitar o cache de páginas do sqlite
+        conn = sqlite3.connect(str(path))
+        start = time.perf_counter()
+        conn.execute(query_string).fetchall()
+        timings.append(time.perf_counter() - start)
+        conn.close()
+    return statistics.median(timings)
+
+
+def time_updates(path: Path, urns, batch: int = 100) -> float:
+    conn = sqlite3.connect(str(path))
+    start = time.perf_counter()
+    for i, urn in enumerate(urns, 1):
+        conn.execute(
+            "UPDATE download_acordaos SET was_downloaded = 1, downloaded_at = ? WHERE urn = ?",
+            ("2019-08-31", urn),
+        )
+        if i % batch == 0:
+            conn.commit()
+    conn.commit()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do layout split.")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--text-kb", type=int, default=8)
+    parser.add_argument("--pending", type=float, default=0.3)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        single = Path(tmpdir) / "single.db"
+        split = Path(tmpdir) / "split.db"
+        print(f"Gerando banco sintético com {args.rows} linhas de {args.text_kb}KB...")
+        create_synthetic_db(single, args.rows, args.text_kb, args.pending, args.seed)
+        conn = sqlite3.connect(str(single))
+        create_indexes(conn.cursor(), DOWNLOAD_INDEXES, ["pendingyear"])
+        conn.commit()
+        conn.close()
+        shutil.copy(single, split)
+        conn = sqlite3.connect(str(split))
+        start = time.perf_counter()
+        migrate_to_split(conn)
+        print(f"migração para split: {time.perf_counter() - start:.1f}s")
+        conn.close()
+
+        conn = sqlite3.connect(str(single))
+        pending_urns = [
+            row[0]
+            for row in conn.execute("SELECT urn FROM download_acordaos WHERE was_downloaded = 0")
+        ]
+        conn.close()
+        rng = random.Random(args.seed)
+        urns = rng.sample(pending_urns, min(args.updates, len(pending_urns)))
+
+        queries = {
+            "fronteira (varredura)": "SELECT url_lexml FROM download_acordaos NOT INDEXED WHERE was_downloaded = 0",
+            "fronteira (pendingyear)": "SELECT url_lexml FROM download_acordaos WHERE was_downloaded = 0",
+        }
+        for name, query_string in queries.items():
+            single_time = time_query(single, query_string, args.repeat)
+            split_time = time_query(split, query_string, args.repeat)
+            print(f"{name}: single {single_time * 1000:.1f} ms, split {split_time * 1000:.1f} ms "
+                  f"({single_time / split_time:.1f}x)")
+        single_time = time_updates(single, urns)
+        split_time = time_updates(split, urns)
+        print(f"{len(urns)} atualizações de status: single {single_time * 1000:.1f} ms, "
+              f"split {split_time * 1000:.1f} ms ({single_time / split_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
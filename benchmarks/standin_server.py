@@ -0,0 +1,213 @@
+"""
+Servidor local que imita o LexML e a api de pesquisa do TCU, para medir a
+coleta sem acessar os sites reais.
+
+Rotas:
+    GET /robots.txt
+        libera todos os caminhos.
+    GET /urn/<urn>
+        página no formato do LexML: container .panel-body com um link .noprint
+        Proxy e o link .noprint original do TCU (com KEY%3A<id>).
+    GET /rest/publico/base/acordao-completo/documento?filtro=KEY:<id>
+        json do acordao-completo com um documento.
+
+Latência, taxa de erros 500, taxa de respostas 429 e tamanho dos textos são
+configuráveis. Os textos são gerados uma vez (benchmarks/corpus.py) e
+reutilizados, para que o custo do servidor não entre na medição.
+
+Uso:
+    python -m benchmarks.standin_server --port 8765 --latency-ms 50 --error-rate 0.01
+        --throttle-rate 0.02 --payload-scale 1.0
+"""
+import argparse
+import asyncio
+import json
+import random
+import zlib
+from http import HTTPStatus
+from typing import Dict, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from benchmarks.corpus import RELATORES, UNIDADES, field_size, random_text
+
+MAX_HEADER_LINES = 100
+API_PATH = "/rest/publico/base/acordao-completo/documento"
+TCU_LINK = (
+    "https://pesquisa.apps.tcu.gov.br/#/documento/acordao-completo/*/"
+    "KEY%3AACORDAO-COMPLETO-{base_id}/DTRELEVANCIA%20desc/0/sinonimos%3Dfalse"
+)
+LEXML_PAGE = """<!DOCTYPE html>
+<html><head><title>{urn}</title></head>
+<body>
+<div class="panel panel-default"><div class="panel-heading">Outras Publicações</div>
+<div class="panel-body">
+<a class="noprint" href="/Proxy?url={urn}">Proxy</a>
+<a class="noprint" href="{tcu_link}">Tribunal de Contas da União (text/html)</a>
+</div></div>
+</body></html>
+"""
+
+
+class StandinServer:
+    """
+    Atributos:
+        latency: atraso médio de cada resposta (segundos, ±50%).
+        error_rate: fração das respostas com status 500.
+        throttle_rate: fração das respostas com status 429 (Retry-After: 1).
+        payload_scale: multiplicador do tamanho dos textos do documento.
+        pool_size: quantidade de textos distintos gerados para cada campo.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        payload_scale: float = 1.0,
+        pool_size: int = 64,
+        seed: int = 42,
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rng = random.Random(seed)
+        self.texts = {
+            field: [
+                random_text(self.rng, int(field_size(self.rng, field) * payload_scale))
+                for _ in range(pool_size)
+            ]
+            for field in ("sumario", "acordao", "relatorio", "voto")
+        }
+        self.requests = {}
+
+    def document(self, base_id: str) -> Dict:
+        index = zlib.crc32(base_id.encode("utf8"))
+        pick = lambda field: self.texts[field][index % len(self.texts[field])]
+        year = 1992 + index % 28
+        return {
+            "KEY": f"ACORDAO-COMPLETO-{base_id}",
+            "NUMACORDAO": f"{index % 5000}/{year}",
+            "URLARQUIVO": f"https://pesquisa.apps.tcu.gov.br/arquivo/{base_id}.pdf",
+            "RELATOR": RELATORES[index % len(RELATORES)],
+            "PROC": f"<b>{index:06d}/{year}-{index % 10}</b>",
+            "ASSUNTO": "Tomada de Contas Especial",
+            "DATASESSAO": f"{index % 28 + 1:02d}/{index % 12 + 1:02d}/{year}",
+            "NUMATA": f"{index % 50}/{year}",
+            "COLEGIADO": ("Plenário", "Primeira Câmara", "Segunda Câmara")[index % 3],
+            "INTERESSADOS": "<p>Fulano de Tal (CPF 123.456.789-00)</p>",
+            "ENTIDADE": "Município de Exemplo",
+            "REPRESENTANTEMP": "não atuou",
+            "UNIDADETECNICA": UNIDADES[index % len(UNIDADES)],
+            "ADVOGADO": "não há",
+            "SUMARIO": pick("sumario"),
+            "ACORDAO": pick("acordao"),
+            "QUORUM": "<p>Ministros presentes</p>",
+            "RELATORIO": pick("relatorio"),
+            "VOTO": pick("voto"),
+            "SITUACAO": "OFICIALIZADO",
+        }
+
+    def route(self, target: str) -> Tuple[HTTPStatus, str, bytes]:
+        url = urlsplit(target)
+        path = unquote(url.path)
+        if path == "/robots.txt":
+            return HTTPStatus.OK, "text/plain", b"User-agent: *\nAllow: /\n"
+        if path.startswith("/urn/"):
+            urn = path[len("/urn/"):]
+            base_id = str(zlib.crc32(urn.encode("utf8")) % 10 ** 7)
+            page = LEXML_PAGE.format(urn=urn, tcu_link=TCU_LINK.format(base_id=base_id))
+            return HTTPStatus.OK, "text/html; charset=utf-8", page.encode("utf8")
+        if path == API_PATH:
+            filtro = parse_qs(url.query).get("filtro", [""])[0]
+            base_id = filtro.rpartition("KEY:")[2].rpartition("-")[2]
+            if not base_id:
+                return HTTPStatus.BAD_REQUEST, "application/json", b'{"erro": "filtro"}'
+            body = {"quantidadeEncontrada": 1, "documentos": [self.document(base_id)]}
+            return (
+                HTTPStatus.OK,
+                "application/json; charset=utf-8",
+                json.dumps(body, ensure_ascii=False).encode("utf8"),
+            )
+        return HTTPStatus.NOT_FOUND, "text/plain", b"not found"
+
+    async def respond(self, target: str) -> Tuple[HTTPStatus, str, bytes, Dict]:
+        if self.latency:
+            await asyncio.sleep(self.latency * self.rng.uniform(0.5, 1.5))
+        if not target.startswith("/robots.txt"):
+            roll = self.rng.random()
+            if roll < self.throttle_rate:
+                return HTTPStatus.TOO_MANY_REQUESTS, "text/plain", b"", {"Retry-After": "1"}
+            if roll < self.throttle_rate + self.error_rate:
+                return HTTPStatus.INTERNAL_SERVER_ERROR, "text/plain", b"", {}
+        status, content_type, payload = self.route(target)
+        return status, content_type, payload, {}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin1").split()
+                except ValueError:
+                    break
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = (
+                    headers.get("connection", "").lower() != "close"
+                    and version == "HTTP/1.1"
+                )
+                status, content_type, payload, extra_headers = await self.respond(target)
+                self.requests[status.value] = self.requests.get(status.value, 0) + 1
+                response_headers = [
+                    f"HTTP/1.1 {status.value} {status.phrase}",
+                    f"Content-Type: {content_type}",
+                    f"Content-Length: {len(payload)}",
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                ]
+                response_headers.extend(f"{name}: {value}" for name, value in extra_headers.items())
+                writer.write(("\r\n".join(response_headers) + "\r\n\r\n").encode("latin1"))
+                if method != "HEAD":
+                    writer.write(payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita o LexML e a api do TCU.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--payload-scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    server = StandinServer(
+        args.latency_ms / 1000, args.error_rate, args.throttle_rate, args.payload_scale, seed=args.seed
+    )
+    print(f"Servindo em http://{args.host}:{args.port}", flush=True)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
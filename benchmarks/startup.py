@@ -0,0 +1,78 @@
+"""
+Tempo de partida (cold start) dos comandos de `python -m scripts`.
+
+Cada medição é um processo novo executando `python -m scripts <comando> --help`,
+que importa o módulo do comando e sai no argparse, sem tocar no banco. Para
+referência também são medidos o interpretador vazio, `import scripts.core` e
+`import scripts.funcs` (que ainda carrega pandas e selenium).
+
+Os scripts procedurais não são medidos: executá-los com --help rodaria o
+script inteiro.
+
+Uso:
+    python -m benchmarks.startup [--repeat 7] [--output benchmarks/results/startup.json]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from scripts.cli import MAIN_COMMANDS
+
+ROOT_PATH = Path(__file__).resolve().parents[1]
+
+
+def time_command(args: List[str], repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, *args],
+            cwd=str(ROOT_PATH),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+        timings.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(timings), "min_s": min(timings)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de partida dos comandos da CLI.")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--output", default=None, help="grava os resultados em json")
+    args = parser.parse_args()
+
+    cases = {
+        "python (vazio)": ["-c", "pass"],
+        "import scripts.core": ["-c", "import scripts.core"],
+        "import scripts.funcs": ["-c", "import scripts.funcs"],
+        "python -m scripts --help": ["-m", "scripts", "--help"],
+    }
+    for name in sorted(MAIN_COMMANDS):
+        cases[f"python -m scripts {name} --help"] = ["-m", "scripts", name, "--help"]
+
+    results = {}
+    width = max(len(name) for name in cases)
+    for name, command in cases.items():
+        try:
+            results[name] = time_command(command, args.repeat)
+        except subprocess.CalledProcessError:
+            # ex.: pandas ou selenium não instalados
+            print(f"{name:<{width}}  falhou")
+            continue
+        print(f"{name:<{width}}  {results[name]['median_s'] * 1000:8.1f} ms")
+
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "w", encoding="utf8") as f:
+            json.dump({"python": sys.version, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# raiz do repositório, para reutilizar os módulos sem dependências de scripts/
+ROOT_DIR = Path(__file__).resolve().parents[5]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
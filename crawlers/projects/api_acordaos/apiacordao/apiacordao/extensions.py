@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+CrawlMetrics: alimenta as métricas de scripts/metrics.py com os sinais do
+scrapy e as exporta no formato texto do Prometheus.
+
+    METRICS_TEXTFILE: arquivo .prom regravado a cada METRICS_INTERVAL segundos.
+    METRICS_PORT: porta do endpoint http://127.0.0.1:<porta>/metrics.
+    METRICS_INTERVAL: intervalo de gravação do arquivo (padrão 15s).
+    Desativada quando METRICS_TEXTFILE e METRICS_PORT não estão definidos.
+
+CallbackProfiling: roda uma fração dos callbacks do spider e das gravações do
+pipeline sob cProfile (scripts/profiling.py) e grava relatórios periódicos com
+as funções mais custosas de cada callback.
+
+    PROFILE_ENABLED: ativa a extensão (padrão False).
+    PROFILE_SAMPLE_RATE: fração das chamadas perfiladas (padrão 0.01).
+    PROFILE_CALLBACKS: callbacks do spider a perfilar.
+    PROFILE_REPORT_DIR: diretório do report.txt e dos .prof por callback.
+    PROFILE_REPORT_INTERVAL: intervalo entre relatórios (padrão 300s).
+    PROFILE_TOP_N: funções listadas por callback (padrão 20).
+"""
+import inspect
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+
+from scripts.metrics import (
+    DOCUMENT_BYTES,
+    DOCUMENTS,
+    ERRORS,
+    REGISTRY,
+    RESPONSES,
+    STAGE_SECONDS,
+    document_size,
+)
+from scripts.profiling import SampledProfiler
+
+# callback da requisição -> etapa da coleta
+STAGES_BY_CALLBACK = {
+    "parse_api_url": "lexml_fetch",
+    "parse": "api_fetch",
+    "NO_CALLBACK": "robots",
+}
+
+
+def request_stage(request) -> str:
+    callback = getattr(request.callback, "__name__", "parse")
+    return STAGES_BY_CALLBACK.get(callback, callback)
+
+
+class CrawlMetrics(object):
+    def __init__(self, textfile=None, port=None, interval=15.0):
+        self.textfile = textfile
+        self.port = port
+        self.interval = interval
+        self.server = None
+        self.task = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        textfile = crawler.settings.get("METRICS_TEXTFILE")
+        port = crawler.settings.getint("METRICS_PORT")
+        if not textfile and not port:
+            raise NotConfigured
+        ext = cls(textfile, port, crawler.settings.getfloat("METRICS_INTERVAL", 15.0))
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(ext.response_received, signal=signals.response_received)
+        crawler.signals.connect(ext.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(ext.item_error, signal=signals.item_error)
+        crawler.signals.connect(ext.spider_error, signal=signals.spider_error)
+        return ext
+
+    def spider_opened(self, spider):
+        if self.port:
+            self.server = REGISTRY.serve(self.port)
+        if self.textfile:
+            self.task = task.LoopingCall(REGISTRY.write_textfile, self.textfile)
+            self.task.start(self.interval, now=True)
+
+    def spider_closed(self, spider):
+        if self.task and self.task.running:
+            self.task.stop()
+        if self.textfile:
+            REGISTRY.write_textfile(self.textfile)
+        if self.server:
+            self.server.shutdown()
+
+    def response_received(self, response, request, spider):
+        stage = request_stage(request)
+        RESPONSES.inc(crawler=spider.name, stage=stage, status=response.status)
+        latency = request.meta.get("download_latency")
+        if latency is not None:
+            STAGE_SECONDS.observe(latency, crawler=spider.name, stage=stage)
+
+    def item_scraped(self, item, response, spider):
+        DOCUMENTS.inc(crawler=spider.name)
+        DOCUMENT_BYTES.observe(document_size(dict(item)), crawler=spider.name)
+
+    def item_error(self, item, response, spider, failure):
+        ERRORS.inc(crawler=spider.name, stage="db_write")
+
+    def spider_error(self, failure, response, spider):
+        ERRORS.inc(crawler=spider.name, stage="parse")
+
+
+class CallbackProfiling(object):
+    def __init__(self, profiler, callbacks, report_dir, interval):
+        self.profiler = profiler
+        self.callbacks = callbacks
+        self.report_dir = report_dir
+        self.interval = interval
+        self.task = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("PROFILE_ENABLED"):
+            raise NotConfigured
+        profiler = SampledProfiler(
+            sample_rate=crawler.settings.getfloat("PROFILE_SAMPLE_RATE", 0.01),
+            top_n=crawler.settings.getint("PROFILE_TOP_N", 20),
+        )
+        # o pipeline usa o mesmo profiler (as extensões são criadas antes dos pipelines)
+        crawler.callback_profiler = profiler
+        ext = cls(
+            profiler,
+            crawler.settings.getlist("PROFILE_CALLBACKS", ["parse_api_url", "parse"]),
+            crawler.settings.get("PROFILE_REPORT_DIR", "profile"),
+            crawler.settings.getfloat("PROFILE_REPORT_INTERVAL", 300.0),
+        )
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def spider_opened(self, spider):
+        # as requisições passam a referenciar o callback envolvido, pois são
+        # criadas depois da abertura do spider
+        for name in self.callbacks:
+            callback = getattr(spider, name, None)
+            if callback is None:
+                continue
+            setattr(
+                spider,
+                name,
+                self.profiler.wrap(
+                    f"spider.{name}", callback, inspect.isgeneratorfunction(callback)
+                ),
+            )
+        self.task = task.LoopingCall(self.profiler.write_report, self.report_dir)
+        self.task.start(self.interval, now=False)
+
+    def spider_closed(self, spider):
+        if self.task and self.task.running:
+            self.task.stop()
+        self.profiler.write_report(self.report_dir)
@@ -21,6 +21,7 @@ class AcordaoItem(scrapy.Item):
     processo_href = scrapy.Field() 
     tipo_processo = scrapy.Field() 
     data_sessao = scrapy.Field() 
+    data_sessao_iso = scrapy.Field()
     numero_ata = scrapy.Field() 
     numero_ata_href = scrapy.Field() 
     interessado_reponsavel_recorrente = scrapy.Field() 
@@ -5,7 +5,12 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
-from scrapy import signals
+from scrapy import Request, signals
+from scrapy.exceptions import NotConfigured
+
+from scripts.api_document import tcu_key
+from scripts.large_text import memory_size
+from scripts.membership import load_membership
 
 
 class ApiacordaoSpiderMiddleware(object):
@@ -101,3 +106,149 @@ class ApiacordaoDownloaderMiddleware(object):
 
     def spider_opened(self, spider):
         spider.logger.info('Spider opened: %s' % spider.name)
+
+
+class InflightBudgetMiddleware(object):
+    """
+    Limita a memória ocupada pelos itens que já saíram do spider e ainda não
+    foram gravados pelo pipeline. Quando os textos em memória passam de
+    MEMORY_INFLIGHT_BUDGET bytes, o engine é pausado (nenhuma requisição nova é
+    agendada; as que estão em andamento terminam) e volta a agendar quando o uso
+    cai para MEMORY_INFLIGHT_RESUME_RATIO do orçamento.
+
+    Os campos guardados em arquivo temporário (scripts/large_text.py) contam
+    apenas a parte que ficou em memória.
+    """
+
+    def __init__(self, crawler, budget, resume_ratio=0.5):
+        self.crawler = crawler
+        self.budget = budget
+        self.resume_at = budget * resume_ratio
+        self.inflight = {}
+        self.used = 0
+        self.paused = False
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        budget = crawler.settings.getint("MEMORY_INFLIGHT_BUDGET")
+        if not budget:
+            raise NotConfigured
+        mw = cls(crawler, budget, crawler.settings.getfloat("MEMORY_INFLIGHT_RESUME_RATIO", 0.5))
+        crawler.signals.connect(mw.item_done, signal=signals.item_scraped)
+        crawler.signals.connect(mw.item_done, signal=signals.item_dropped)
+        crawler.signals.connect(mw.item_done, signal=signals.item_error)
+        return mw
+
+    def process_spider_output(self, response, result, spider):
+        for item in result:
+            if not isinstance(item, Request):
+                self.reserve(item, spider)
+            yield item
+
+    async def process_spider_output_async(self, response, result, spider):
+        async for item in result:
+            if not isinstance(item, Request):
+                self.reserve(item, spider)
+            yield item
+
+    def reserve(self, item, spider):
+        size = sum(memory_size(value) for value in dict(item).values())
+        self.inflight[id(item)] = size
+        self.used += size
+        if self.used > self.budget and not self.paused:
+            self.paused = True
+            self.crawler.engine.pause()
+            self.crawler.stats.inc_value("inflight_budget/pauses", spider=spider)
+            spider.logger.info(
+                "Itens em memória (%d bytes) acima do orçamento, coleta pausada.", self.used
+            )
+
+    def item_done(self, item, spider, **kwargs):
+        self.used -= self.inflight.pop(id(item), 0)
+        if self.paused and self.used <= self.resume_at:
+            self.paused = False
+            self.crawler.engine.unpause()
+
+
+class DownloadedFilterMiddleware(object):
+    """
+    Descarta, antes de chegarem à rede, as requisições do LexML e da api de
+    documentos já gravados no banco: coletas sobrepostas ou urns repetidas na
+    lista do LexML. As urns baixadas são carregadas na abertura do spider em um
+    conjunto compacto (scripts/membership.py) e cada item gravado pelo
+    pipeline (sinal item_scraped) é acrescentado a ele.
+
+    A urn da requisição vem de meta["urn"] ou de cb_kwargs["urn"]. As
+    requisições à api também são descartadas pela chave do documento
+    (cb_kwargs["url_tcu"]), para as urns diferentes do LexML que apontam para
+    um documento já gravado.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.membership = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("DOWNLOADED_FILTER_ENABLED"):
+            raise NotConfigured
+        mw = cls(crawler)
+        crawler.signals.connect(mw.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(mw.item_scraped, signal=signals.item_scraped)
+        return mw
+
+    def spider_opened(self, spider):
+        settings = self.crawler.settings
+        self.membership = load_membership(
+            settings.get("DB_PATH"),
+            settings.get("DB_SHARDS_DIR"),
+            settings.getint("DOWNLOADED_FILTER_MERGE_SIZE", 4096),
+        )
+        self.crawler.stats.set_value("downloaded_filter/loaded", len(self.membership), spider=spider)
+        spider.logger.info(
+            "%d urns já baixadas carregadas (%d bytes).",
+            len(self.membership),
+            self.membership.memory_bytes,
+        )
+
+    def item_scraped(self, item, spider, **kwargs):
+        if self.membership is not None and item.get("urn"):
+            self.membership.add(item["urn"], item.get("url_tcu"))
+
+    def is_downloaded(self, request, spider) -> bool:
+        if self.membership is None:
+            return False
+        urn = request.meta.get("urn") or request.cb_kwargs.get("urn")
+        if urn is not None and urn in self.membership:
+            self.crawler.stats.inc_value("downloaded_filter/filtered", spider=spider)
+            return True
+        key = tcu_key(request.cb_kwargs.get("url_tcu"))
+        if key and self.membership.has_tcu_key(key):
+            self.crawler.stats.inc_value("downloaded_filter/filtered_tcu_key", spider=spider)
+            return True
+        return False
+
+    async def process_start(self, start):
+        # scrapy >= 2.13
+        async for request in start:
+            if isinstance(request, Request) and self.is_downloaded(request, self.crawler.spider):
+                continue
+            yield request
+
+    def process_start_requests(self, start_requests, spider):
+        for request in start_requests:
+            if isinstance(request, Request) and self.is_downloaded(request, spider):
+                continue
+            yield request
+
+    def process_spider_output(self, response, result, spider):
+        for item in result:
+            if isinstance(item, Request) and self.is_downloaded(item, spider):
+                continue
+            yield item
+
+    async def process_spider_output_async(self, response, result, spider):
+        async for item in result:
+            if isinstance(item, Request) and self.is_downloaded(item, spider):
+                continue
+            yield item
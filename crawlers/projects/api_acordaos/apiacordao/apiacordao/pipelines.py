@@ -5,45 +5,68 @@
 # Don't forget to add your pipeline to the ITEM_PIPELINES setting
 # See: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 import sqlite3 as sql
+from scripts.api_document import DOCUMENT_COLUMNS
+from scripts.large_text import SpooledText, materialize
+from scripts.metrics import STAGE_SECONDS
+from scripts.shards import ShardRouter
+from scripts.storage import detect_layout, update_document
 
 
 class ApiacordaoPipeline(object):
-    def __init__(self):
+    def __init__(self, db_path="../../../../db/acordaos-download.db", shards_dir=None):
+        self.db_path = db_path
+        self.shards_dir = shards_dir
         self.create_cnx()
 
+    @classmethod
+    def from_crawler(cls, crawler):
+        pipeline = cls(crawler.settings.get("DB_PATH"), crawler.settings.get("DB_SHARDS_DIR"))
+        # profiling por amostragem da gravação (extensão CallbackProfiling)
+        profiler = getattr(crawler, "callback_profiler", None)
+        if profiler is not None:
+            pipeline.store_db = profiler.wrap("pipeline.store_db", pipeline.store_db)
+        return pipeline
+
     def create_cnx(self):
-        self.conn = sql.connect("../../../../db/acordaos-download.db")
+        if self.shards_dir:
+            # um arquivo por ano: coletas de anos diferentes não disputam o lock
+            self.router = ShardRouter(self.shards_dir)
+            return
+        self.conn = sql.connect(self.db_path)
         self.cursor = self.conn.cursor()
+        self.layout = detect_layout(self.cursor)
 
     def store_db(self, item):
-        query_string = f"""
-        UPDATE download_acordaos 
-        SET urn_year = {item['urn_year']}, 
-        numero_acordao = '{item['numero_acordao']}', 
-        numero_acordao_href = '{item['numero_acordao_href']}',
-        relator = '{item['relator']}',
-        processo = '{item['processo']}',
-        processo_href = '{item['processo_href']}',
-        tipo_processo = '{item['tipo_processo']}',
-        data_sessao = '{item['data_sessao']}',
-        numero_ata = '{item['numero_ata']}',
-        interessado_reponsavel_recorrente = '{item['interessado_reponsavel_recorrente']}',
-        entidade = '{item['entidade']}',
-        representante_mp = '{item['representante_mp']}',
-        unidade_tecnica = '{item['unidade_tecnica']}',
-        repr_legal = '{item['repr_legal']}',
-        assunto = '{item['assunto']}',
-        sumario = '{item['sumario']}',
-        acordao = '{item['acordao']}',
-        quorum = '{item['quorum']}',
-        relatorio = '{item['relatorio']}',
-        voto = '{item['voto']}',
-        was_downloaded = {item['was_downloaded']},
-        downloaded_at = {item['downloaded_at']}
-        WHERE urn = '{item['urn']}'"""
-        self.cursor.execute(query_string)
-        self.conn.commit()
+        # os valores são passados como parâmetros para que o sqlite não
+        # interprete datas como 2019-08-31 como expressões aritméticas
+        # textos grandes guardados em arquivo temporário só são lidos aqui
+        values = {col: materialize(item.get(col)) for col in DOCUMENT_COLUMNS}
+        if values["url_tcu"] is None:
+            # mantém o link já gravado (ex.: coleta com selenium)
+            del values["url_tcu"]
+        if self.shards_dir:
+            with STAGE_SECONDS.time(crawler=self.crawler_name, stage="db_write"):
+                self.router.update_document(item["urn"], values)
+            return
+        with STAGE_SECONDS.time(crawler=self.crawler_name, stage="db_write"):
+            update_document(self.cursor, self.layout, item["urn"], values)
+        with STAGE_SECONDS.time(crawler=self.crawler_name, stage="db_commit"):
+            self.conn.commit()
+
+    def open_spider(self, spider):
+        self.crawler_name = spider.name
+
+    def close_spider(self, spider):
+        if self.shards_dir:
+            self.router.close()
+        else:
+            self.conn.close()
 
     def process_item(self, item, spider):
-        self.store_db(item)
+        try:
+            self.store_db(item)
+        finally:
+            for value in item.values():
+                if isinstance(value, SpooledText):
+                    value.close()
         return item
@@ -14,6 +14,14 @@ BOT_NAME = 'apiacordao'
 SPIDER_MODULES = ['apiacordao.spiders']
 NEWSPIDER_MODULE = 'apiacordao.spiders'
 
+# Banco de coleta (relativo ao diretório do projeto scrapy). O layout
+# (single ou split) é detectado a partir das tabelas existentes.
+DB_PATH = '../../../../db/acordaos-download.db'
+# diretório com um banco por urn_year (scripts/shards.py); quando definido substitui DB_PATH
+DB_SHARDS_DIR = None  # ex.: "../../../../db/shards"
+# endpoint do documento completo na api de pesquisa do TCU
+TCU_API_URL = 'https://pesquisa.apps.tcu.gov.br/rest/publico/base/acordao-completo/documento'
+
 
 # Crawl responsibly by identifying yourself (and your website) on the user-agent
 #USER_AGENT = 'apiacordao (+http://www.yourdomain.com)'
@@ -49,6 +57,10 @@ ROBOTSTXT_OBEY = True
 #SPIDER_MIDDLEWARES = {
 #    'apiacordao.middlewares.ApiacordaoSpiderMiddleware': 543,
 #}
+SPIDER_MIDDLEWARES = {
+    'apiacordao.middlewares.DownloadedFilterMiddleware': 540,
+    'apiacordao.middlewares.InflightBudgetMiddleware': 550,
+}
 DOWNLOADER_MIDDLEWARES = {
     'scrapy.downloadermiddlewares.useragent.UserAgentMiddleware': None,
     'scrapy_user_agents.middlewares.RandomUserAgentMiddleware': 400,
@@ -65,6 +77,42 @@ DOWNLOADER_MIDDLEWARES = {
 #EXTENSIONS = {
 #    'scrapy.extensions.telnet.TelnetConsole': None,
 #}
+EXTENSIONS = {
+    'apiacordao.extensions.CrawlMetrics': 500,
+    'apiacordao.extensions.CallbackProfiling': 510,
+}
+
+# Métricas da coleta no formato do Prometheus (scripts/metrics.py); a extensão
+# só é ativada quando um dos dois destinos está definido
+METRICS_TEXTFILE = None  # ex.: "../../../../logs/apiacordao.prom"
+METRICS_PORT = None  # ex.: 9410
+METRICS_INTERVAL = 15
+
+# Profiling por amostragem dos callbacks e do pipeline (scripts/profiling.py)
+PROFILE_ENABLED = False
+PROFILE_SAMPLE_RATE = 0.01
+PROFILE_CALLBACKS = ['parse_api_url', 'parse']
+PROFILE_REPORT_DIR = '../../../../logs/profile'
+PROFILE_REPORT_INTERVAL = 300
+PROFILE_TOP_N = 20
+
+# Documentos muito grandes (scripts/large_text.py): campos acordao, relatorio e
+# voto acima de LARGE_FIELD_THRESHOLD caracteres são limpos em blocos e guardados
+# em arquivo temporário a partir de LARGE_FIELD_SPOOL_MAX bytes (0 desativa)
+LARGE_FIELD_THRESHOLD = 0  # ex.: 1_000_000
+LARGE_FIELD_CHUNK_SIZE = 64 * 1024
+LARGE_FIELD_SPOOL_MAX = 64 * 1024
+LARGE_FIELD_SPOOL_DIR = None
+
+# Pausa a coleta quando os itens à espera do pipeline ocupam mais que
+# MEMORY_INFLIGHT_BUDGET bytes (0 desativa)
+MEMORY_INFLIGHT_BUDGET = 0  # ex.: 256 * 1024 * 1024
+MEMORY_INFLIGHT_RESUME_RATIO = 0.5
+
+# Descarta requisições de urns já gravadas, consultando em memória o conjunto
+# das urns baixadas (scripts/membership.py) carregado na abertura do spider
+DOWNLOADED_FILTER_ENABLED = True
+DOWNLOADED_FILTER_MERGE_SIZE = 4096
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
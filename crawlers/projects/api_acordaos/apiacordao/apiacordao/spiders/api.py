@@ -1,80 +1,109 @@
 # -*- coding: utf-8 -*-
 import scrapy
 from scrapy import Request
-import json
 from ..items import AcordaoItem
-import re
-import json
-from datetime import datetime
 import sqlite3 as sql
+from scripts.api_document import (
+    api_url as build_api_url,
+    build_document,
+    clean_text,
+    parse_api_response,
+    remove_tags_html,
+    tcu_key,
+)
+from scripts.large_text import clean_html_stream
+from scripts.metrics import STAGE_SECONDS
+from scripts.shards import ShardRouter
 
 class ApiSpider(scrapy.Spider):
     name = "api"
 
     def __init__(self, **kwargs):
         self.year = kwargs.get('year', None)
-        self.conn = sql.connect("../../../../db/acordaos-download.db")
-        self.cursor = self.conn.cursor()
+
+    async def start(self):
+        # scrapy >= 2.13 usa start(); start_requests() continua valendo nas versões anteriores
+        for request in self.start_requests():
+            yield request
 
     def start_requests(self):
+        if self.settings.get("DB_SHARDS_DIR"):
+            lexml_urls = self.pending_urls_from_shards(self.settings.get("DB_SHARDS_DIR"))
+        else:
+            lexml_urls = self.pending_urls()
+        for url in lexml_urls:
+            url = url[0]
+            # a urn é o último segmento da url do LexML (DownloadedFilterMiddleware)
+            yield Request(url, callback=self.parse_api_url, meta={"urn": url.split("/")[-1]})
+
+    def pending_urls(self):
+        self.conn = sql.connect(self.settings.get("DB_PATH"))
+        self.cursor = self.conn.cursor()
         #faz a query para coletar as urls do lexml
         if self.year:
             lexml_urls = self.cursor.execute(f"SELECT url_lexml from download_acordaos where urn_year = {self.year} and was_downloaded = 0").fetchall()
         else:
             lexml_urls = self.cursor.execute(f"SELECT url_lexml from download_acordaos where was_downloaded = 0").fetchall()
-        for url in lexml_urls:
-            url = url[0]
-            yield Request(url, callback=self.parse_api_url)
+        return lexml_urls
+
+    def pending_urls_from_shards(self, shards_dir):
+        router = ShardRouter(shards_dir)
+        query_string = "SELECT url_lexml from download_acordaos where was_downloaded = 0"
+        try:
+            if not self.year:
+                return list(router.query_all(query_string))
+            # apenas o arquivo do ano é aberto
+            try:
+                conn = router.connect(self.year, create=False)
+            except FileNotFoundError:
+                self.logger.warning(f"Não há shard do ano {self.year} em {shards_dir}; nenhuma url a coletar.")
+                return []
+            return conn.execute(query_string).fetchall()
+        finally:
+            router.close()
 
     def parse_api_url(self, response):
         urn = response.url.split("/")[-1]
         links = response.css(".noprint::attr(href)").getall()
         if isinstance(links, list):
-            links = [link for link in links if 'Proxy' not in link][0]
+            # apenas o primeiro link original (os links Proxy são ignorados)
+            links = [link for link in links if 'Proxy' not in link][:1]
+        api_url = self.settings.get("TCU_API_URL")
         for link in links:
-            base_id = re.sub("KEY%3A", "", link.split("/")[-4])
-            url = f"https://pesquisa.apps.tcu.gov.br/rest/publico/base/acordao-completo/documento?termo=*&filtro=KEY:{base_id}&ordenacao=DTRELEVANCIA desc&quantidade=1&inicio=0&sinonimos=false"
-            yield Request(url, callback=self.parse, cb_kwargs=dict(urn=urn))
-    
-    def parse(self, response, urn):
-        res = json.loads(response.body, encoding="utf8")
-        if res['quantidadeEncontrada'] == 0 or res["documentos"][0]["SITUACAO"] == "INVALIDADO":
-            yield None
-        res = res["documentos"][0]
-        data = AcordaoItem()
-        data["urn"] = urn
-        data["urn_year"] = re.search("\d{4}-\d{2}-\d{2}", urn).group(0)[:4]
-        data["numero_acordao"] = self.clean_text(res["NUMACORDAO"])
-        if 'URLARQUIVO' in res.keys():
-            data["numero_acordao_href"] = res["URLARQUIVO"].strip()
-            data["processo_href"] = res["URLARQUIVO"]
-        data["relator"] = self.clean_text(res["RELATOR"])
-        data["processo"] = self.clean_text(self.remove_tags_html(res["PROC"]))
-        data["tipo_processo"] = self.clean_text(res["ASSUNTO"])
-        data["data_sessao"] = self.clean_text(res["DATASESSAO"])
-        data["numero_ata"] = self.clean_text(f"{res['NUMATA']}-{res['COLEGIADO']}")
-        data["interessado_reponsavel_recorrente"] = self.clean_text(
-            self.remove_tags_html(res["INTERESSADOS"])
-        )
-        data["entidade"] = self.clean_text(res["ENTIDADE"])
-        data["representante_mp"] = self.clean_text(res["REPRESENTANTEMP"])
-        data["unidade_tecnica"] = self.clean_text(res["UNIDADETECNICA"])
-        data["repr_legal"] = self.clean_text(res["ADVOGADO"])
-        data["assunto"] = self.clean_text(res["ASSUNTO"])
-        data["sumario"] = self.clean_text(res["SUMARIO"])
-        data["acordao"] = self.clean_text(self.remove_tags_html(res["ACORDAO"]))
-        data["quorum"] = self.clean_text(self.remove_tags_html(res["QUORUM"]))
-        data["relatorio"] = self.clean_text(self.remove_tags_html(res["RELATORIO"]))
-        data["voto"] = self.clean_text(self.remove_tags_html(res["VOTO"]))
-        data["was_downloaded"] = 1
-        data["downloaded_at"] = datetime.now().strftime("%Y-%m-%d")
+            base_id = tcu_key(link)
+            url = build_api_url(api_url, base_id)
+            # o link é gravado em url_tcu: guarda a chave para recoletas sem o LexML
+            yield Request(url, callback=self.parse, cb_kwargs=dict(urn=urn, url_tcu=link))
+
+    def parse(self, response, urn, url_tcu=None):
+        res = parse_api_response(response.body)
+        if res is None:
+            return
+        with STAGE_SECONDS.time(crawler=self.name, stage="parse"):
+            data = self.build_item(res, urn, url_tcu)
         yield data
 
+    def build_item(self, res, urn, url_tcu=None):
+        # mapeamento dos campos compartilhado com scripts/fetch_engine.py
+        return AcordaoItem(build_document(res, urn, url_tcu, self.clean_large_text))
+
+    def clean_large_text(self, texto: str):
+        """
+        Textos acima de LARGE_FIELD_THRESHOLD caracteres são limpos em blocos e
+        guardados em arquivo temporário (scripts/large_text.py) em vez de copiados.
+        """
+        threshold = self.settings.getint("LARGE_FIELD_THRESHOLD", 0)
+        if threshold and len(texto) > threshold:
+            return clean_html_stream(
+                texto,
+                chunk_size=self.settings.getint("LARGE_FIELD_CHUNK_SIZE", 64 * 1024),
+                max_size=self.settings.getint("LARGE_FIELD_SPOOL_MAX", 64 * 1024),
+                dir=self.settings.get("LARGE_FIELD_SPOOL_DIR"),
+            )
+        return self.clean_text(self.remove_tags_html(texto))
+
     def remove_tags_html(self, texto: str) -> str:
-        cleanr = re.compile("<.*?>|&([a-z0-9]+|#[0-9]{1,6}|#x[0-9a-f]{1,6});")
-        cleantext = re.sub(cleanr, "", texto)
-        return cleantext.replace("\t", " ").replace("\n", " ").strip()
+        return remove_tags_html(texto)
 
     def clean_text(self, texto: str) -> str:
-        texto = texto.replace("\xa0", "").replace("\t", " ").replace("\n", " ").replace("'"," ").strip()
-        return texto
+        return clean_text(texto)
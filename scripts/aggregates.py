@@ -0,0 +1,180 @@
+"""
+Tabelas de contagem do banco publicado para os painéis.
+
+`agregados` guarda a quantidade de acórdãos por (ano_acordao, relator,
+unidade_tecnica, tipo_processo, colegiado), onde o colegiado vem do sufixo de
+numero_ata ("20/2015-Plenário"). É uma tabela estreita (dezenas de milhares de
+linhas), então qualquer combinação de dimensões é respondida sem ler a tabela
+acordaos e seus textos.
+
+Os triggers de acordaos gravam +1/-1 em `agregados_delta` a cada insert,
+delete ou update das colunas das dimensões; `refresh_aggregates` consolida o
+delta em `agregados`. As consultas somam as duas tabelas, então o resultado já
+inclui as alterações ainda não consolidadas.
+
+build_publication gera as tabelas na carga (uma única passada com GROUP BY).
+
+Uso:
+    python -m scripts.aggregates refresh [--db ./db/tcu-acordaos.db] [--full]
+    python -m scripts.aggregates query --by ano_acordao,colegiado [--ano_acordao 2015 ...]
+"""
+import argparse
+import sqlite3
+import time
+from typing import Dict, List, Sequence, Tuple
+
+DIMENSIONS = ("ano_acordao", "relator", "unidade_tecnica", "tipo_processo", "colegiado")
+
+COLEGIADO_SQL = """CASE
+        WHEN {row}.numero_ata LIKE '%Plen_rio' THEN 'Plenário'
+        WHEN {row}.numero_ata LIKE '%Primeira C_mara' OR {row}.numero_ata LIKE '%1_ C_mara' THEN 'Primeira Câmara'
+        WHEN {row}.numero_ata LIKE '%Segunda C_mara' OR {row}.numero_ata LIKE '%2_ C_mara' THEN 'Segunda Câmara'
+        ELSE '' END"""
+
+
+def dimension_values(row: str) -> str:
+    """
+    Expressões das dimensões para a linha `row` (acordaos, NEW ou OLD). Valores
+    nulos viram 0 / '' para que o ON CONFLICT da chave primária funcione.
+    """
+    return ", ".join(
+        (
+            f"coalesce({row}.ano_acordao, 0)",
+            f"coalesce({row}.relator, '')",
+            f"coalesce({row}.unidade_tecnica, '')",
+            f"coalesce({row}.tipo_processo, '')",
+            COLEGIADO_SQL.format(row=row),
+        )
+    )
+
+
+AGGREGATE_TABLES = f"""
+CREATE TABLE IF NOT EXISTS agregados (
+        ano_acordao INTEGER NOT NULL,
+        relator TEXT NOT NULL,
+        unidade_tecnica TEXT NOT NULL,
+        tipo_processo TEXT NOT NULL,
+        colegiado TEXT NOT NULL,
+        total INTEGER NOT NULL,
+        PRIMARY KEY ({', '.join(DIMENSIONS)})
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS agregados_delta (
+        ano_acordao INTEGER NOT NULL,
+        relator TEXT NOT NULL,
+        unidade_tecnica TEXT NOT NULL,
+        tipo_processo TEXT NOT NULL,
+        colegiado TEXT NOT NULL,
+        total INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS agregados_insert AFTER INSERT ON acordaos BEGIN
+    INSERT INTO agregados_delta VALUES ({dimension_values("NEW")}, 1);
+END;
+CREATE TRIGGER IF NOT EXISTS agregados_delete AFTER DELETE ON acordaos BEGIN
+    INSERT INTO agregados_delta VALUES ({dimension_values("OLD")}, -1);
+END;
+CREATE TRIGGER IF NOT EXISTS agregados_update
+AFTER UPDATE OF ano_acordao, relator, unidade_tecnica, tipo_processo, numero_ata ON acordaos BEGIN
+    INSERT INTO agregados_delta VALUES ({dimension_values("OLD")}, -1);
+    INSERT INTO agregados_delta VALUES ({dimension_values("NEW")}, 1);
+END;
+"""
+
+
+def create_aggregate_tables(cursor: sqlite3.Cursor) -> None:
+    cursor.executescript(AGGREGATE_TABLES)
+
+
+def refresh_aggregates(conn: sqlite3.Connection, full: bool = False) -> Dict[str, float]:
+    """
+    Consolida agregados_delta em agregados.
+
+    Atributos:
+        full: recalcula agregados a partir de acordaos (na primeira execução,
+            ou depois de alterações feitas com os triggers removidos).
+    """
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    is_new = not cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'agregados'"
+    ).fetchone()
+    create_aggregate_tables(cursor)
+    if full or is_new:
+        cursor.execute("DELETE FROM agregados")
+        cursor.execute("DELETE FROM agregados_delta")
+        cursor.execute(
+            f"INSERT INTO agregados ({', '.join(DIMENSIONS)}, total) "
+            f"SELECT {dimension_values('acordaos')}, count(*) FROM acordaos "
+            f"GROUP BY {', '.join(str(position) for position in range(1, len(DIMENSIONS) + 1))}"
+        )
+        changes = cursor.execute("SELECT count(*) FROM agregados").fetchone()[0]
+    else:
+        changes = cursor.execute("SELECT count(*) FROM agregados_delta").fetchone()[0]
+        # o sqlite exige um WHERE no SELECT de um INSERT ... ON CONFLICT (ambiguidade do parser)
+        cursor.execute(
+            f"INSERT INTO agregados ({', '.join(DIMENSIONS)}, total) "
+            f"SELECT {', '.join(DIMENSIONS)}, sum(total) FROM agregados_delta WHERE 1 = 1 "
+            f"GROUP BY {', '.join(DIMENSIONS)} "
+            f"ON CONFLICT ({', '.join(DIMENSIONS)}) DO UPDATE SET total = total + excluded.total"
+        )
+        cursor.execute("DELETE FROM agregados WHERE total = 0")
+        cursor.execute("DELETE FROM agregados_delta")
+    conn.commit()
+    return {"linhas": changes, "completo": full or is_new, "total_s": time.perf_counter() - start}
+
+
+def query_aggregates(
+    cursor: sqlite3.Cursor, by: Sequence[str] = ("ano_acordao",), **filters
+) -> List[Tuple]:
+    """
+    Quantidade de acórdãos agrupada pelas dimensões `by`, com filtros de
+    igualdade nas dimensões (ex.: by=("relator",), ano_acordao=2015).
+    Inclui as alterações ainda não consolidadas pelo refresh.
+    """
+    columns = list(by)
+    unknown = [col for col in [*columns, *filters] if col not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Dimensões desconhecidas: {', '.join(unknown)}.")
+    where_string = " AND ".join(f"{col} = ?" for col in filters) or "1 = 1"
+    group_string = f"GROUP BY {', '.join(columns)} ORDER BY {', '.join(columns)}" if columns else ""
+    query = (
+        f"SELECT {', '.join([*columns, 'sum(total)'])} FROM ("
+        f"SELECT * FROM agregados WHERE {where_string} "
+        f"UNION ALL SELECT * FROM agregados_delta WHERE {where_string}"
+        f") {group_string}"
+    )
+    params = [*filters.values(), *filters.values()]
+    # dimensões cujos +1/-1 se anulam não aparecem
+    return [row for row in cursor.execute(query, params) if row[-1]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tabelas de contagem do banco publicado.")
+    parser.add_argument("command", choices=("refresh", "query"))
+    parser.add_argument("--db", default="./db/tcu-acordaos.db")
+    parser.add_argument("--full", action="store_true", help="recalcula a partir de acordaos")
+    parser.add_argument("--by", default="ano_acordao", help="dimensões separadas por vírgula")
+    for dimension in DIMENSIONS:
+        parser.add_argument(f"--{dimension}", type=int if dimension == "ano_acordao" else str)
+    args = parser.parse_args()
+
+    if args.command == "refresh":
+        conn = sqlite3.connect(args.db)
+        stats = refresh_aggregates(conn, args.full)
+        conn.close()
+        kind = "recalculadas" if stats["completo"] else "consolidadas"
+        print(f"{stats['linhas']} linhas {kind} em {stats['total_s']:.2f}s")
+        return
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    filters = {
+        dimension: getattr(args, dimension)
+        for dimension in DIMENSIONS
+        if getattr(args, dimension) is not None
+    }
+    by = [col for col in args.by.split(",") if col]
+    for row in query_aggregates(conn.cursor(), by, **filters):
+        print("\t".join(str(value) for value in row))
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
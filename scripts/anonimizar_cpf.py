@@ -1,7 +1,9 @@
-from scripts.funcs import mask_cnpj, ResultIter, initiate_db
+from scripts.core import mask_cnpj, ResultIter, initiate_db
+from scripts.storage import body_table, detect_layout, document_source
 conn, cur = initiate_db("./db/acordaos-download.db")
-QUERY = """SELECT id, interessado_reponsavel_recorrente, repr_legal,sumario, acordao, quorum, 
-relatorio, voto from download_acordaos where urn_year = 2018 or urn_year = 2019"""
+layout = detect_layout(cur)
+QUERY = f"""SELECT id, interessado_reponsavel_recorrente, repr_legal,sumario, acordao, quorum, 
+relatorio, voto from {document_source(layout)} where urn_year = 2018 or urn_year = 2019"""
 
 mapping_index_feature = {
     1 : 'interessado_reponsavel_recorrente',
@@ -22,7 +24,7 @@ with open("./logs/anonimizacao_logging_000.txt", 'w', encoding='utf8') as log:
             check_for_cpf = mask_cnpj(feature)
             if check_for_cpf:
                 check_for_cpf = check_for_cpf.replace("'","")
-                UPDATE_STRING = f"UPDATE download_acordaos SET {mapping_index_feature[index]} = '{check_for_cpf}' WHERE id = {data[0]}"
+                UPDATE_STRING = f"UPDATE {body_table(layout)} SET {mapping_index_feature[index]} = '{check_for_cpf}' WHERE id = {data[0]}"
                 cur.execute(UPDATE_STRING)
                 log.write(f"id {data[0]} atualizado na feature {mapping_index_feature[index]}.\n")
         conn.commit()
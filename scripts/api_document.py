@@ -0,0 +1,127 @@
+"""
+Conversão do documento da api de pesquisa do TCU (acordao-completo) nos campos
+do banco de coleta, sem dependência do scrapy.
+
+Usada pelo ApiSpider e pelo motor asyncio de scripts/fetch_engine.py, para
+que as duas coletas gravem exatamente os mesmos valores.
+"""
+import json
+import re
+from datetime import datetime
+from typing import Callable, Dict, Union
+
+from scripts.dates import normalize_date
+from scripts.urn import urn_year
+
+TAGS_AND_ENTITIES = re.compile("<.*?>|&([a-z0-9]+|#[0-9]{1,6}|#x[0-9a-f]{1,6});")
+KEY_FINDER = re.compile(r"KEY(?:%3A|:)([\w.-]+)")
+API_QUERY = "?termo=*&filtro=KEY:{base_id}&ordenacao=DTRELEVANCIA desc&quantidade=1&inicio=0&sinonimos=false"
+
+# colunas gravadas pelo pipeline (ver build_document)
+DOCUMENT_COLUMNS = (
+    "urn_year",
+    "numero_acordao",
+    "numero_acordao_href",
+    "relator",
+    "processo",
+    "processo_href",
+    "tipo_processo",
+    "data_sessao",
+    "data_sessao_iso",
+    "numero_ata",
+    "interessado_reponsavel_recorrente",
+    "entidade",
+    "representante_mp",
+    "unidade_tecnica",
+    "repr_legal",
+    "assunto",
+    "sumario",
+    "acordao",
+    "quorum",
+    "relatorio",
+    "voto",
+    "url_tcu",
+    "was_downloaded",
+    "downloaded_at",
+)
+
+
+def remove_tags_html(texto: str) -> str:
+    cleantext = TAGS_AND_ENTITIES.sub("", texto)
+    return cleantext.replace("\t", " ").replace("\n", " ").strip()
+
+
+def clean_text(texto: str) -> str:
+    return texto.replace("\xa0", "").replace("\t", " ").replace("\n", " ").replace("'", " ").strip()
+
+
+def clean_html(texto: str) -> str:
+    return clean_text(remove_tags_html(texto))
+
+
+def tcu_key(link: str) -> Union[str, None]:
+    """
+    Chave do documento na api do TCU a partir do link do LexML (KEY%3A...) ou
+    do url_tcu gravado no banco.
+    """
+    found = KEY_FINDER.search(link or "")
+    if not found:
+        return None
+    return found.group(1)
+
+
+def api_url(base_url: str, key: str) -> str:
+    return base_url + API_QUERY.format(base_id=key)
+
+
+def parse_api_response(body: Union[bytes, str]) -> Union[Dict, None]:
+    """
+    Documento da resposta da api; None quando não encontrado ou invalidado.
+    """
+    res = json.loads(body)
+    if res["quantidadeEncontrada"] == 0 or res["documentos"][0]["SITUACAO"] == "INVALIDADO":
+        return None
+    return res["documentos"][0]
+
+
+def build_document(
+    res: Dict, urn: str, url_tcu: str = None, clean_large_text: Callable = clean_html
+) -> Dict:
+    """
+    Campos do banco de coleta (DOCUMENT_COLUMNS e urn) a partir do documento da api.
+
+    Atributos:
+        res: documento da api; ACORDAO, RELATORIO e VOTO são retirados dele
+            para que o texto original possa ser liberado.
+        url_tcu: link do documento no TCU (guarda a chave para recoletas).
+        clean_large_text: limpeza dos textos longos (ex.: scripts.large_text.clean_html_stream).
+    """
+    data = {}
+    data["urn"] = urn
+    data["urn_year"] = urn_year(urn)
+    data["numero_acordao"] = clean_text(res["NUMACORDAO"])
+    if "URLARQUIVO" in res.keys():
+        data["numero_acordao_href"] = res["URLARQUIVO"].strip()
+        data["processo_href"] = res["URLARQUIVO"]
+    data["relator"] = clean_text(res["RELATOR"])
+    data["processo"] = clean_text(remove_tags_html(res["PROC"]))
+    data["tipo_processo"] = clean_text(res["ASSUNTO"])
+    data["data_sessao"] = clean_text(res["DATASESSAO"])
+    data["data_sessao_iso"] = normalize_date(data["data_sessao"])
+    data["numero_ata"] = clean_text(f"{res['NUMATA']}-{res['COLEGIADO']}")
+    data["interessado_reponsavel_recorrente"] = clean_text(remove_tags_html(res["INTERESSADOS"]))
+    data["entidade"] = clean_text(res["ENTIDADE"])
+    data["representante_mp"] = clean_text(res["REPRESENTANTEMP"])
+    data["unidade_tecnica"] = clean_text(res["UNIDADETECNICA"])
+    data["repr_legal"] = clean_text(res["ADVOGADO"])
+    data["assunto"] = clean_text(res["ASSUNTO"])
+    data["sumario"] = clean_text(res["SUMARIO"])
+    data["acordao"] = clean_large_text(res.pop("ACORDAO"))
+    data["quorum"] = clean_text(remove_tags_html(res["QUORUM"]))
+    data["relatorio"] = clean_large_text(res.pop("RELATORIO"))
+    data["voto"] = clean_large_text(res.pop("VOTO"))
+    if url_tcu:
+        data["url_tcu"] = url_tcu
+    data["was_downloaded"] = 1
+    data["downloaded_at"] = datetime.now().strftime("%Y-%m-%d")
+    return data
@@ -0,0 +1,269 @@
+"""
+Gera o banco publicado (tcu-acordaos.db) em uma única passada pelo banco de coleta.
+
+Substitui a sequência create-db-to-publish.py -> migrating_date_to_publish.py
+-> anonimizar_cpf.py: cada linha é lida uma vez, tem os CPFs mascarados e a
+data da sessão normalizada (aaaa-mm-dd) em memória e é gravada em um banco
+temporário configurado para carga em massa (journal desligado, índices criados
+só depois da carga). As tabelas de contagem de scripts/aggregates.py são
+geradas depois da carga. Ao final roda ANALYZE e grava o resultado compactado
+com VACUUM INTO. A ordem de leitura é fixa (id) e a data gravada em
+versao_dataset é a da coleta mais recente da origem (max(downloaded_at)), então
+a mesma origem, sobre a mesma versão anterior, gera sempre o mesmo arquivo.
+
+Cada build recebe a versão do banco que substitui mais um (scripts.delta) e,
+com --delta-dir, gera o pacote de diferenças da versão anterior para a nova
+antes de substituir o arquivo. As tabelas calculadas sobre o banco publicado
+(CARRIED_TABLES) são copiadas do arquivo anterior: como guardam a versão de
+cada urn (versao_hash), a próxima atualização delas reprocessa só as urns
+novas ou alteradas, em vez do corpus inteiro.
+
+Uso:
+    python -m scripts.build_publication [--source ./db/acordaos-download.db]
+        [--target ./db/tcu-acordaos.db] [--page-size 8192] [--delta-dir ./db/deltas]
+"""
+import argparse
+import sqlite3
+import time
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from scripts.aggregates import refresh_aggregates
+from scripts.dates import normalize_date
+from scripts.core import mask_cnpj
+from scripts.delta import create_delta, dataset_version, stamp_version
+from scripts.schema import PUBLISH_INDEXES, PUBLISH_TABLE, create_indexes
+from scripts.storage import STATE_TABLE, detect_layout, document_source
+
+# coluna do banco de coleta -> coluna do banco publicado
+COLUMNS_MAPPING = {
+    "urn": "urn",
+    "urn_year": "ano_acordao",
+    "numero_acordao": "numero_acordao",
+    "relator": "relator",
+    "processo": "processo",
+    "tipo_processo": "tipo_processo",
+    "data_sessao": "data_sessao",
+    "numero_ata": "numero_ata",
+    "interessado_reponsavel_recorrente": "interessado_reponsavel_recorrente",
+    "entidade": "entidade",
+    "representante_mp": "representante_mp",
+    "unidade_tecnica": "unidade_tecnica",
+    "repr_legal": "repr_legal",
+    "assunto": "assunto",
+    "sumario": "sumario",
+    "acordao": "acordao",
+    "quorum": "quorum",
+    "relatorio": "relatorio",
+    "voto": "voto",
+}
+ANONYMIZED_COLUMNS = (
+    "interessado_reponsavel_recorrente",
+    "repr_legal",
+    "sumario",
+    "acordao",
+    "quorum",
+    "relatorio",
+    "voto",
+)
+# tabelas de scripts.citations e scripts.near_duplicates, mantidas entre os builds
+CARRIED_TABLES = (
+    "citacoes",
+    "citacoes_processados",
+    "minhash",
+    "minhash_bandas",
+    "minhash_parametros",
+    "minhash_grupos",
+)
+
+
+def transform_row(row: Tuple, cols_names: Tuple[str, ...]) -> Tuple:
+    """
+    Aplica a anonimização de CPF e a normalização da data da sessão a uma linha.
+    """
+    values = list(row)
+    for index, col in enumerate(cols_names):
+        value = values[index]
+        if col in ANONYMIZED_COLUMNS:
+            # mask_cnpj retorna None quando não há CPF no texto
+            masked_value = mask_cnpj(value)
+            if masked_value:
+                values[index] = masked_value
+        elif col == "data_sessao":
+            values[index] = normalize_date(value) or value
+    return tuple(values)
+
+
+def open_bulk_target(path: Path, page_size: int) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path), isolation_level=None)
+    conn.execute(f"PRAGMA page_size = {page_size}")
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA locking_mode = EXCLUSIVE")
+    conn.execute("PRAGMA cache_size = -262144")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+def previous_version(path: Path) -> int:
+    if not path.exists():
+        return 0
+    conn = sqlite3.connect(f"file:{path.resolve().as_posix()}?mode=ro", uri=True)
+    version = dataset_version(conn)
+    conn.close()
+    return version
+
+
+def carry_tables(conn: sqlite3.Connection, previous: Path) -> List[str]:
+    """
+    Copia as CARRIED_TABLES (com os índices) do banco publicado anterior.
+    Retorna as tabelas copiadas.
+    """
+    if not previous.exists():
+        return []
+    conn.execute("ATTACH DATABASE ? AS anterior", (str(previous),))
+    tables = [
+        name
+        for (name,) in conn.execute("SELECT name FROM anterior.sqlite_master WHERE type = 'table'")
+        if name in CARRIED_TABLES
+    ]
+    for name in tables:
+        schema = conn.execute(
+            "SELECT sql FROM anterior.sqlite_master WHERE tbl_name = ? AND sql IS NOT NULL "
+            "ORDER BY type = 'index'",
+            (name,),
+        ).fetchall()
+        for (sql,) in schema:
+            conn.execute(sql)
+        conn.execute(f"INSERT INTO main.{name} SELECT * FROM anterior.{name}")
+    conn.execute("DETACH DATABASE anterior")
+    return tables
+
+
+def source_date(cursor: sqlite3.Cursor, source: Path) -> str:
+    """
+    Data da coleta mais recente da origem; a data de modificação do arquivo
+    quando downloaded_at não foi preenchido.
+    """
+    last = cursor.execute(f"SELECT max(downloaded_at) FROM {STATE_TABLE}").fetchone()[0]
+    return last or date.fromtimestamp(source.stat().st_mtime).isoformat()
+
+
+def build_publication(
+    source: str, target: str, page_size: int = 8192, batch_size: int = 500, delta_dir: str = None
+) -> Dict[str, float]:
+    """
+    Constrói o banco publicado a partir do banco de coleta.
+
+    Atributos:
+        source: banco de coleta (layout single ou split).
+        target: arquivo de saída; é substituído se existir, só depois que o
+            build termina (em caso de erro o arquivo anterior fica intacto).
+        page_size: tamanho de página do banco publicado.
+        batch_size: linhas por executemany.
+        delta_dir: diretório do pacote de diferenças para a versão anterior
+            (gerado só quando o arquivo substituído tem versão).
+
+    Retorna estatísticas da execução (linhas, tempo, tamanho).
+    """
+    start = time.perf_counter()
+    target_path = Path(target)
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target_path.with_name(f"{target_path.name}.build")
+    new_path = target_path.with_name(f"{target_path.name}.new")
+    for path in (tmp_path, new_path):
+        if path.exists():
+            path.unlink()
+    base_version = previous_version(target_path)
+
+    src_conn = conn = None
+    try:
+        src_conn = sqlite3.connect(f"file:{Path(source).resolve().as_posix()}?mode=ro", uri=True)
+        src_cursor = src_conn.cursor()
+        created_at = source_date(src_cursor, Path(source))
+        src_cols = tuple(COLUMNS_MAPPING)
+        dest_cols = tuple(COLUMNS_MAPPING.values())
+        src_cursor.execute(
+            f"SELECT {', '.join(src_cols)} FROM {document_source(detect_layout(src_cursor))} ORDER BY id"
+        )
+
+        conn = open_bulk_target(tmp_path, page_size)
+        conn.execute(PUBLISH_TABLE)
+        insert_string = (
+            f"INSERT INTO acordaos ({', '.join(dest_cols)}) "
+            f"VALUES ({', '.join('?' for _ in dest_cols)})"
+        )
+        rows = 0
+        conn.execute("BEGIN")
+        while True:
+            batch = src_cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            conn.executemany(insert_string, [transform_row(row, src_cols) for row in batch])
+            rows += len(batch)
+        conn.execute("COMMIT")
+        src_conn.close()
+        load_time = time.perf_counter() - start
+
+        create_indexes(conn.cursor(), PUBLISH_INDEXES)
+        # tabelas de contagem dos painéis, mantidas depois pelos triggers de acordaos
+        refresh_aggregates(conn, full=True)
+        stamp_version(conn, base_version + 1, created_at)
+        carried = carry_tables(conn, target_path)
+        conn.execute("ANALYZE")
+        conn.execute("VACUUM INTO ?", (str(new_path),))
+        conn.close()
+        delta = None
+        if delta_dir and base_version:
+            delta = create_delta(str(target_path), str(new_path), delta_dir)
+    except BaseException:
+        # o arquivo publicado só é trocado no fim: uma falha não o altera
+        for open_conn in (src_conn, conn):
+            if open_conn is not None:
+                open_conn.close()
+        if new_path.exists():
+            new_path.unlink()
+        raise
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    # rename: quem está lendo o arquivo anterior continua com ele aberto
+    new_path.replace(target_path)
+    return {
+        "linhas": rows,
+        "versao": base_version + 1,
+        "delta": delta,
+        "tabelas_mantidas": carried,
+        "carga_s": load_time,
+        "total_s": time.perf_counter() - start,
+        "tamanho_mb": target_path.stat().st_size / 1024 ** 2,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera o banco publicado em uma passada.")
+    parser.add_argument("--source", default="./db/acordaos-download.db")
+    parser.add_argument("--target", default="./db/tcu-acordaos.db")
+    parser.add_argument("--page-size", type=int, default=8192)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--delta-dir", default=None, help="gera o pacote de diferenças da versão anterior")
+    args = parser.parse_args()
+    stats = build_publication(args.source, args.target, args.page_size, args.batch_size, args.delta_dir)
+    print(
+        f"{stats['linhas']} acórdãos gravados em {args.target}, versão {stats['versao']} "
+        f"(carga {stats['carga_s']:.1f}s, total {stats['total_s']:.1f}s, "
+        f"{stats['tamanho_mb']:.1f}MB)"
+    )
+    if stats["tabelas_mantidas"]:
+        print(f"Tabelas mantidas do arquivo anterior: {', '.join(stats['tabelas_mantidas'])}.")
+    if stats["delta"]:
+        delta = stats["delta"]
+        print(
+            f"{delta['arquivo']}: {delta['insert']} inserções, {delta['update']} alterações, "
+            f"{delta['delete']} remoções ({delta['bytes'] / 1024 ** 2:.1f}MB)"
+        )
+
+
+if __name__ == "__main__":
+    main()
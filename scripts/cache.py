@@ -0,0 +1,175 @@
+"""
+Cache LRU limitado em bytes para as buscas de acórdãos por urn e numero_acordao.
+
+Cada entrada pesa o tamanho em memória dos seus textos, de forma que poucos
+acórdãos grandes do Plenário não expulsem milhares de registros pequenos
+sem que isso apareça nas estatísticas. O cache é esvaziado quando a versão
+do arquivo do banco muda (rebuild ou publicação de nova versão).
+"""
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Union
+
+from scripts.reader import ALL_COLUMNS, Acordao, AcordaosReader, database_version
+
+LOOKUP_COLUMNS = ("urn", "numero_acordao")
+
+
+def record_size(record: Acordao) -> int:
+    """
+    Tamanho aproximado em memória de um registro com todos os textos carregados.
+    """
+    size = sys.getsizeof(record)
+    for col in ALL_COLUMNS:
+        if record.is_loaded(col):
+            size += sys.getsizeof(getattr(record, col))
+    return size
+
+
+class LRUCache:
+    """
+    Cache LRU cujo limite é a soma dos pesos das entradas, e não a quantidade.
+
+    Atributos:
+        max_bytes: soma máxima dos pesos mantidos em memória.
+        on_evict: chamada com (chave, valor) a cada entrada removida por falta de espaço.
+    """
+
+    def __init__(self, max_bytes: int, on_evict: Callable = None):
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    def get(self, key: Hashable, default=None):
+        try:
+            value, _ = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value, size: int) -> bool:
+        """
+        Insere a entrada. Entradas maiores que o próprio cache não são armazenadas.
+        """
+        if size > self.max_bytes:
+            self.rejected += 1
+            return False
+        if key in self.entries:
+            self.current_bytes -= self.entries.pop(key)[1]
+        self.entries[key] = (value, size)
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            old_key, (old_value, old_size) = self.entries.popitem(last=False)
+            self.current_bytes -= old_size
+            self.evictions += 1
+            self.evicted_bytes += old_size
+            if self.on_evict:
+                self.on_evict(old_key, old_value)
+        return True
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "current_bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes,
+            "rejected": self.rejected,
+        }
+
+
+class DocumentCache:
+    """
+    Busca de acórdãos completos com cache LRU por id e apelidos por urn e
+    numero_acordao, de forma que o mesmo documento não é armazenado duas vezes.
+
+    Atributos:
+        max_bytes: limite de memória do cache (padrão 256MB).
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 ** 2):
+        self.cache = LRUCache(max_bytes, on_evict=self.drop_aliases)
+        self.aliases = {}
+        self.version = None
+        self.invalidations = 0
+        self.lock = threading.Lock()
+
+    def drop_aliases(self, id_: int, record: Acordao) -> None:
+        for col in LOOKUP_COLUMNS:
+            key = (col, getattr(record, col))
+            if self.aliases.get(key) == id_:
+                del self.aliases[key]
+
+    def check_version(self, reader: AcordaosReader) -> None:
+        """
+        Esvazia o cache se o arquivo do banco mudou desde a última busca.
+        """
+        current_version = database_version(reader.path)
+        if current_version != self.version:
+            if self.version is not None:
+                self.invalidations += 1
+            self.cache.clear()
+            self.aliases.clear()
+            self.version = current_version
+
+    def lookup(self, reader: AcordaosReader, col: str, value) -> Union[Acordao, None]:
+        """
+        Busca um acórdão completo por urn ou numero_acordao.
+        """
+        if col not in LOOKUP_COLUMNS:
+            raise ValueError(f"A busca em cache aceita apenas {', '.join(LOOKUP_COLUMNS)}.")
+        key = (col, value)
+        with self.lock:
+            self.check_version(reader)
+            id_ = self.aliases.get(key)
+            if id_ is not None:
+                record = self.cache.get(id_)
+                if record is not None:
+                    return record
+                del self.aliases[key]
+            else:
+                self.cache.misses += 1
+        record = reader.get_by(col, value, columns=ALL_COLUMNS)
+        if record is None:
+            return None
+        with self.lock:
+            if self.cache.put(record.id, record, record_size(record)):
+                self.aliases[key] = record.id
+        return record
+
+    def invalidate(self) -> None:
+        with self.lock:
+            self.cache.clear()
+            self.aliases.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        with self.lock:
+            stats = self.cache.stats()
+            stats["aliases"] = len(self.aliases)
+            stats["invalidations"] = self.invalidations
+            return stats
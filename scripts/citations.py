@@ -0,0 +1,369 @@
+"""
+Grafo de citações entre acórdãos.
+
+Os textos (acordao, relatorio e voto) são percorridos em paralelo em busca de
+referências como "Acórdão 1.234/2015-TCU-Plenário", "Acórdão TCU 123/2015-Plenário"
+ou "Acórdãos 10/2010 e 25/2011 - 2ª Câmara" (o colegiado informado depois de
+uma enumeração vale para os itens anteriores que não têm o seu). Cada
+referência é resolvida para a urn do acórdão citado
+pela chave (número, ano, colegiado), montada a partir de numero_acordao
+("1234/2015") e do sufixo de numero_ata ("20/2015-Plenário").
+
+As arestas ficam na tabela `citacoes` do próprio banco, indexada nos dois
+sentidos, e o processamento é incremental: `citacoes_processados` guarda a
+versão do conteúdo de cada documento lido (scripts.storage.corpus_versions) e
+só os documentos novos ou alterados são lidos; as citações anteriores de um
+documento alterado são substituídas e as dos documentos que saíram do banco
+apagadas. Citações sem destino conhecido (acórdão ainda não coletado, ou
+número e ano presentes em mais de um colegiado sem que o texto informe qual)
+ficam com urn_destino nulo. A cada atualização os destinos de todas as
+citações são conferidos de novo com as chaves atuais, de forma que uma chave
+sem colegiado que passou a ser ambígua deixa de apontar para a urn antiga.
+
+Funciona com o banco publicado (tabela acordaos) e com o banco de coleta, nos
+layouts single e split (apenas documentos com was_downloaded = 1). O banco
+publicado é recriado a cada build; scripts.build_publication copia as duas
+tabelas do arquivo anterior e a atualização seguinte lê só as urns cujo hash
+mudou.
+
+Uso:
+    python -m scripts.citations update [--db ./db/tcu-acordaos.db] [--workers 4] [--rebuild]
+    python -m scripts.citations in <urn> [--db ...]
+    python -m scripts.citations out <urn> [--db ...]
+"""
+import argparse
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from scripts.storage import corpus_source, corpus_versions
+
+TEXT_COLUMNS = ("acordao", "relatorio", "voto")
+
+CITATION_TABLES = """
+CREATE TABLE IF NOT EXISTS citacoes (
+        urn_origem TEXT NOT NULL,
+        numero INTEGER NOT NULL,
+        ano INTEGER NOT NULL,
+        colegiado TEXT NOT NULL,
+        campo TEXT NOT NULL,
+        ocorrencias INTEGER NOT NULL,
+        urn_destino TEXT,
+        PRIMARY KEY (urn_origem, numero, ano, colegiado, campo)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS citacoesdestino ON citacoes(urn_destino, urn_origem);
+CREATE INDEX IF NOT EXISTS citacoespendentes ON citacoes(numero, ano) WHERE urn_destino IS NULL;
+CREATE INDEX IF NOT EXISTS citacoeschave ON citacoes(numero, ano, colegiado);
+CREATE TABLE IF NOT EXISTS citacoes_processados (urn TEXT NOT NULL PRIMARY KEY, versao TEXT) WITHOUT ROWID;
+"""
+
+COLEGIADOS = {
+    "plenario": "Plenário",
+    "primeira camara": "Primeira Câmara",
+    "1a camara": "Primeira Câmara",
+    "segunda camara": "Segunda Câmara",
+    "2a camara": "Segunda Câmara",
+}
+
+NUMBER = r"\d{1,3}(?:\.\d{3})+|\d+"
+COLEGIADO = (
+    r"plen[áa]rio|(?:primeira|segunda|[12]\s*[ªºa°]?)\s*c[âa]mara"
+)
+# número/ano seguido, opcionalmente, do colegiado ("-TCU-Plenário", " - 1ª Câmara")
+REFERENCE = re.compile(
+    rf"({NUMBER})\s*/\s*(\d{{4}})(?:\s*[-–—]\s*(?:TCU\s*[-–—]\s*)?({COLEGIADO}))?",
+    re.IGNORECASE,
+)
+# "Acórdão nº 1.234/2015", "Acórdão TCU 123/2015" ou listas como "Acórdãos 10/2010, 12/2010 e 25/2011"
+CITATION = re.compile(
+    rf"ac[óo]rd[ãa]os?\s+(?:TCU\s*[-–—]?\s*)?(?:n(?:[º°o]s?|\.)\.?\s*)?"
+    rf"(?:{REFERENCE.pattern})(?:\s*(?:,|\be\b)\s*(?:n[º°o]\.?\s*)?(?:{REFERENCE.pattern}))*",
+    re.IGNORECASE,
+)
+NUMERO_ACORDAO = re.compile(rf"({NUMBER})\s*/\s*(\d{{4}})")
+
+
+def normalize_colegiado(text: str) -> str:
+    """
+    Nome canônico do colegiado ("" quando não informado ou desconhecido).
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"[º°ª]", "a", text)
+    text = re.sub(r"(\d)\s*(?=camara)", r"\1a ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return COLEGIADOS.get(text, "")
+
+
+def parse_number(text: str) -> int:
+    return int(text.replace(".", ""))
+
+
+def extract_citations(text: str) -> Counter:
+    """
+    Conta as referências (número, ano, colegiado) encontradas no texto.
+    """
+    found = Counter()
+    if not text:
+        return found
+    for citation in CITATION.finditer(text):
+        references = [reference.groups() for reference in REFERENCE.finditer(citation.group(0))]
+        # "Acórdãos 10/2010, 12/2010 e 25/2011 - 1ª Câmara": o colegiado do fim vale
+        # para os itens anteriores sem colegiado próprio
+        colegiado = ""
+        for numero, ano, text_colegiado in reversed(references):
+            colegiado = normalize_colegiado(text_colegiado) or colegiado
+            found[(parse_number(numero), int(ano), colegiado)] += 1
+    return found
+
+
+def extract_batch(rows: Sequence[Tuple]) -> List[Tuple]:
+    """
+    Executado nos processos auxiliares: recebe (urn, versão, acordao, relatorio,
+    voto) e retorna as linhas da tabela citacoes, ainda sem urn_destino.
+    """
+    edges = []
+    for urn, _, *texts in rows:
+        for campo, text in zip(TEXT_COLUMNS, texts):
+            for (numero, ano, colegiado), count in extract_citations(text).items():
+                edges.append((urn, numero, ano, colegiado, campo, count))
+    return edges
+
+
+def document_keys(cursor: sqlite3.Cursor) -> Dict[Tuple[int, int, str], str]:
+    """
+    Chave (número, ano, colegiado) -> urn. A chave sem colegiado também é
+    registrada e aponta para None quando número e ano se repetem entre colegiados.
+    """
+    source, condition = corpus_source(cursor)
+    keys = {}
+    cursor.execute(f"SELECT urn, numero_acordao, numero_ata FROM {source} WHERE {condition}")
+    for urn, numero_acordao, numero_ata in cursor:
+        match = NUMERO_ACORDAO.search(numero_acordao or "")
+        if not match:
+            continue
+        numero, ano = parse_number(match.group(1)), int(match.group(2))
+        colegiado = normalize_colegiado((numero_ata or "").rpartition("-")[2])
+        if colegiado:
+            keys[(numero, ano, colegiado)] = urn
+        generic = (numero, ano, "")
+        keys[generic] = urn if keys.get(generic, urn) == urn else None
+    return keys
+
+
+def create_citation_tables(cursor: sqlite3.Cursor) -> None:
+    existing_cols = {row[1] for row in cursor.execute("PRAGMA table_info(citacoes_processados)")}
+    if existing_cols and "versao" not in existing_cols:
+        # tabela anterior à versão do conteúdo: documentos com versão conhecida são lidos de novo
+        cursor.execute("ALTER TABLE citacoes_processados ADD COLUMN versao TEXT")
+    cursor.executescript(CITATION_TABLES)
+
+
+def iter_pending_batches(
+    cursor: sqlite3.Cursor, batch_size: int
+) -> Iterator[List[Tuple]]:
+    """
+    Lotes de (urn, versão, acordao, relatorio, voto) dos documentos não
+    processados ou processados em outra versão do conteúdo. Os ids são lidos
+    antes, para que as gravações não interfiram na leitura.
+    """
+    source, condition, urn_column, version = corpus_versions(cursor)
+    ids = [
+        row[0]
+        for row in cursor.execute(
+            f"SELECT id FROM {source} WHERE {condition} AND NOT EXISTS "
+            f"(SELECT 1 FROM citacoes_processados p WHERE p.urn = {urn_column} AND p.versao IS {version}) "
+            "ORDER BY id"
+        )
+    ]
+    select_string = f"SELECT urn, {version}, {', '.join(TEXT_COLUMNS)} FROM {source} WHERE id IN "
+    for start in range(0, len(ids), batch_size):
+        batch_ids = ids[start : start + batch_size]
+        yield cursor.execute(
+            select_string + f"({', '.join('?' for _ in batch_ids)})", batch_ids
+        ).fetchall()
+
+
+def resolve_destinations(cursor: sqlite3.Cursor, keys: Dict[Tuple[int, int, str], str]) -> int:
+    """
+    Confere urn_destino de todas as citações com as chaves atuais: resolve as
+    que estavam sem destino e corrige (ou anula) as que apontam para outra urn,
+    como uma chave sem colegiado que passou a ser ambígua. Retorna quantas
+    chaves mudaram de destino.
+    """
+    current = cursor.execute(
+        "SELECT DISTINCT numero, ano, colegiado, urn_destino FROM citacoes"
+    ).fetchall()
+    changed = {
+        (numero, ano, colegiado): keys.get((numero, ano, colegiado))
+        for numero, ano, colegiado, destino in current
+        if keys.get((numero, ano, colegiado)) != destino
+    }
+    cursor.executemany(
+        "UPDATE citacoes SET urn_destino = ? WHERE numero = ? AND ano = ? AND colegiado = ?",
+        [(destino, *key) for key, destino in changed.items()],
+    )
+    # o cabeçalho do próprio acórdão não é citação (ver store_batch)
+    cursor.execute("DELETE FROM citacoes WHERE urn_destino = urn_origem")
+    return len(changed)
+
+
+def remove_missing(cursor: sqlite3.Cursor) -> int:
+    """
+    Apaga as citações e o controle dos documentos que não estão mais no banco.
+    """
+    source, condition, urn_column, _ = corpus_versions(cursor)
+    missing = cursor.execute(
+        "SELECT urn FROM citacoes_processados p WHERE NOT EXISTS "
+        f"(SELECT 1 FROM {source} WHERE {urn_column} = p.urn AND {condition})"
+    ).fetchall()
+    cursor.executemany("DELETE FROM citacoes WHERE urn_origem = ?", missing)
+    cursor.executemany("DELETE FROM citacoes_processados WHERE urn = ?", missing)
+    return len(missing)
+
+
+def update_citations(
+    strcnx: str, workers: int = None, batch_size: int = 200, rebuild: bool = False
+) -> Dict[str, float]:
+    """
+    Extrai as citações dos documentos novos ou alterados e atualiza o grafo.
+
+    Atributos:
+        workers: processos de extração (padrão: quantidade de CPUs).
+        batch_size: documentos enviados por vez a cada processo.
+        rebuild: apaga o grafo e processa todos os documentos de novo.
+    """
+    start = time.perf_counter()
+    conn = sqlite3.connect(strcnx)
+    cursor = conn.cursor()
+    if rebuild:
+        cursor.executescript("DROP TABLE IF EXISTS citacoes; DROP TABLE IF EXISTS citacoes_processados;")
+    create_citation_tables(cursor)
+    removed = remove_missing(cursor)
+    conn.commit()
+    keys = document_keys(cursor)
+
+    insert_string = (
+        "INSERT OR REPLACE INTO citacoes "
+        "(urn_origem, numero, ano, colegiado, campo, ocorrencias, urn_destino) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)"
+    )
+    documents = edges = 0
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # lotes enviados sob demanda: no máximo 2 por processo aguardando
+        window = []
+        for batch in iter_pending_batches(conn.cursor(), batch_size):
+            window.append((batch, executor.submit(extract_batch, batch)))
+            if len(window) < 2 * workers:
+                continue
+            documents, edges = store_batch(conn, keys, insert_string, window.pop(0), documents, edges)
+        while window:
+            documents, edges = store_batch(conn, keys, insert_string, window.pop(0), documents, edges)
+
+    resolved_later = resolve_destinations(cursor, keys)
+    conn.commit()
+    unresolved = cursor.execute(
+        "SELECT count(*) FROM citacoes WHERE urn_destino IS NULL"
+    ).fetchone()[0]
+    conn.close()
+    return {
+        "documentos": documents,
+        "removidos": removed,
+        "citacoes": edges,
+        "chaves_resolvidas_depois": resolved_later,
+        "sem_destino": unresolved,
+        "total_s": time.perf_counter() - start,
+    }
+
+
+def store_batch(
+    conn: sqlite3.Connection,
+    keys: Dict[Tuple[int, int, str], str],
+    insert_string: str,
+    submitted: Tuple,
+    documents: int,
+    edges: int,
+) -> Tuple[int, int]:
+    """
+    Grava as arestas de um lote já processado (substituindo as de uma versão
+    anterior do documento) e marca seus documentos.
+    """
+    batch, future = submitted
+    conn.executemany("DELETE FROM citacoes WHERE urn_origem = ?", [(row[0],) for row in batch])
+    rows = []
+    for urn, numero, ano, colegiado, campo, count in future.result():
+        destino = keys.get((numero, ano, colegiado))
+        # o cabeçalho do próprio acórdão ("ACÓRDÃO Nº 1234/2015 - TCU - Plenário") não é citação
+        if destino == urn:
+            continue
+        rows.append((urn, numero, ano, colegiado, campo, count, destino))
+    conn.executemany(insert_string, rows)
+    conn.executemany(
+        "INSERT OR REPLACE INTO citacoes_processados (urn, versao) VALUES (?, ?)",
+        [(row[0], row[1]) for row in batch],
+    )
+    conn.commit()
+    return documents + len(batch), edges + len(rows)
+
+
+def in_links(cursor: sqlite3.Cursor, urn: str) -> List[Tuple[str, str, int]]:
+    """
+    Acórdãos que citam a urn: (urn_origem, campo, ocorrencias).
+    """
+    return cursor.execute(
+        "SELECT urn_origem, campo, ocorrencias FROM citacoes WHERE urn_destino = ? "
+        "ORDER BY urn_origem, campo",
+        (urn,),
+    ).fetchall()
+
+
+def out_links(cursor: sqlite3.Cursor, urn: str) -> List[Tuple[str, str, int]]:
+    """
+    Acórdãos citados pela urn: (urn_destino, campo, ocorrencias). Citações sem
+    destino conhecido não são retornadas.
+    """
+    return cursor.execute(
+        "SELECT urn_destino, campo, ocorrencias FROM citacoes "
+        "WHERE urn_origem = ? AND urn_destino IS NOT NULL ORDER BY urn_destino, campo",
+        (urn,),
+    ).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grafo de citações entre acórdãos.")
+    parser.add_argument("command", choices=("update", "in", "out"))
+    parser.add_argument("urn", nargs="?")
+    parser.add_argument("--db", default="./db/tcu-acordaos.db")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "update":
+        stats = update_citations(args.db, args.workers, args.batch_size, args.rebuild)
+        print(
+            f"{stats['documentos']} documentos processados, {stats['removidos']} removidos, "
+            f"{stats['citacoes']} citações gravadas "
+            f"({stats['chaves_resolvidas_depois']} chaves com destino atualizado, "
+            f"{stats['sem_destino']} citações sem destino) em {stats['total_s']:.1f}s"
+        )
+        return
+    if not args.urn:
+        parser.error("informe a urn")
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    links = in_links if args.command == "in" else out_links
+    for urn, campo, count in links(conn.cursor(), args.urn):
+        print(f"{urn}\t{campo}\t{count}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
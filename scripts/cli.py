@@ -0,0 +1,100 @@
+"""
+Linha de comando única dos scripts do projeto.
+
+    python -m scripts <comando> [argumentos do comando]
+    python -m scripts --help
+
+Os módulos de cada comando só são importados quando o comando é executado, de
+forma que `python -m scripts build-publication` não carrega pandas, selenium
+ou scrapy. Comandos com `main()` recebem os argumentos pelo argparse do
+próprio módulo; os scripts procedurais (sem argumentos) são executados como
+`python -m scripts.<modulo>`.
+
+O tempo de partida de cada comando é medido por benchmarks/startup.py.
+"""
+import importlib
+import runpy
+import sys
+from typing import List
+
+# comando -> (módulo, descrição)
+COMMANDS = {
+    "build-publication": ("scripts.build_publication", "gera o banco publicado em uma passada"),
+    "aggregates": ("scripts.aggregates", "atualiza e consulta as tabelas de contagem dos painéis"),
+    "citations": ("scripts.citations", "grafo de citações entre acórdãos"),
+    "near-duplicates": ("scripts.near_duplicates", "quase-duplicatas com MinHash/LSH"),
+    "token-export": ("scripts.token_export", "exporta o corpus tokenizado em .npy"),
+    "membership": ("scripts.membership", "tamanho do conjunto de urns baixadas usado pelo spider"),
+    "delta": ("scripts.delta", "versões do banco publicado e pacotes de diferenças (create/apply)"),
+    "export": ("scripts.export", "exporta o banco publicado em CSV/JSONL, um arquivo por ano"),
+    "scan": ("scripts.scan", "varreduras paralelas do banco publicado (regex, estatísticas)"),
+    "service": ("scripts.service", "serviço HTTP de consulta ao banco publicado"),
+    "query-advisor": ("scripts.query_advisor", "planos de execução das consultas conhecidas"),
+    "fetch": ("scripts.fetch_engine", "recoleta asyncio pela api do TCU (chaves já conhecidas)"),
+    "crawl": ("scripts.crawler", "coleta com selenium (AcordaosTCU) das urls pendentes"),
+    "create-db": ("scripts.create-db", "cria o banco de coleta"),
+    "load-raw-data": ("scripts.load_raw_data_into_db", "carrega os dados brutos (csv/json) no banco de coleta"),
+    "load-json": ("scripts.load_json_into_db", "atualiza o banco de coleta com os json processados"),
+    "create-url-list": ("scripts.create_url_list_to_crawl", "gera a lista de urls pendentes"),
+    "parse-log": ("scripts.parse_log", "lista as urns com erro nos logs de coleta"),
+    "parse-log-into-db": ("scripts.parse_log_into_db", "marca no banco os documentos baixados segundo os logs"),
+    "delete-from-db": ("scripts.delete_from_db", "remove do banco as urns listadas no log"),
+    "migrate-dates": ("scripts.migrate_dates", "normaliza as datas do banco de coleta"),
+    "split-download-db": ("scripts.split_download_db", "converte o banco de coleta para o layout split"),
+    "shard-download-db": ("scripts.shard_download_db", "divide o banco de coleta por ano"),
+}
+# comandos que chamam o main() do módulo; os demais são scripts procedurais
+MAIN_COMMANDS = {
+    "build-publication",
+    "aggregates",
+    "citations",
+    "near-duplicates",
+    "token-export",
+    "membership",
+    "service",
+    "query-advisor",
+    "fetch",
+    "scan",
+    "export",
+    "delta",
+}
+
+
+def usage() -> str:
+    width = max(len(name) for name in COMMANDS)
+    lines = ["Uso: python -m scripts <comando> [argumentos]", "", "Comandos:"]
+    lines.extend(f"  {name:<{width}}  {description}" for name, (_, description) in COMMANDS.items())
+    lines.append("")
+    lines.append("Os comandos com argumentos aceitam --help.")
+    return "\n".join(lines)
+
+
+def crawl() -> None:
+    from scripts.crawler import AcordaosTCU
+    from scripts.funcs import initiate_webdriver
+
+    acordaos = AcordaosTCU(initiate_webdriver())
+    acordaos.get_urls()
+    acordaos.parse_urls()
+
+
+def main(argv: List[str] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return 0
+    name, *args = argv
+    if name not in COMMANDS:
+        print(f"Comando desconhecido: {name}\n\n{usage()}", file=sys.stderr)
+        return 2
+    module_name, _ = COMMANDS[name]
+    sys.argv = [f"python -m scripts {name}", *args]
+    if name == "crawl":
+        crawl()
+    elif name in MAIN_COMMANDS:
+        # import normal (e não runpy) para que as funções enviadas aos
+        # processos auxiliares possam ser localizadas pelo pickle
+        importlib.import_module(module_name).main()
+    else:
+        runpy.run_module(module_name, run_name="__main__")
+    return 0
@@ -0,0 +1,77 @@
+"""
+Funções de banco de dados e de texto usadas pelos scripts, sem dependências
+fora da biblioteca padrão.
+
+Importar este módulo não carrega pandas, selenium ou loguru, não lê o
+config.ini e não cria arquivos de log: os utilitários que só precisam do banco
+partem daqui. scripts.funcs reexporta estas funções para o código existente.
+"""
+import re
+import sqlite3
+from pathlib import Path
+from typing import Iterable, List, Tuple, Union
+
+from scripts.urn import LEXML_URL_FINDER, urn_from_url  # LEXML_URL_FINDER: reexportado por scripts.funcs
+
+CPF_FINDER = re.compile(r"[0-9]{3}\.[0-9]{3}\.[0-9]{3}-[0-9]{2}")
+
+
+def initiate_db(strcnx: str) -> Tuple[sqlite3.Connection, sqlite3.Cursor]:
+    """
+    Conecta no banco sqlite
+
+    Atributos:
+        strcnx: string de conexão.
+    """
+    strcnx_is_valid = Path(strcnx)
+    if not strcnx_is_valid.is_file():
+        raise FileNotFoundError("O arquivo sqlite3 não existe.")
+    conn = sqlite3.connect(strcnx)
+    cur = conn.cursor()
+    return conn, cur
+
+
+def insert_into_db(
+    data: Tuple, table_name: str, cols_names: List[str], cursor: sqlite3.Cursor
+) -> None:
+    cols_to_insert = f"({','.join(cols_names)})"
+    question_mark_str = f"({','.join(['?' for col in cols_names])})"
+    insert_string = (
+        f"INSERT INTO {table_name} {cols_to_insert} VALUES {question_mark_str}"
+    )
+    cursor.executemany(insert_string, data)
+
+
+def search_for_urn(logmsg: str) -> str:
+    """
+    Encontra urns nas mensagens de log ("... coleta do link <url>.").
+    """
+    return urn_from_url(logmsg[:-1])
+
+
+def query_db(query_string: str, cursor: sqlite3.Cursor):
+    yield cursor.execute(query_string).fetchall()
+
+
+def mask_cnpj(texto: str) -> Union[str, None]:
+    """
+    Anonimização de CPF
+
+    Retorna o texto com os CPFs mascarados ou None quando não há CPF no texto.
+    """
+    if isinstance(texto, str):
+        formatted_text, n_cpfs = CPF_FINDER.subn(
+            lambda cpf: f"XXX-{cpf.group(0)[4:-3]}-XX", texto
+        )
+        if n_cpfs:
+            return formatted_text
+    return None
+
+
+def ResultIter(cursor: sqlite3.Cursor, query: str) -> Union[Iterable, None]:
+    'An iterator to keep memory usage down on quering database'
+    results = cursor.execute(query).fetchall()
+    if not results:
+        yield None
+    for result in results:
+        yield result
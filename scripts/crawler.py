@@ -14,10 +14,33 @@ from loguru import logger
 from datetime import datetime
 import sqlite3
 from configparser import ConfigParser
-import re
+import time
+from scripts.dates import normalize_date
+from scripts.metrics import (
+    DOCUMENT_BYTES,
+    DOCUMENTS,
+    ERRORS,
+    REGISTRY,
+    STAGE_SECONDS,
+    document_size,
+)
+from scripts.storage import SPLIT, detect_layout, update_document
+from scripts.urn import urn_from_url
+
+_log_file = None
+
 
-datetime_now = datetime.now().strftime("%Y-%m-%d").replace("-", "_")
-logger.add(f"./logs/{datetime_now}_file.log")
+def add_log_file(directory: str = "./logs") -> str:
+    """
+    Registra o arquivo de log diário da coleta (uma única vez por processo).
+    Chamado ao iniciar a coleta, e não na importação do módulo.
+    """
+    global _log_file
+    if _log_file is None:
+        datetime_now = datetime.now().strftime("%Y-%m-%d").replace("-", "_")
+        _log_file = f"{directory}/{datetime_now}_file.log"
+        logger.add(_log_file)
+    return _log_file
 
 firefox_webdriver = firefox.webdriver.WebDriver
 firefox_webelements = firefox.webelement.FirefoxWebElement
@@ -29,12 +52,18 @@ class AcordaosTCU:
     config.read("config.ini")
     table = config["db"]["tablename"]
     dbname = config["db"]["name"]
+    # arquivo .prom com as métricas da coleta (opcional)
+    metrics_textfile = config.get("metrics", "textfile", fallback=None)
+    crawler_name = "acordaostcu"
 
     def __init__(self, driver: firefox_webdriver):
         if not isinstance(driver, firefox_webdriver):
             raise TypeError("A classe deve ser iniciada com um webdriver firefox.")
         self.driver = driver
+        add_log_file()
         self.conn, self.cursor = AcordaosTCU.initiate_db()
+        # o layout não muda durante a coleta: detectado uma vez, não a cada registro
+        self.layout = detect_layout(self.cursor)
 
     def get_urls(self, **kwargs):
         # seleciona apenas as urns que não foram coletadas
@@ -51,6 +80,7 @@ class AcordaosTCU:
         for urls in self.urls:
             for tupurl in reversed(urls):
                 url = tupurl[0]
+                lexml_fetch_start = time.perf_counter()
                 self.driver.get(url)
                 # localiza no dom o container de "Outras Publicações"
                 target_class = "panel-body"
@@ -59,11 +89,17 @@ class AcordaosTCU:
                         EC.presence_of_element_located((By.CLASS_NAME, target_class))
                     )
                 except (NoSuchElementException, TimeoutException) as error:
+                    ERRORS.inc(crawler=self.crawler_name, stage="lexml_fetch")
                     logger.warning("Não foi encontrado o elemento Outras Publicações.")
                 else:
                     target_container = self.driver.find_elements_by_class_name(
                         target_class
                     )
+                STAGE_SECONDS.observe(
+                    time.perf_counter() - lexml_fetch_start,
+                    crawler=self.crawler_name,
+                    stage="lexml_fetch",
+                )
 
                 # coleta os links originais do normativo
                 filter_elems = self.filter_elements_of_interest(
@@ -76,6 +112,7 @@ class AcordaosTCU:
                         href = elem.find_elements_by_class_name("noprint")[
                             0
                         ].get_attribute("href")
+                        tcu_fetch_start = time.perf_counter()
                         self.driver.get(href)
                         # identificar se o elemento de ajuda está presente na página
                         pop_up_classname = (
@@ -90,6 +127,7 @@ class AcordaosTCU:
                                 )
                             )
                         except (NoSuchElementException, TimeoutException) as error:
+                            ERRORS.inc(crawler=self.crawler_name, stage="tcu_fetch")
                             logger.warning(
                                 "Não foi encontrado elemento de ajuda na página."
                             )
@@ -127,19 +165,36 @@ class AcordaosTCU:
                                     elemento_ajuda.find_element_by_class_name(
                                         "modal-close"
                                     ).click()
-                            # coleta os dados de interesse
-                            dados_acordao = self.coleta_dados_pagina_acordao(
-                                self.driver
+                            STAGE_SECONDS.observe(
+                                time.perf_counter() - tcu_fetch_start,
+                                crawler=self.crawler_name,
+                                stage="tcu_fetch",
                             )
+                            # coleta os dados de interesse
+                            with STAGE_SECONDS.time(crawler=self.crawler_name, stage="parse"):
+                                dados_acordao = self.coleta_dados_pagina_acordao(
+                                    self.driver
+                                )
                             dados_acordao["url_tcu"] = href
                             dados_acordao["urn"] = AcordaosTCU.search_for_urn(url)
+                            dados_acordao["data_sessao_iso"] = normalize_date(
+                                dados_acordao["data_sessao"]
+                            )
                             dados_acordao = {
                                 key: str(value).replace("\n", "").replace("'", " ")
                                 for key, value in dados_acordao.items()
                             }
                             # atualiza o banco de dados
-                            AcordaosTCU.update_a_record(dados_acordao, self.cursor)
-                            self.conn.commit()
+                            with STAGE_SECONDS.time(crawler=self.crawler_name, stage="db_write"):
+                                AcordaosTCU.update_a_record(dados_acordao, self.cursor, self.layout)
+                            with STAGE_SECONDS.time(crawler=self.crawler_name, stage="db_commit"):
+                                self.conn.commit()
+                            DOCUMENTS.inc(crawler=self.crawler_name)
+                            DOCUMENT_BYTES.observe(
+                                document_size(dados_acordao), crawler=self.crawler_name
+                            )
+                            if self.metrics_textfile:
+                                REGISTRY.write_textfile(self.metrics_textfile)
                             logger.info(f"Finalizado a coleta do link {url}.")
                 else:
                     logger.info("Não há links originais a serem parseados.")
@@ -424,7 +479,20 @@ class AcordaosTCU:
         yield cursor.execute(query_string).fetchall()
 
     @staticmethod
-    def update_a_record(container: Dict, cursor: sqlite3.Cursor) -> None:
+    def update_a_record(container: Dict, cursor: sqlite3.Cursor, layout: str = None) -> None:
+        if layout is None:
+            layout = detect_layout(cursor)
+        if layout == SPLIT:
+            # no layout split o corpo do documento fica em outra tabela
+            values = {
+                key: value
+                for key, value in container.items()
+                if key != "urn" and value and value != "None"
+            }
+            values["was_downloaded"] = 1
+            values["downloaded_at"] = datetime.now().strftime("%Y-%m-%d")
+            update_document(cursor, SPLIT, container["urn"], values)
+            return
         parse_values_to_update = AcordaosTCU.format_update_string(container)
         update_string = f"""
         UPDATE {AcordaosTCU.table}
@@ -453,7 +521,4 @@ class AcordaosTCU:
         """
         Filtra a urn da url que foi realizado o get
         """
-        re_pattern = r"http(s)?:\/\/www\.\w+\.\w+\.\w+\/\w+\/"
-        look_for_urn = re.search(re_pattern, url).span()[1]
-        urn = url[look_for_urn:]
-        return urn
+        return urn_from_url(url)
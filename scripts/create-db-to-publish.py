@@ -1,4 +1,5 @@
-from scripts.funcs import initiate_db
+from scripts.core import initiate_db
+from scripts.schema import PUBLISH_INDEXES, PUBLISH_TABLE, create_indexes
 
 import sqlite3
 from pathlib import Path
@@ -8,31 +9,7 @@ if not rootpathdb.is_dir():
 conn = sqlite3.connect('./db/tcu-acordaos.db')
 cursor = conn.cursor()
 
-cursor.execute("""
-CREATE TABLE acordaos (
-        id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
-        urn TEXT NOT NULL,
-        ano_acordao INTEGER,
-        numero_acordao TEXT,
-        relator TEXT,
-        processo TEXT,
-        tipo_processo TEXT,
-        data_sessao DATE,
-        numero_ata TEXT,
-        interessado_reponsavel_recorrente TEXT,
-        entidade TEXT,
-        representante_mp TEXT,
-        unidade_tecnica TEXT,
-        repr_legal TEXT,
-        assunto TEXT,
-        sumario TEXT,
-        acordao TEXT,
-        quorum TEXT,
-        relatorio TEXT,
-        voto TEXT
-);
-""")
-cursor.execute("CREATE INDEX urnindex ON acordaos(urn);")
-cursor.execute("CREATE INDEX urnyear ON acordaos(ano_acordao);")
+cursor.execute(PUBLISH_TABLE)
+create_indexes(cursor, PUBLISH_INDEXES)
 conn.commit()
 conn.close()
\ No newline at end of file
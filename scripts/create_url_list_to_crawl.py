@@ -1,4 +1,4 @@
-from scripts.funcs import initiate_db
+from scripts.core import initiate_db
 import json
 conn, cur = initiate_db("./db/acordaos-download.db")
 
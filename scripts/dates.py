@@ -0,0 +1,112 @@
+"""
+Normalização das datas (sessão e download) para o formato ISO (aaaa-mm-dd).
+
+Módulo sem dependências externas para poder ser usado tanto pelos scripts
+quanto pelo projeto scrapy.
+"""
+import re
+import sqlite3
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Tuple, Union
+
+# dd/mm/aaaa (formato da API do TCU) e aaaa-mm-dd (formato ISO, com ou sem hora)
+BR_DATE_PATTERN = re.compile(r"^\s*(\d{1,2})/(\d{1,2})/(\d{4})")
+ISO_DATE_PATTERN = re.compile(r"^\s*(\d{4})[-_](\d{1,2})[-_](\d{1,2})")
+
+
+def normalize_date(value: Union[str, date, None]) -> Union[str, None]:
+    """
+    Converte uma data para o formato ISO (aaaa-mm-dd).
+
+    Retorna None quando o valor está vazio ou não representa uma data válida,
+    como os inteiros gravados quando a data foi interpolada sem aspas no SQL
+    (2019-08-31 vira 1980).
+    """
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if not isinstance(value, str):
+        return None
+    br_date = BR_DATE_PATTERN.search(value)
+    if br_date:
+        day, month, year = br_date.groups()
+    else:
+        iso_date = ISO_DATE_PATTERN.search(value)
+        if not iso_date:
+            return None
+        year, month, day = iso_date.groups()
+    try:
+        return date(int(year), int(month), int(day)).isoformat()
+    except ValueError:
+        return None
+
+
+def add_missing_columns(
+    cursor: sqlite3.Cursor, table_name: str, cols_names: List[str]
+) -> None:
+    """
+    Cria as colunas de data que ainda não existem na tabela.
+    """
+    existing_cols = {row[1] for row in cursor.execute(f"PRAGMA table_info({table_name})")}
+    for col in cols_names:
+        if col not in existing_cols:
+            cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {col} DATE")
+
+
+def migrate_dates(
+    conn: sqlite3.Connection,
+    table_name: str,
+    mapping: Dict[str, str],
+    chunk_size: int = 5000,
+    indexes: Iterable[str] = (),
+) -> List[Tuple[int, str, object]]:
+    """
+    Preenche as colunas de data normalizadas em blocos de `chunk_size` linhas.
+
+    Atributos:
+        conn: conexão com o banco sqlite.
+        table_name: tabela a ser migrada.
+        mapping: coluna de origem -> coluna normalizada (pode ser a própria coluna).
+        chunk_size: quantidade de linhas lidas e atualizadas por transação.
+        indexes: comandos CREATE INDEX das colunas normalizadas.
+
+    Retorna a lista (id, coluna, valor) dos valores que não puderam ser convertidos.
+    """
+    cursor = conn.cursor()
+    add_missing_columns(cursor, table_name, list(mapping.values()))
+    for index_string in indexes:
+        cursor.execute(index_string)
+    conn.commit()
+
+    src_cols = list(mapping.keys())
+    dest_cols = list(mapping.values())
+    select_string = (
+        f"SELECT id, {', '.join(src_cols)} FROM {table_name} "
+        "WHERE id > ? ORDER BY id LIMIT ?"
+    )
+    set_string = ", ".join(f"{col} = ?" for col in dest_cols)
+    update_string = f"UPDATE {table_name} SET {set_string} WHERE id = ?"
+
+    invalid_values = []
+    last_id = 0
+    while True:
+        rows = cursor.execute(select_string, (last_id, chunk_size)).fetchall()
+        if not rows:
+            break
+        data_to_update = []
+        for row in rows:
+            normalized = []
+            for col, dest_col, value in zip(src_cols, dest_cols, row[1:]):
+                iso_date = normalize_date(value)
+                if iso_date is None and value not in (None, "", "None"):
+                    invalid_values.append((row[0], col, value))
+                    # na migração in-place o valor original é preservado
+                    if dest_col == col:
+                        iso_date = value
+                normalized.append(iso_date)
+            data_to_update.append((*normalized, row[0]))
+        cursor.executemany(update_string, data_to_update)
+        conn.commit()
+        last_id = rows[-1][0]
+    return invalid_values
@@ -1,15 +1,14 @@
-from scripts.funcs import initiate_db
+from scripts.core import initiate_db
+from scripts.storage import delete_document, detect_layout
 
 conn, cur = initiate_db("./db/acordaos-download.db")
+layout = detect_layout(cur)
 
 with open("./logs/urns_to_delete_3.log", "r", encoding='utf8') as f:
     d = f.readlines()
     for urn in d:
         urn = urn.replace("\n","")
-        query_string = f"""
-        DELETE from download_acordaos 
-        WHERE urn = '{urn}'"""
-        cur.execute(query_string)
+        delete_document(cur, layout, urn)
         conn.commit()
         print(f"Concluído o delete de {urn}.")
 conn.close()
@@ -0,0 +1,357 @@
+"""
+Versões do banco publicado (tcu-acordaos.db) e pacotes de diferenças entre
+versões, para quem mantém uma cópia local e não quer baixar o banco inteiro a
+cada atualização.
+
+A versão é um inteiro gravado em `PRAGMA user_version` e na tabela
+versao_dataset (versão, data e linhas). A data vem dos dados e não do relógio
+(no build, a coleta mais recente do banco de origem), para que a mesma origem
+gere sempre o mesmo arquivo. A tabela versao_hash guarda, para cada
+urn, o sha1 das suas linhas (colunas públicas, sem o id, na ordem do id): duas
+versões são comparadas pelas tabelas de hash, sem ler os textos.
+
+O pacote (acordaos-delta-<base>-<versao>.jsonl.gz) tem uma linha json por
+registro:
+    {"tipo": "cabecalho", "versao_base": 3, "versao": 4, "colunas": [...], ...}
+    {"op": "insert" | "update", "urn": ..., "hash": ..., "linhas": [[...], ...]}
+    {"op": "delete", "urn": ...}
+    {"tipo": "fim", "insert": n, "update": n, "delete": n}
+e vem acompanhado de um .json com o sha256 do arquivo. insert e update trazem
+todas as linhas da urn (normalmente uma) e são aplicados da mesma forma: as
+linhas da urn na cópia local são removidas e as do pacote inseridas. Os ids da
+cópia local não acompanham os do banco publicado (o build atribui os ids de
+novo a cada versão); a chave entre as versões é a urn.
+
+`apply` confere a versão da cópia local e o sha256 do pacote, aplica os
+registros em uma transação, confere o hash das urns alteradas e só então grava
+a nova versão. Os agregados dos painéis são atualizados pelos triggers de
+acordaos e consolidados ao final.
+
+Uso:
+    python -m scripts.delta create --old ./db/tcu-acordaos-v3.db --new ./db/tcu-acordaos.db
+        [--output ./db/deltas]
+    python -m scripts.delta apply --db ./copia/tcu-acordaos.db acordaos-delta-3-4.jsonl.gz [...]
+    python -m scripts.delta stamp --db ./db/tcu-acordaos.db [--version 1] [--date 2024-01-31]
+    python -m scripts.delta info --db ./db/tcu-acordaos.db
+"""
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import sqlite3
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from scripts.aggregates import refresh_aggregates
+from scripts.export import HashingFile, compressed_stream
+from scripts.reader import ALL_COLUMNS, TABLE_NAME
+
+# colunas públicas comparadas entre as versões (o id muda a cada build)
+HASH_COLUMNS = tuple(col for col in ALL_COLUMNS if col != "id")
+
+VERSION_TABLES = """
+CREATE TABLE IF NOT EXISTS versao_dataset (
+        versao INTEGER NOT NULL PRIMARY KEY,
+        criado_em TEXT NOT NULL,
+        linhas INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS versao_hash (
+        urn TEXT NOT NULL PRIMARY KEY,
+        hash BLOB NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def row_digest(row: Sequence) -> bytes:
+    return hashlib.sha1(json.dumps(list(row), ensure_ascii=False).encode("utf8")).digest()
+
+
+def chain_digest(previous: bytes, digest: bytes) -> bytes:
+    """
+    Hash de uma urn com mais de uma linha: encadeia os hashes na ordem do id.
+    """
+    return hashlib.sha1(previous + digest).digest() if previous else digest
+
+
+def compute_hashes(conn: sqlite3.Connection, urns: Iterable[str] = None, batch_size: int = 500) -> Dict[str, bytes]:
+    """
+    Hash das linhas de cada urn (de todas, ou só das urns informadas).
+    """
+    hashes = {}
+    cols = ", ".join(("urn",) + HASH_COLUMNS)
+    if urns is None:
+        cursor = conn.execute(f"SELECT {cols} FROM {TABLE_NAME} ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                hashes[row[0]] = chain_digest(hashes.get(row[0]), row_digest(row[1:]))
+        return hashes
+    for urn in urns:
+        for row in conn.execute(f"SELECT {cols} FROM {TABLE_NAME} WHERE urn = ? ORDER BY id", (urn,)):
+            hashes[urn] = chain_digest(hashes.get(urn), row_digest(row[1:]))
+    return hashes
+
+
+def dataset_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def set_version(conn: sqlite3.Connection, version: int, created_at: str) -> None:
+    rows = conn.execute(f"SELECT count(*) FROM {TABLE_NAME}").fetchone()[0]
+    conn.execute("DELETE FROM versao_dataset")
+    conn.execute(
+        "INSERT INTO versao_dataset (versao, criado_em, linhas) VALUES (?, ?, ?)",
+        (version, created_at, rows),
+    )
+    conn.execute(f"PRAGMA user_version = {int(version)}")
+
+
+def stamp_version(conn: sqlite3.Connection, version: int, created_at: str) -> Dict[str, float]:
+    """
+    Grava a versão e recalcula a tabela versao_hash do banco inteiro.
+
+    Atributos:
+        created_at: data gravada em versao_dataset.criado_em (aaaa-mm-dd).
+    """
+    start = time.perf_counter()
+    conn.executescript(VERSION_TABLES)
+    hashes = compute_hashes(conn)
+    conn.execute("BEGIN")
+    conn.execute("DELETE FROM versao_hash")
+    conn.executemany("INSERT INTO versao_hash (urn, hash) VALUES (?, ?)", sorted(hashes.items()))
+    set_version(conn, version, created_at)
+    conn.execute("COMMIT")
+    return {"versao": version, "urns": len(hashes), "total_s": time.perf_counter() - start}
+
+
+def open_versioned(strcnx: str, mode: str = "ro") -> sqlite3.Connection:
+    conn = sqlite3.connect(f"file:{Path(strcnx).resolve().as_posix()}?mode={mode}", uri=True)
+    conn.isolation_level = None
+    if not dataset_version(conn) or not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'versao_hash'"
+    ).fetchone():
+        conn.close()
+        raise ValueError(f"{strcnx} não tem versão; use `python -m scripts.delta stamp`.")
+    return conn
+
+
+def package_name(base: int, version: int) -> str:
+    return f"acordaos-delta-{base}-{version}.jsonl.gz"
+
+
+def changed_urns(conn: sqlite3.Connection) -> Tuple[List[Tuple[str, bytes, bool]], List[str]]:
+    """
+    Compara main.versao_hash com anterior.versao_hash.
+
+    Retorna as urns novas ou alteradas (urn, hash, é nova) e as removidas.
+    """
+    upserts = conn.execute(
+        "SELECT n.urn, n.hash, o.urn IS NULL FROM main.versao_hash n "
+        "LEFT JOIN anterior.versao_hash o ON o.urn = n.urn "
+        "WHERE o.urn IS NULL OR o.hash <> n.hash ORDER BY n.urn"
+    ).fetchall()
+    deletes = [
+        row[0]
+        for row in conn.execute(
+            "SELECT o.urn FROM anterior.versao_hash o "
+            "LEFT JOIN main.versao_hash n ON n.urn = o.urn WHERE n.urn IS NULL ORDER BY o.urn"
+        )
+    ]
+    return upserts, deletes
+
+
+def create_delta(old: str, new: str, output: str) -> Dict:
+    """
+    Gera o pacote de diferenças de `old` para `new` (bancos publicados com versão).
+
+    Retorna o manifest do pacote, também gravado em <pacote>.json.
+    """
+    start = time.perf_counter()
+    conn = open_versioned(new)
+    old_conn = open_versioned(old)
+    base = dataset_version(old_conn)
+    old_conn.close()
+    version = dataset_version(conn)
+    if version <= base:
+        conn.close()
+        raise ValueError(f"A versão de {new} ({version}) não é posterior à de {old} ({base}).")
+    conn.execute("ATTACH DATABASE ? AS anterior", (f"file:{Path(old).resolve().as_posix()}?mode=ro",))
+    upserts, deletes = changed_urns(conn)
+
+    output_path = Path(output)
+    output_path.mkdir(parents=True, exist_ok=True)
+    path = output_path / package_name(base, version)
+    part_path = path.with_name(f"{path.name}.part")
+    raw = HashingFile(part_path)
+    text = io.TextIOWrapper(compressed_stream(raw, "gzip"), encoding="utf8", newline="")
+    counts = {"insert": 0, "update": 0, "delete": 0}
+    try:
+        header = {
+            "tipo": "cabecalho",
+            "versao_base": base,
+            "versao": version,
+            "colunas": list(HASH_COLUMNS),
+            "criado_em": datetime.now().isoformat(timespec="seconds"),
+            "data_versao": conn.execute("SELECT criado_em FROM main.versao_dataset").fetchone()[0],
+        }
+        text.write(json.dumps(header, ensure_ascii=False) + "\n")
+        for urn, digest, is_new in upserts:
+            rows = conn.execute(
+                f"SELECT {', '.join(HASH_COLUMNS)} FROM {TABLE_NAME} WHERE urn = ? ORDER BY id", (urn,)
+            ).fetchall()
+            op = "insert" if is_new else "update"
+            record = {"op": op, "urn": urn, "hash": digest.hex(), "linhas": [list(row) for row in rows]}
+            text.write(json.dumps(record, ensure_ascii=False) + "\n")
+            counts[op] += 1
+        for urn in deletes:
+            text.write(json.dumps({"op": "delete", "urn": urn}, ensure_ascii=False) + "\n")
+            counts["delete"] += 1
+        text.write(json.dumps({"tipo": "fim", **counts}) + "\n")
+    finally:
+        text.close()
+        raw.close()
+        conn.close()
+    part_path.replace(path)
+
+    manifest = {
+        "arquivo": path.name,
+        "versao_base": base,
+        "versao": version,
+        **counts,
+        "bytes": raw.size,
+        "sha256": raw.sha256.hexdigest(),
+    }
+    with open(path.with_name(f"{path.name}.json"), "w", encoding="utf8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return {**manifest, "total_s": time.perf_counter() - start}
+
+
+def file_sha256(path: Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 ** 2), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def apply_delta(strcnx: str, package: str) -> Dict:
+    """
+    Aplica um pacote de diferenças à cópia local do banco publicado.
+
+    A cópia precisa estar na versão base do pacote. Se o hash de alguma urn
+    alterada não conferir, nada é gravado.
+    """
+    start = time.perf_counter()
+    package_path = Path(package)
+    manifest_path = package_path.with_name(f"{package_path.name}.json")
+    if manifest_path.exists():
+        with open(manifest_path, encoding="utf8") as f:
+            expected = json.load(f)["sha256"]
+        if file_sha256(package_path) != expected:
+            raise ValueError(f"sha256 de {package_path.name} não confere com {manifest_path.name}.")
+
+    conn = open_versioned(strcnx, "rw")
+    cursor = conn.cursor()
+    counts = {"insert": 0, "update": 0, "delete": 0}
+    hashes = {}
+    with gzip.open(package_path, "rt", encoding="utf8") as f:
+        header = json.loads(f.readline())
+        local_version = dataset_version(conn)
+        if header.get("tipo") != "cabecalho" or header["versao_base"] != local_version:
+            conn.close()
+            raise ValueError(
+                f"{package_path.name} parte da versão {header.get('versao_base')}; "
+                f"a cópia local está na versão {local_version}."
+            )
+        cols = list(header["colunas"])
+        insert_string = (
+            f"INSERT INTO {TABLE_NAME} ({', '.join(cols)}) "
+            f"VALUES ({', '.join('?' for _ in cols)})"
+        )
+        trailer = None
+        cursor.execute("BEGIN")
+        try:
+            for line in f:
+                record = json.loads(line)
+                if record.get("tipo") == "fim":
+                    trailer = record
+                    break
+                urn = record["urn"]
+                cursor.execute(f"DELETE FROM {TABLE_NAME} WHERE urn = ?", (urn,))
+                if record["op"] == "delete":
+                    cursor.execute("DELETE FROM versao_hash WHERE urn = ?", (urn,))
+                else:
+                    cursor.executemany(insert_string, [tuple(row) for row in record["linhas"]])
+                    hashes[urn] = bytes.fromhex(record["hash"])
+                counts[record["op"]] += 1
+            if trailer is None or any(trailer[op] != counts[op] for op in counts):
+                raise ValueError(f"{package_path.name} está incompleto.")
+            if compute_hashes(conn, hashes) != hashes:
+                raise ValueError(f"As linhas aplicadas não conferem com os hashes de {package_path.name}.")
+            cursor.executemany(
+                "INSERT OR REPLACE INTO versao_hash (urn, hash) VALUES (?, ?)", sorted(hashes.items())
+            )
+            set_version(conn, header["versao"], header.get("data_versao", header["criado_em"]))
+            cursor.execute("COMMIT")
+        except BaseException:
+            cursor.execute("ROLLBACK")
+            conn.close()
+            raise
+    if cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'agregados'").fetchone():
+        refresh_aggregates(conn)
+    conn.close()
+    return {"versao": header["versao"], **counts, "total_s": time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Versões e pacotes de diferenças do banco publicado.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    create_parser = subparsers.add_parser("create", help="gera o pacote entre duas versões")
+    create_parser.add_argument("--old", required=True)
+    create_parser.add_argument("--new", default="./db/tcu-acordaos.db")
+    create_parser.add_argument("--output", default="./db/deltas")
+    apply_parser = subparsers.add_parser("apply", help="aplica pacotes à cópia local, em ordem")
+    apply_parser.add_argument("--db", default="./db/tcu-acordaos.db")
+    apply_parser.add_argument("packages", nargs="+")
+    stamp_parser = subparsers.add_parser("stamp", help="grava a versão de um banco publicado")
+    stamp_parser.add_argument("--db", default="./db/tcu-acordaos.db")
+    stamp_parser.add_argument("--version", type=int, default=None, help="padrão: versão atual + 1")
+    stamp_parser.add_argument("--date", default=None, help="criado_em (padrão: data de modificação do arquivo)")
+    info_parser = subparsers.add_parser("info", help="mostra a versão do banco")
+    info_parser.add_argument("--db", default="./db/tcu-acordaos.db")
+    args = parser.parse_args()
+
+    if args.command == "create":
+        stats = create_delta(args.old, args.new, args.output)
+        print(
+            f"{stats['arquivo']}: {stats['insert']} inserções, {stats['update']} alterações, "
+            f"{stats['delete']} remoções, {stats['bytes'] / 1024 ** 2:.1f}MB em {stats['total_s']:.1f}s"
+        )
+    elif args.command == "apply":
+        for package in args.packages:
+            stats = apply_delta(args.db, package)
+            print(
+                f"{Path(package).name}: versão {stats['versao']} ({stats['insert']} inserções, "
+                f"{stats['update']} alterações, {stats['delete']} remoções) em {stats['total_s']:.1f}s"
+            )
+    elif args.command == "stamp":
+        conn = sqlite3.connect(args.db, isolation_level=None)
+        version = args.version if args.version is not None else dataset_version(conn) + 1
+        created_at = args.date or date.fromtimestamp(Path(args.db).stat().st_mtime).isoformat()
+        stats = stamp_version(conn, version, created_at)
+        conn.close()
+        print(f"{args.db}: versão {stats['versao']}, {stats['urns']} urns em {stats['total_s']:.1f}s")
+    else:
+        conn = open_versioned(args.db)
+        row = conn.execute("SELECT versao, criado_em, linhas FROM versao_dataset").fetchone()
+        conn.close()
+        print(json.dumps(dict(zip(("versao", "criado_em", "linhas"), row)), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Exporta o banco publicado (tcu-acordaos.db) em CSV ou JSONL, um arquivo por
+ano_acordao, para quem não usa sqlite.
+
+Cada ano é exportado por um processo do pool, com a sua própria conexão
+somente leitura (scripts.scan.open_readonly), lendo `batch_size` linhas por
+vez: a memória de cada processo depende do lote, não do tamanho do corpus.
+A compressão (gzip, bz2 ou xz) e o sha256 são calculados enquanto o arquivo é
+escrito, sem releitura. Se o banco for alterado durante a exportação
+(scripts.scan.check_unchanged), o manifest não é gravado. Cada arquivo é
+gravado com o sufixo .part e renomeado ao final; o gzip é gravado sem data no
+cabeçalho, então o mesmo banco gera os mesmos arquivos e as mesmas somas.
+
+Arquivos do diretório de saída:
+    acordaos-<ano>.<csv|jsonl>[.gz|.bz2|.xz]   (acordaos-sem-ano para ano nulo)
+    manifest.json   ano, linhas, bytes e sha256 de cada arquivo, e o banco de origem.
+    SHA256SUMS      no formato do `sha256sum -c`.
+
+Uso:
+    python -m scripts.export [--db ./db/tcu-acordaos.db] [--output ./db/export]
+        [--format csv|jsonl] [--compression gzip|bz2|xz|none] [--workers 4]
+        [--batch-size 500] [--columns urn,ano_acordao,...] [--years 2018,2019]
+"""
+import argparse
+import bz2
+import csv
+import gzip
+import hashlib
+import io
+import json
+import lzma
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Sequence, Union
+
+from scripts.reader import ALL_COLUMNS, TABLE_NAME, database_version
+from scripts.scan import check_unchanged, data_version, open_readonly
+
+FORMATS = ("csv", "jsonl")
+COMPRESSIONS = {
+    "none": "",
+    "gzip": ".gz",
+    "bz2": ".bz2",
+    "xz": ".xz",
+}
+
+
+class HashingFile(io.RawIOBase):
+    """
+    Arquivo binário que calcula o sha256 e o tamanho do que é gravado.
+    """
+
+    def __init__(self, path: Path):
+        self.file = open(path, "wb")
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.file.write(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.file.close()
+        super().close()
+
+
+def compressed_stream(raw: HashingFile, compression: str):
+    if compression == "gzip":
+        return gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0)
+    if compression == "bz2":
+        return bz2.BZ2File(raw, mode="wb")
+    if compression == "xz":
+        return lzma.LZMAFile(raw, mode="wb")
+    return io.BufferedWriter(raw)
+
+
+def file_name(year: Union[int, None], fmt: str, compression: str) -> str:
+    label = "sem-ano" if year is None else str(year)
+    return f"acordaos-{label}.{fmt}{COMPRESSIONS[compression]}"
+
+
+def export_year(
+    strcnx: str,
+    output: str,
+    year: Union[int, None],
+    columns: Sequence[str],
+    fmt: str = "csv",
+    compression: str = "gzip",
+    batch_size: int = 500,
+) -> Dict:
+    """
+    Exporta os acórdãos de um ano (no processo do pool) e retorna a entrada do manifest.
+    """
+    path = Path(output) / file_name(year, fmt, compression)
+    part_path = path.with_name(f"{path.name}.part")
+    conn = open_readonly(strcnx)
+    condition = "ano_acordao IS NULL" if year is None else "ano_acordao = ?"
+    cursor = conn.execute(
+        f"SELECT {', '.join(columns)} FROM {TABLE_NAME} WHERE {condition} ORDER BY id",
+        () if year is None else (year,),
+    )
+    raw = HashingFile(part_path)
+    stream = compressed_stream(raw, compression)
+    text = io.TextIOWrapper(stream, encoding="utf8", newline="")
+    rows = 0
+    try:
+        if fmt == "csv":
+            writer = csv.writer(text)
+            writer.writerow(columns)
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            if fmt == "csv":
+                writer.writerows(batch)
+            else:
+                text.writelines(
+                    json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in batch
+                )
+            rows += len(batch)
+    finally:
+        # fecha o texto, o compressor e o arquivo, nessa ordem
+        text.close()
+        raw.close()
+        conn.close()
+    part_path.replace(path)
+    return {
+        "arquivo": path.name,
+        "ano": year,
+        "linhas": rows,
+        "bytes": raw.size,
+        "sha256": raw.sha256.hexdigest(),
+    }
+
+
+def export_dataset(
+    strcnx: str,
+    output: str,
+    fmt: str = "csv",
+    compression: str = "gzip",
+    workers: int = None,
+    batch_size: int = 500,
+    columns: Sequence[str] = None,
+    years: Sequence[int] = None,
+) -> Dict:
+    """
+    Exporta um arquivo por ano em paralelo e grava manifest.json e SHA256SUMS.
+
+    Atributos:
+        columns: colunas exportadas (padrão: todas).
+        years: anos exportados (padrão: todos, inclusive ano nulo).
+    """
+    start = time.perf_counter()
+    columns = list(columns or ALL_COLUMNS)
+    invalid_cols = [col for col in columns if col not in ALL_COLUMNS]
+    if invalid_cols:
+        raise ValueError(f"Colunas inexistentes: {', '.join(invalid_cols)}.")
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato inválido: {fmt}.")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Compressão inválida: {compression}.")
+    output_path = Path(output)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    # conexão mantida aberta até o fim, para conferir que o banco não mudou
+    conn = open_readonly(strcnx)
+    version = data_version(conn)
+    # anos maiores primeiro, para que o último processo não fique com o ano mais pesado
+    counts = conn.execute(
+        f"SELECT ano_acordao, count(*) FROM {TABLE_NAME} GROUP BY ano_acordao ORDER BY 2 DESC"
+    ).fetchall()
+    if years is not None:
+        selected = set(years)
+        counts = [(year, count) for year, count in counts if year in selected]
+
+    workers = workers or os.cpu_count()
+    files = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(export_year, strcnx, output, year, columns, fmt, compression, batch_size)
+                for year, _ in counts
+            ]
+            for future in as_completed(futures):
+                files.append(future.result())
+        check_unchanged(conn, version)
+    finally:
+        conn.close()
+    files.sort(key=lambda entry: (entry["ano"] is None, entry["ano"] or 0))
+
+    manifest = {
+        "fonte": str(strcnx),
+        "versao_fonte": database_version(strcnx),
+        "criado_em": datetime.now().isoformat(timespec="seconds"),
+        "formato": fmt,
+        "compressao": compression,
+        "colunas": columns,
+        "linhas": sum(entry["linhas"] for entry in files),
+        "arquivos": files,
+    }
+    with open(output_path / "manifest.json", "w", encoding="utf8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    with open(output_path / "SHA256SUMS", "w", encoding="utf8") as f:
+        f.writelines(f"{entry['sha256']}  {entry['arquivo']}\n" for entry in files)
+    return {**manifest, "total_s": time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta o banco publicado em CSV ou JSONL por ano.")
+    parser.add_argument("--db", default="./db/tcu-acordaos.db")
+    parser.add_argument("--output", default="./db/export")
+    parser.add_argument("--format", default="csv", choices=FORMATS)
+    parser.add_argument("--compression", default="gzip", choices=tuple(COMPRESSIONS))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--columns", default=None, help="colunas separadas por vírgula (padrão: todas)")
+    parser.add_argument("--years", default=None, help="anos separados por vírgula (padrão: todos)")
+    args = parser.parse_args()
+    columns = args.columns.split(",") if args.columns else None
+    years = [int(year) for year in args.years.split(",")] if args.years else None
+    stats = export_dataset(
+        args.db, args.output, args.format, args.compression, args.workers, args.batch_size, columns, years
+    )
+    print(
+        f"{stats['linhas']} acórdãos em {len(stats['arquivos'])} arquivos "
+        f"({sum(entry['bytes'] for entry in stats['arquivos']) / 1024 ** 2:.1f}MB) "
+        f"em {stats['total_s']:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
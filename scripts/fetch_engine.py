@@ -0,0 +1,465 @@
+"""
+Motor de coleta asyncio, apenas da api do TCU, para recoletas em que a chave
+do documento já é conhecida (coluna url_tcu do banco de coleta ou arquivo de
+chaves). Alternativa leve ao ApiSpider: sem scrapy/twisted, sem a visita ao
+LexML, sem robots.txt e sem o middleware de user agent aleatório.
+
+    - conexões HTTP/1.1 keep-alive reaproveitadas (HttpClient), só biblioteca padrão;
+    - concorrência limitada pela quantidade de tarefas e taxa limitada por um
+      token bucket (requisições/s, com rajada);
+    - retentativas de 429, 5xx e erros de conexão, respeitando Retry-After;
+    - gravação em lotes por uma thread dedicada (um commit por lote), com fila
+      limitada para que a coleta espere quando o banco não acompanha.
+
+O mapeamento dos campos é o mesmo do ApiSpider (scripts/api_document.py).
+
+Uso:
+    python -m scripts.fetch_engine [--db ./db/acordaos-download.db | --shards ./db/shards]
+        [--keys chaves.tsv] [--year 2019] [--pending] [--concurrency 16] [--rate 10]
+        [--batch-size 50] [--api-url https://pesquisa.apps.tcu.gov.br/rest/...]
+
+    chaves.tsv: uma linha por documento, `urn<TAB>chave ou link do TCU`.
+"""
+import argparse
+import asyncio
+import random
+import sqlite3
+import ssl
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple, Union
+from urllib.parse import quote, urlsplit
+
+from scripts.api_document import api_url, build_document, parse_api_response, tcu_key
+from scripts.shards import ShardRouter
+from scripts.storage import detect_layout, document_source, update_document
+
+TCU_API_URL = "https://pesquisa.apps.tcu.gov.br/rest/publico/base/acordao-completo/documento"
+USER_AGENT = "Mozilla/5.0 (compatible; acordaos-tcu)"
+RETRY_STATUS = (408, 429, 500, 502, 503, 504)
+MAX_HEADER_LINES = 100
+
+
+class TokenBucket:
+    """
+    Atributos:
+        rate: tokens (requisições) por segundo; 0 desativa o limite.
+        burst: tokens acumulados no máximo.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = None
+
+    async def acquire(self) -> None:
+        if not self.rate:
+            return
+        if self.lock is None:
+            # criado dentro do loop em execução
+            self.lock = asyncio.Lock()
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HttpError(Exception):
+    pass
+
+
+class HttpClient:
+    """
+    Cliente GET HTTP/1.1 com conexões keep-alive por host.
+
+    Atributos:
+        timeout: tempo máximo de cada requisição (segundos).
+    """
+
+    def __init__(self, timeout: float = 60.0, user_agent: str = USER_AGENT):
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.idle = {}
+        self.ssl_context = ssl.create_default_context()
+        self.connections_opened = 0
+
+    async def connect(self, scheme: str, host: str, port: int):
+        self.connections_opened += 1
+        return await asyncio.open_connection(
+            host, port, ssl=self.ssl_context if scheme == "https" else None
+        )
+
+    async def get(self, url: str) -> Tuple[int, Dict[str, str], bytes]:
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        origin = (parts.scheme, parts.hostname, port)
+        target = quote(parts.path or "/", safe="/%") + (
+            "?" + quote(parts.query, safe="=&%:*") if parts.query else ""
+        )
+        request = (
+            f"GET {target} HTTP/1.1\r\n"
+            f"Host: {parts.netloc}\r\n"
+            f"User-Agent: {self.user_agent}\r\n"
+            "Accept: application/json\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        ).encode("latin1")
+        idle = self.idle.setdefault(origin, [])
+        # uma conexão ociosa pode ter sido fechada pelo servidor: nesse caso
+        # a requisição é repetida uma vez em conexão nova
+        for reused in (True, False):
+            if reused and not idle:
+                continue
+            reader, writer = idle.pop() if reused else await self.connect(*origin)
+            try:
+                writer.write(request)
+                status, headers, body = await asyncio.wait_for(self.read_response(reader), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError, HttpError):
+                writer.close()
+                if reused:
+                    continue
+                raise
+            except asyncio.TimeoutError:
+                writer.close()
+                raise
+            if headers.get("connection", "").lower() == "close":
+                writer.close()
+            else:
+                idle.append((reader, writer))
+            return status, headers, body
+
+    async def read_response(self, reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str], bytes]:
+        status_line = await reader.readline()
+        if not status_line:
+            raise HttpError("Conexão fechada pelo servidor.")
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            raise HttpError(f"Resposta inválida: {status_line[:80]!r}")
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            body = b"".join(chunks)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await reader.read()
+            headers["connection"] = "close"
+        return status, headers, body
+
+    def close(self) -> None:
+        for connections in self.idle.values():
+            for _, writer in connections:
+                writer.close()
+        self.idle = {}
+
+
+class BatchWriter:
+    """
+    Grava os documentos em lotes numa thread dedicada (a conexão sqlite é
+    usada só por ela).
+
+    Atributos:
+        db_path: banco de coleta (layout single ou split).
+        shards_dir: diretório dos shards (substitui db_path).
+        batch_size: documentos por commit.
+        flush_interval: segundos máximos de espera por um lote incompleto.
+    """
+
+    def __init__(
+        self, db_path: str = None, shards_dir: str = None, batch_size: int = 50, flush_interval: float = 1.0
+    ):
+        self.db_path = db_path
+        self.shards_dir = shards_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.conn = None
+        self.router = None
+        self.stored = 0
+        self.batches = 0
+        self.write_seconds = 0.0
+
+    def open(self) -> None:
+        if self.shards_dir:
+            self.router = ShardRouter(self.shards_dir)
+            return
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.layout = detect_layout(self.conn.cursor())
+
+    def write_batch(self, batch: List[Dict]) -> None:
+        start = time.perf_counter()
+        if self.router is not None:
+            for values in batch:
+                self.router.update_document(values.pop("urn"), values, commit=False)
+            for conn in self.router.connections.values():
+                conn.commit()
+        else:
+            cursor = self.conn.cursor()
+            for values in batch:
+                update_document(cursor, self.layout, values.pop("urn"), values)
+            self.conn.commit()
+        self.stored += len(batch)
+        self.batches += 1
+        self.write_seconds += time.perf_counter() - start
+
+    async def run(self, queue: asyncio.Queue) -> None:
+        """
+        Consome a fila até receber None.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self.open)
+        finished = False
+        while not finished:
+            batch = []
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    document = await asyncio.wait_for(queue.get(), max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    break
+                if document is None:
+                    finished = True
+                    break
+                batch.append(document)
+            if batch:
+                await loop.run_in_executor(self.executor, self.write_batch, batch)
+
+    def close(self) -> None:
+        if self.router is not None:
+            self.router.close()
+        if self.conn is not None:
+            self.conn.close()
+        self.executor.shutdown()
+
+
+class FetchEngine:
+    """
+    Atributos:
+        api_base: endpoint acordao-completo da api do TCU.
+        concurrency: requisições simultâneas.
+        rate: requisições por segundo (0 sem limite); burst: rajada do token bucket.
+        max_retries: retentativas por documento.
+        backoff: espera base entre retentativas (dobra a cada tentativa).
+    """
+
+    def __init__(
+        self,
+        writer: BatchWriter,
+        api_base: str = TCU_API_URL,
+        concurrency: int = 16,
+        rate: float = 10.0,
+        burst: int = 10,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        timeout: float = 60.0,
+    ):
+        self.writer = writer
+        self.api_base = api_base
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.stats = Counter()
+        self.statuses = Counter()
+
+    async def fetch(self, client: HttpClient, url: str) -> Union[bytes, None]:
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            retry_after = None
+            try:
+                status, headers, body = await client.get(url)
+            except (OSError, asyncio.TimeoutError, HttpError):
+                self.statuses["erro_conexao"] += 1
+            else:
+                self.statuses[status] += 1
+                if status == 200:
+                    return body
+                if status not in RETRY_STATUS:
+                    return None
+                retry_after = headers.get("retry-after")
+            if attempt == self.max_retries:
+                break
+            self.stats["retentativas"] += 1
+            delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            await asyncio.sleep(delay)
+        return None
+
+    async def worker(self, client: HttpClient, queue: asyncio.Queue, documents: asyncio.Queue) -> None:
+        while True:
+            task = await queue.get()
+            if task is None:
+                return
+            urn, key, url_tcu = task
+            body = await self.fetch(client, api_url(self.api_base, key))
+            if body is None:
+                self.stats["falhas"] += 1
+                continue
+            # uma resposta fora do formato da api (página de erro com status 200,
+            # json truncado) descarta só o documento, não o worker
+            try:
+                res = parse_api_response(body)
+                document = build_document(res, urn, url_tcu) if res is not None else None
+            except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+                self.stats["invalidos"] += 1
+                continue
+            if document is None:
+                self.stats["nao_encontrados"] += 1
+                continue
+            await documents.put(document)
+            self.stats["coletados"] += 1
+
+    async def produce(self, tasks: Iterable[Tuple[str, str, str]], queue: asyncio.Queue, workers: int) -> None:
+        for task in tasks:
+            await queue.put(task)
+        for _ in range(workers):
+            await queue.put(None)
+
+    async def run(self, tasks: Iterable[Tuple[str, str, str]]) -> Dict:
+        start = time.perf_counter()
+        client = HttpClient(self.timeout)
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        # fila limitada: a coleta espera quando a gravação não acompanha
+        documents = asyncio.Queue(maxsize=self.writer.batch_size * 2)
+        writer_task = asyncio.ensure_future(self.writer.run(documents))
+        producer = asyncio.ensure_future(self.produce(tasks, queue, self.concurrency))
+        workers = [
+            asyncio.ensure_future(self.worker(client, queue, documents))
+            for _ in range(self.concurrency)
+        ]
+
+        async def finish_collection() -> None:
+            await asyncio.gather(producer, *workers)
+            await documents.put(None)
+
+        collection = asyncio.ensure_future(finish_collection())
+        running = [producer, *workers, collection, writer_task]
+        try:
+            # a falha da gravação ou de um worker interrompe o resto, em vez de
+            # deixar as filas esperando para sempre
+            done, _ = await asyncio.wait((collection, writer_task), return_when=asyncio.FIRST_EXCEPTION)
+            for future in done:
+                if future.exception() is not None:
+                    raise future.exception()
+        finally:
+            for future in running:
+                future.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            client.close()
+            self.writer.close()
+        elapsed = time.perf_counter() - start
+        return {
+            **self.stats,
+            "gravados": self.writer.stored,
+            "lotes": self.writer.batches,
+            "gravacao_s": self.writer.write_seconds,
+            "conexoes": client.connections_opened,
+            "respostas": {str(status): count for status, count in self.statuses.items()},
+            "tempo_total_s": elapsed,
+            "docs_por_s": self.writer.stored / elapsed if elapsed else 0.0,
+        }
+
+
+def tasks_from_db(
+    db_path: str = None, shards_dir: str = None, year: int = None, pending: bool = False
+) -> List[Tuple[str, str, str]]:
+    """
+    (urn, chave, url_tcu) dos documentos com url_tcu conhecido.
+    """
+    conditions = ["url_tcu IS NOT NULL"]
+    params = []
+    if year is not None:
+        conditions.append("urn_year = ?")
+        params.append(year)
+    if pending:
+        conditions.append("was_downloaded = 0")
+    where_string = " AND ".join(conditions)
+    if shards_dir:
+        router = ShardRouter(shards_dir)
+        if year is not None:
+            conn = router.connect(year, create=False)
+            source = document_source(detect_layout(conn.cursor()))
+            rows = conn.execute(f"SELECT urn, url_tcu FROM {source} WHERE {where_string}", params).fetchall()
+            router.close()
+        else:
+            rows = list(
+                router.query_all(
+                    f"SELECT urn, url_tcu FROM download_acordaos WHERE {where_string}", params, documents=True
+                )
+            )
+    else:
+        conn = sqlite3.connect(db_path)
+        source = document_source(detect_layout(conn.cursor()))
+        rows = conn.execute(f"SELECT urn, url_tcu FROM {source} WHERE {where_string}", params).fetchall()
+        conn.close()
+    return [(urn, tcu_key(url_tcu), url_tcu) for urn, url_tcu in rows if tcu_key(url_tcu)]
+
+
+def tasks_from_file(path: str) -> List[Tuple[str, str, str]]:
+    tasks = []
+    with open(path, encoding="utf8") as f:
+        for line in f:
+            urn, _, value = line.strip().partition("\t")
+            key = tcu_key(value) or value
+            if urn and key:
+                # links completos também são gravados em url_tcu
+                tasks.append((urn, key, value if value != key else None))
+    return tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recoleta asyncio dos documentos pela api do TCU.")
+    parser.add_argument("--db", default="./db/acordaos-download.db")
+    parser.add_argument("--shards", default=None, help="diretório dos shards (substitui --db)")
+    parser.add_argument("--keys", default=None, help="arquivo urn<TAB>chave (padrão: url_tcu do banco)")
+    parser.add_argument("--year", type=int, default=None)
+    parser.add_argument("--pending", action="store_true", help="apenas documentos não baixados")
+    parser.add_argument("--api-url", default=TCU_API_URL)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=10.0, help="requisições/s (0 sem limite)")
+    parser.add_argument("--burst", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--max-retries", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.keys:
+        tasks = tasks_from_file(args.keys)
+    else:
+        tasks = tasks_from_db(args.db, args.shards, args.year, args.pending)
+    writer = BatchWriter(args.db, args.shards, args.batch_size)
+    engine = FetchEngine(
+        writer, args.api_url, args.concurrency, args.rate, args.burst, args.max_retries
+    )
+    stats = asyncio.run(engine.run(tasks))
+    print(
+        f"{stats['gravados']} de {len(tasks)} documentos gravados em {stats['tempo_total_s']:.1f}s "
+        f"({stats['docs_por_s']:.1f} docs/s, {stats['conexoes']} conexões, "
+        f"{stats.get('retentativas', 0)} retentativas, {stats.get('falhas', 0)} falhas)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,18 @@ from selenium.webdriver import Firefox
 from selenium.webdriver import firefox
 from selenium.webdriver.firefox.options import Options
 from selenium.common.exceptions import NoSuchElementException
-from scripts.crawler import AcordaosTCU
+from scripts.core import (
+    CPF_FINDER,
+    LEXML_URL_FINDER,
+    ResultIter,
+    initiate_db,
+    insert_into_db,
+    mask_cnpj,
+    query_db,
+    search_for_urn,
+)
+from scripts.storage import detect_layout, insert_documents
+from scripts.urn import urn_year
 import sqlite3
 
 firefox_webelements = firefox.webelement.FirefoxWebElement
@@ -163,14 +174,13 @@ def initiate_webdriver() -> firefox_webdriver:
 def load_csv_into_db(years: List[int], cursor: sqlite3.Cursor) -> None:
     for year in years:
         df = pd.read_csv(f"./data/tcu_{year}.csv", sep=",", encoding="utf8")
-        year_urn_pattern = '[0-9]{4}-[0-9]{2}-[0-9]{2}'
-        df['urn_year'] = df['urn'].apply(lambda x: int(re.search(year_urn_pattern,x).group(0)[:4]))
+        df['urn_year'] = df['urn'].apply(urn_year)
         data_to_insert = [(data.urn, data.url, data.urn_year) for data in df.itertuples()]
-        insert_into_db(
-            data=data_to_insert,
-            table_name="download_acordaos",
+        insert_documents(
+            cursor,
+            detect_layout(cursor),
             cols_names=["urn", "url_lexml", "urn_year"],
-            cursor=cursor,
+            data=data_to_insert,
         )
 
 def load_json_into_db(filename: Path, cursor: sqlite3.Cursor) -> None:
@@ -183,75 +193,6 @@ def load_json_into_db(filename: Path, cursor: sqlite3.Cursor) -> None:
             data['urn'] = 'NA'
             instance_of_data = tuple(value for value in data.values())
             data_to_insert.append(instance_of_data)
-        insert_into_db(
-            data=data_to_insert,
-            table_name="download_acordaos",
-            cols_names=cols_name,
-            cursor=cursor,
+        insert_documents(
+            cursor, detect_layout(cursor), cols_names=cols_name, data=data_to_insert
         )
-
-
- 
-
-def initiate_db(strcnx: str) -> sqlite3.Cursor:
-    """
-    Conecta no banco sqlite
-
-    Atributos:
-        strcnx: string de conexão.
-    """
-    strcnx_is_valid = Path(strcnx)
-    if not strcnx_is_valid.is_file():
-        raise ("O arquivo sqlite3 não existe.")
-    conn = sqlite3.connect(strcnx)
-    cur = conn.cursor()
-    return conn, cur
-
-
-def insert_into_db(
-    data: Tuple, table_name: str, cols_names: List[str], cursor: sqlite3.Cursor
-) -> None:
-    cols_to_insert = f"({','.join(cols_names)})"
-    question_mark_str = f"({','.join(['?' for col in cols_names])})"
-    insert_string = (
-        f"INSERT INTO {table_name} {cols_to_insert} VALUES {question_mark_str}"
-    )
-    cursor.executemany(insert_string, data)
-
-def search_for_urn(logmsg: str) -> str:
-    """
-    Encontra urns nas mensagens de log.
-    """
-    re_pattern = r'http(s)?:\/\/www\.\w+\.\w+\.\w+\/\w+\/'
-    look_for_urn = re.search(re_pattern, logmsg).span()[1]
-    urn = logmsg[look_for_urn:-1]
-    return urn
-
-def query_db(query_string: str, cursor: sqlite3.Cursor):
-    yield cursor.execute(query_string).fetchall()
-
-
-def mask_cnpj(texto: str) -> Union[str, None]:
-    """
-    Anonimização de CPF
-    """
-    formatted_text = texto
-    pattern = '[0-9]{3}\.[0-9]{3}\.[0-9]{3}-[0-9]{2}'
-    cpfinder = re.compile(pattern)
-    if isinstance(texto, str):
-        is_cpf = cpfinder.findall(texto)
-        if is_cpf:
-            for cpf in is_cpf:
-                masked_cpf = f"XXX-{cpf[4:-3]}-XX"
-                formatted_text = formatted_text.replace(cpf, masked_cpf)
-            return formatted_text
-    else:
-        return None
-
-def ResultIter(cursor: sqlite3.Cursor, query: str) -> Union[Iterable, None]:
-    'An iterator to keep memory usage down on quering database'
-    results = cursor.execute(query).fetchall()
-    if not results:
-        yield None
-    for result in results:
-        yield result
@@ -0,0 +1,158 @@
+"""
+Limpeza em blocos e armazenamento temporário dos textos grandes da api do TCU.
+
+`clean_html_stream` produz o mesmo resultado de
+`clean_text(remove_tags_html(texto))` do ApiSpider, processando o texto em
+blocos de `chunk_size` caracteres e gravando a saída em um SpooledText (memória
+até `max_size`, disco a partir daí). Assim o texto limpo não fica duplicado na
+memória enquanto o item aguarda o pipeline; ele só é materializado, um campo
+por vez, na gravação no banco (`materialize`).
+"""
+import re
+import tempfile
+from typing import Any, Dict, Iterator
+
+TAGS_AND_ENTITIES = re.compile("<.*?>|&([a-z0-9]+|#[0-9]{1,6}|#x[0-9a-f]{1,6});")
+# \t e \n viram espaço, \xa0 é removido e aspas simples viram espaço
+# (str.replace encadeado é bem mais rápido que str.translate com dicionário)
+CLEAN_REPLACEMENTS = (("\t", " "), ("\n", " "), ("\xa0", ""), ("'", " "))
+INCOMPLETE_ENTITY = re.compile("&[a-z0-9#]*$")
+ENTITY_RUN = re.compile("[a-z0-9#]*")
+
+
+class SpooledText:
+    """
+    Texto guardado em um SpooledTemporaryFile.
+
+    Atributos:
+        max_size: bytes mantidos em memória antes de passar para disco.
+        dir: diretório dos arquivos temporários (padrão do sistema).
+    """
+
+    def __init__(self, max_size: int = 64 * 1024, dir: str = None):
+        self.file = tempfile.SpooledTemporaryFile(
+            max_size=max_size, mode="w+", encoding="utf8", newline="", dir=dir
+        )
+        self.max_size = max_size
+        self.length = 0
+        self.on_disk = False
+
+    def write(self, text: str) -> None:
+        self.file.write(text)
+        self.length += len(text)
+        # mesmo critério do SpooledTemporaryFile; rollover() não faz nada se já passou
+        if not self.on_disk and self.file.tell() > self.max_size:
+            self.file.rollover()
+            self.on_disk = True
+
+    def read(self) -> str:
+        self.file.seek(0)
+        return self.file.read()
+
+    @property
+    def memory_bytes(self) -> int:
+        """
+        Tamanho aproximado mantido em memória (0 depois de passar para disco).
+        """
+        return 0 if self.on_disk else self.length
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __str__(self) -> str:
+        return self.read()
+
+
+def next_mark(text: str, mark: str, position: int, marks: Dict[str, int]) -> int:
+    """
+    Posição da próxima ocorrência de `mark` a partir de `position` (len(text)
+    se não houver). `marks` guarda a última busca: o texto entre blocos não é
+    percorrido de novo.
+    """
+    found = marks.get(mark)
+    if found is None or found < position:
+        found = text.find(mark, position)
+        found = len(text) if found == -1 else found
+        marks[mark] = found
+    return found
+
+
+def chunk_end(text: str, start: int, end: int, marks: Dict[str, int]) -> int:
+    """
+    Fim do bloco text[start:end], estendido quando uma tag ou entidade começa
+    no bloco e termina depois dele. Um '<' sem '>' antes da próxima quebra de
+    linha é texto literal (<.*?> não atravessa linhas) e não estende o bloco,
+    de forma que o bloco só passa de `chunk_size` pelo tamanho da própria tag.
+    """
+    last_closed = max(text.rfind(">", start, end), text.rfind("\n", start, end))
+    if text.find("<", max(last_closed + 1, start), end) != -1:
+        tag_end = next_mark(text, ">", end, marks)
+        if tag_end < next_mark(text, "\n", end, marks):
+            return tag_end + 1
+    if INCOMPLETE_ENTITY.search(text, start, end):
+        run_end = ENTITY_RUN.match(text, end).end()
+        if run_end < len(text) and text[run_end] == ";":
+            return run_end + 1
+    return end
+
+
+def iter_clean_chunks(text: str, chunk_size: int = 64 * 1024) -> Iterator[str]:
+    """
+    Retorna os pedaços do texto limpo, sem os espaços das extremidades.
+    """
+    pending_space = ""
+    started = False
+    start = 0
+    marks = {}
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            end = chunk_end(text, start, end, marks)
+        is_last = end >= len(text)
+        cleaned = TAGS_AND_ENTITIES.sub("", text[start:end])
+        start = end
+        for old, new in CLEAN_REPLACEMENTS:
+            cleaned = cleaned.replace(old, new)
+        if not started:
+            cleaned = cleaned.lstrip()
+            if not cleaned:
+                continue
+            started = True
+        # espaços no fim do pedaço só são emitidos se houver texto depois
+        stripped = cleaned.rstrip()
+        if stripped:
+            yield pending_space + stripped
+            pending_space = cleaned[len(stripped):]
+        else:
+            pending_space += cleaned
+        if is_last:
+            break
+
+
+def clean_html_stream(
+    text: str, chunk_size: int = 64 * 1024, max_size: int = 64 * 1024, dir: str = None
+) -> SpooledText:
+    spooled = SpooledText(max_size, dir)
+    for piece in iter_clean_chunks(text, chunk_size):
+        spooled.write(piece)
+    return spooled
+
+
+def materialize(value: Any) -> Any:
+    """
+    Converte SpooledText em str; outros valores passam inalterados.
+    """
+    if isinstance(value, SpooledText):
+        return value.read()
+    return value
+
+
+def memory_size(value: Any) -> int:
+    if isinstance(value, SpooledText):
+        return value.memory_bytes
+    if isinstance(value, str):
+        return len(value)
+    return 0
@@ -0,0 +1,126 @@
+"""
+Leitura em fluxo dos logs de coleta e atualização do banco em lote.
+
+Formatos reconhecidos (uma única expressão regular, uma passada por arquivo):
+
+    loguru (scripts/crawler.py):
+        2019-08-31 00:12:34.567 | INFO     | scripts.crawler:get_urls:148 -
+        Finalizado a coleta do link https://www.lexml.gov.br/urn/<urn>.
+    scrapy, item gravado (o dict do item vem nas linhas seguintes):
+        2019-08-31 00:12:34 [scrapy.core.scraper] DEBUG: Scraped from <200 ...>
+    scrapy, erro no spider (formato padrão e formato com o nível antes do logger):
+        2019-08-31 00:12:34 [scrapy.core.scraper] ERROR: Spider error processing <GET ...>
+        2019-08-31 00:12:34 ERROR [scrapy.core.scraper] Spider error processing <GET ...>
+
+Os pares (urn, data) de documentos baixados vão para uma tabela temporária e
+são aplicados com um único UPDATE ... FROM por arquivo.
+"""
+import re
+import sqlite3
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Tuple
+
+from scripts.storage import STATE_TABLE
+
+DOWNLOADED = "downloaded"
+ERROR = "error"
+
+LOG_LINE = re.compile(
+    r"^(?P<date>\d{4}-\d{2}-\d{2})[ T][\d:.,]+ (?:"
+    r"\|[^|]*\|[^|]*- Finalizado a coleta do link https?://\S+?/(?P<loguru_urn>urn:lex:\S+?)\.?\s*$"
+    r"|\[scrapy\.core\.scraper\] DEBUG: (?P<scraped>Scraped from) <"
+    r"|(?:ERROR )?\[scrapy\.core\.scraper\] (?:ERROR: )?Spider error processing <GET (?P<error_url>[^>\s]+)>"
+    r")"
+)
+# início de uma nova mensagem (qualquer formato); encerra o dump de um item do scrapy
+NEW_RECORD = re.compile(r"^\d{4}-\d{2}-\d{2}[ T]\d")
+ITEM_URN = re.compile(r"'urn': '(urn:lex:[^']+)'")
+URL_URN = re.compile(r"urn:lex:[^/>\s]+")
+
+
+class LogEvent(NamedTuple):
+    kind: str
+    date: str
+    # urn do documento ou, para erros sem urn na url, a própria url
+    value: str
+
+
+def iter_log_events(path: Path) -> Iterator[LogEvent]:
+    """
+    Percorre o arquivo linha a linha e retorna os downloads e erros encontrados.
+    """
+    scraped_date = None
+    with open(path, "r", encoding="utf8", errors="replace") as f:
+        for line in f:
+            if scraped_date is not None:
+                # linhas do dict do item, até a próxima mensagem de log
+                found_urn = ITEM_URN.search(line)
+                if found_urn:
+                    yield LogEvent(DOWNLOADED, scraped_date, found_urn.group(1))
+                    scraped_date = None
+                    continue
+                if not NEW_RECORD.match(line):
+                    continue
+                scraped_date = None
+            found = LOG_LINE.match(line)
+            if not found:
+                continue
+            if found.group("loguru_urn"):
+                yield LogEvent(DOWNLOADED, found.group("date"), found.group("loguru_urn"))
+            elif found.group("scraped"):
+                scraped_date = found.group("date")
+                found_urn = ITEM_URN.search(line)
+                if found_urn:
+                    yield LogEvent(DOWNLOADED, scraped_date, found_urn.group(1))
+                    scraped_date = None
+            else:
+                url = found.group("error_url")
+                error_urn = URL_URN.search(url)
+                yield LogEvent(ERROR, found.group("date"), error_urn.group(0) if error_urn else url)
+
+
+def ingest_log(
+    conn: sqlite3.Connection, path: Path, batch_size: int = 10000
+) -> Tuple[int, int, List[LogEvent]]:
+    """
+    Marca como baixadas as urns encontradas no log.
+
+    Atributos:
+        conn: conexão com o banco de coleta (layout single ou split).
+        path: arquivo de log.
+        batch_size: pares inseridos por executemany na tabela temporária.
+
+    Retorna a quantidade de urns distintas do log, de registros atualizados
+    e os eventos de erro.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS log_downloads "
+        "(urn TEXT PRIMARY KEY, downloaded_at TEXT) WITHOUT ROWID"
+    )
+    cursor.execute("DELETE FROM log_downloads")
+    # a data mais recente prevalece quando a urn aparece mais de uma vez
+    insert_string = (
+        "INSERT INTO log_downloads (urn, downloaded_at) VALUES (?, ?) "
+        "ON CONFLICT(urn) DO UPDATE SET downloaded_at = max(downloaded_at, excluded.downloaded_at)"
+    )
+    errors = []
+    batch = []
+    for event in iter_log_events(path):
+        if event.kind == ERROR:
+            errors.append(event)
+            continue
+        batch.append((event.value, event.date))
+        if len(batch) >= batch_size:
+            cursor.executemany(insert_string, batch)
+            batch = []
+    if batch:
+        cursor.executemany(insert_string, batch)
+    n_urns = cursor.execute("SELECT count(*) FROM log_downloads").fetchone()[0]
+    cursor.execute(
+        f"UPDATE {STATE_TABLE} SET was_downloaded = 1, downloaded_at = log_downloads.downloaded_at "
+        f"FROM log_downloads WHERE {STATE_TABLE}.urn = log_downloads.urn"
+    )
+    updated = cursor.rowcount
+    conn.commit()
+    return n_urns, updated, errors
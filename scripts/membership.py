@@ -0,0 +1,246 @@
+"""
+Conjunto compacto das urns já baixadas, consultado pelo spider antes de cada
+requisição (middleware DownloadedFilterMiddleware do projeto apiacordao).
+
+Cada urn com chave numérica (scripts.urn) vira um inteiro de 64 bits e as
+chaves carregadas do banco ficam em um array('Q') ordenado, com busca binária:
+8 bytes por documento, contra mais de 100 bytes de uma str em um set. As urns
+adicionadas durante a coleta vão para um set pequeno, incorporado ao array
+quando passa de `merge_size` elementos; urns sem chave numérica ficam em um set
+de texto. Não há falsos positivos (ao contrário de um filtro de Bloom): uma urn
+só é descartada se de fato já foi gravada.
+
+O LexML lista alguns documentos sob mais de uma urn, que apontam para a mesma
+chave da api do TCU (scripts.api_document.tcu_key). As chaves dos documentos
+baixados (url_tcu) ficam em um segundo conjunto do mesmo formato, consultado
+nas requisições à api; a carga usa o índice parcial urltcu (scripts.schema).
+
+Uso (tamanho e tempo de carga do conjunto):
+    python -m scripts.membership [--db ./db/acordaos-download.db] [--shards ./db/shards]
+"""
+import argparse
+import heapq
+import re
+import sqlite3
+import time
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Iterator, Tuple, Union
+
+from scripts.api_document import tcu_key
+from scripts.shards import ShardRouter
+from scripts.storage import STATE_TABLE, body_table, detect_layout
+from scripts.urn import parse_urn
+
+NUMERO_BITS = 28
+CODE_BITS = 4
+TCU_KEY_NUMBER = re.compile(r"ACORDAO-COMPLETO-([1-9]\d{0,17})")
+
+
+def pack_key(data: int, numero: int, tipo: int, autoridade: int) -> Union[int, None]:
+    """
+    Chave da urn em um inteiro de 64 bits; None quando alguma parte não cabe.
+    """
+    if numero >= 1 << NUMERO_BITS or tipo >= 1 << CODE_BITS or autoridade >= 1 << CODE_BITS:
+        return None
+    return (
+        (data << (NUMERO_BITS + 2 * CODE_BITS))
+        | (numero << (2 * CODE_BITS))
+        | (tipo << CODE_BITS)
+        | autoridade
+    )
+
+
+def urn_key(urn: str) -> Union[int, None]:
+    parsed = parse_urn(urn)
+    if parsed is None:
+        return None
+    return pack_key(parsed.data, parsed.numero, parsed.tipo, parsed.autoridade)
+
+
+def tcu_key_number(key: str) -> Union[int, None]:
+    """
+    Número da chave da api (ACORDAO-COMPLETO-<número>); None nos outros formatos.
+    """
+    found = TCU_KEY_NUMBER.fullmatch(key)
+    return int(found.group(1)) if found else None
+
+
+def sorted_unique(keys: Iterable[int]) -> array:
+    """
+    array('Q') com os inteiros já ordenados de `keys`, sem repetições.
+    """
+    result = array("Q")
+    last = None
+    for key in keys:
+        if key != last:
+            result.append(key)
+            last = key
+    return result
+
+
+class PackedSet:
+    """
+    Inteiros em um array('Q') ordenado, mais os adicionados recentemente em
+    um set pequeno, e os valores sem forma inteira em um set de texto.
+
+    Atributos:
+        merge_size: tamanho do set de inteiros novos antes da incorporação ao array.
+    """
+
+    def __init__(self, keys: Iterable[int] = (), texts: Iterable[str] = (), merge_size: int = 4096):
+        self.keys = sorted_unique(sorted(keys))
+        self.recent = set()
+        self.texts = set(texts)
+        self.merge_size = merge_size
+
+    def __len__(self) -> int:
+        return len(self.keys) + len(self.recent) + len(self.texts)
+
+    def contains(self, key: Union[int, None], text: str) -> bool:
+        if key is None:
+            return text in self.texts
+        if key in self.recent:
+            return True
+        position = bisect_left(self.keys, key)
+        return position < len(self.keys) and self.keys[position] == key
+
+    def add(self, key: Union[int, None], text: str) -> None:
+        if key is None:
+            self.texts.add(text)
+            return
+        self.recent.add(key)
+        if len(self.recent) >= self.merge_size:
+            self.merge()
+
+    def merge(self) -> None:
+        """
+        Intercala o array com as chaves novas ordenadas, sem duplicatas.
+        """
+        self.keys = sorted_unique(heapq.merge(self.keys, sorted(self.recent)))
+        self.recent = set()
+
+    @property
+    def memory_bytes(self) -> int:
+        """
+        Tamanho aproximado em memória (array, sets e strings).
+        """
+        recent_bytes = len(self.recent) * 40
+        texts_bytes = sum(len(text) + 90 for text in self.texts)
+        return self.keys.itemsize * len(self.keys) + recent_bytes + texts_bytes
+
+
+class UrnMembership:
+    """
+    Atributos:
+        keys: chaves (pack_key) das urns já baixadas, em qualquer ordem.
+        urns: urns sem chave numérica.
+        merge_size: tamanho do set de chaves novas antes da incorporação ao array.
+        tcu_keys: chaves da api (tcu_key) dos documentos baixados, já
+            separadas em números e texto (load_membership).
+    """
+
+    def __init__(
+        self,
+        keys: Iterable[int] = (),
+        urns: Iterable[str] = (),
+        merge_size: int = 4096,
+        tcu_keys: PackedSet = None,
+    ):
+        self.by_urn = PackedSet(keys, urns, merge_size)
+        self.by_tcu_key = tcu_keys if tcu_keys is not None else PackedSet(merge_size=merge_size)
+
+    @property
+    def urns(self) -> set:
+        return self.by_urn.texts
+
+    def __len__(self) -> int:
+        return len(self.by_urn)
+
+    def __contains__(self, urn: str) -> bool:
+        return self.by_urn.contains(urn_key(urn), urn)
+
+    def has_tcu_key(self, key: str) -> bool:
+        return self.by_tcu_key.contains(tcu_key_number(key), key)
+
+    def add(self, urn: str, url_tcu: str = None) -> None:
+        self.by_urn.add(urn_key(urn), urn)
+        key = tcu_key(url_tcu)
+        if key:
+            self.by_tcu_key.add(tcu_key_number(key), key)
+
+    @property
+    def memory_bytes(self) -> int:
+        return self.by_urn.memory_bytes + self.by_tcu_key.memory_bytes
+
+
+def downloaded_keys(cursor: sqlite3.Cursor) -> Iterator[Tuple[Union[int, None], str]]:
+    """
+    (chave, urn) dos documentos baixados; urn é None quando a urn tem chave numérica.
+    """
+    cursor.execute(f"SELECT urn FROM {STATE_TABLE} WHERE was_downloaded = 1")
+    for (urn,) in cursor:
+        key = urn_key(urn)
+        yield key, None if key is not None else urn
+
+
+def downloaded_tcu_keys(cursor: sqlite3.Cursor) -> Iterator[str]:
+    """
+    Chaves da api dos documentos com url_tcu (lidas do índice urltcu, quando existe).
+    """
+    table = body_table(detect_layout(cursor))
+    cursor.execute(f"SELECT url_tcu FROM {table} WHERE url_tcu IS NOT NULL")
+    for (url_tcu,) in cursor:
+        key = tcu_key(url_tcu)
+        if key:
+            yield key
+
+
+def load_membership(db_path: str = None, shards_dir: str = None, merge_size: int = 4096) -> UrnMembership:
+    """
+    Carrega as urns baixadas do banco de coleta ou de todos os shards.
+    """
+    if shards_dir:
+        router = ShardRouter(shards_dir)
+        connections = [router.connect(year, create=False) for year in router.years()]
+    else:
+        connections = [sqlite3.connect(db_path)]
+    keys = array("Q")
+    urns = []
+    tcu_numbers = array("Q")
+    tcu_texts = []
+    try:
+        for conn in connections:
+            for key, urn in downloaded_keys(conn.cursor()):
+                if key is None:
+                    urns.append(urn)
+                else:
+                    keys.append(key)
+            for key in downloaded_tcu_keys(conn.cursor()):
+                number = tcu_key_number(key)
+                if number is None:
+                    tcu_texts.append(key)
+                else:
+                    tcu_numbers.append(number)
+    finally:
+        for conn in connections:
+            conn.close()
+    return UrnMembership(keys, urns, merge_size, PackedSet(tcu_numbers, tcu_texts, merge_size))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carrega o conjunto de urns baixadas.")
+    parser.add_argument("--db", default="./db/acordaos-download.db")
+    parser.add_argument("--shards", default=None, help="diretório dos shards (substitui --db)")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    membership = load_membership(args.db, args.shards)
+    print(
+        f"{len(membership)} urns baixadas ({len(membership.urns)} sem chave numérica), "
+        f"{len(membership.by_tcu_key)} chaves da api, "
+        f"{membership.memory_bytes / 1024 ** 2:.1f}MB, carregadas em {time.perf_counter() - start:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
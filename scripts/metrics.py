@@ -0,0 +1,259 @@
+"""
+Contadores e histogramas de latência da coleta, exportados no formato texto
+do Prometheus (arquivo para o textfile collector do node_exporter ou endpoint
+HTTP local em /metrics).
+
+Usado pelos dois coletores (AcordaosTCU e o projeto scrapy). As métricas da
+coleta ficam no registro padrão `REGISTRY`:
+
+    acordaos_stage_seconds{crawler,stage}: latência por etapa
+        (lexml_fetch, api_fetch, tcu_fetch, parse, db_write, db_commit)
+    acordaos_documents_total{crawler}: documentos gravados
+    acordaos_document_bytes{crawler}: tamanho dos textos por documento
+    acordaos_errors_total{crawler,stage}: erros por etapa
+    acordaos_responses_total{crawler,stage,status}: respostas HTTP
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from scripts.large_text import SpooledText
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def format_labels(labels_names: Sequence[str], labels_values: Tuple) -> str:
+    if not labels_names:
+        return ""
+    pairs = []
+    for name, value in zip(labels_names, labels_values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """
+    Atributos:
+        name: nome da métrica no Prometheus.
+        documentation: texto do HELP.
+        labels_names: nomes dos labels, na ordem em que os valores são informados.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels_names = tuple(labels_names)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def labels_key(self, labels: Dict) -> Tuple:
+        if set(labels) != set(self.labels_names):
+            raise ValueError(
+                f"A métrica {self.name} usa os labels {', '.join(self.labels_names)}."
+            )
+        return tuple(labels[name] for name in self.labels_names)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self.labels_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self.values.get(self.labels_key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            items = sorted(self.values.items())
+        return [
+            f"{self.name}{format_labels(self.labels_names, key)} {format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels_names: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels_names)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self.labels_key(labels)
+        with self.lock:
+            # [contagem por bucket (não acumulada), soma, quantidade]
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        state = self.values.get(self.labels_key(labels))
+        return state[2] if state else 0
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            items = sorted(
+                (key, (list(state[0]), state[1], state[2])) for key, state in self.values.items()
+            )
+        lines = []
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for upper_bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = format_labels(self.labels_names + ("le",), key + (format_value(upper_bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.labels_names, key)
+            lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"A métrica {metric.name} já foi registrada.")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels_names: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels_names))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels_names: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labels_names, buckets))
+
+    def render(self) -> str:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """
+        Grava as métricas de forma atômica (arquivo temporário + rename), como
+        espera o textfile collector.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Inicia o endpoint /metrics em uma thread daemon. Retorna o servidor
+        (use shutdown() para encerrar).
+        """
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram(
+    "acordaos_stage_seconds", "Latência de cada etapa da coleta.", ("crawler", "stage")
+)
+DOCUMENTS = REGISTRY.counter(
+    "acordaos_documents_total", "Documentos gravados no banco de coleta.", ("crawler",)
+)
+DOCUMENT_BYTES = REGISTRY.histogram(
+    "acordaos_document_bytes",
+    "Tamanho dos textos de cada documento gravado (bytes, utf8).",
+    ("crawler",),
+    BYTES_BUCKETS,
+)
+ERRORS = REGISTRY.counter(
+    "acordaos_errors_total", "Erros por etapa da coleta.", ("crawler", "stage")
+)
+RESPONSES = REGISTRY.counter(
+    "acordaos_responses_total", "Respostas HTTP recebidas.", ("crawler", "stage", "status")
+)
+
+
+def document_size(values: Dict) -> int:
+    """
+    Bytes (utf8) dos campos de texto de um documento. Para os textos guardados
+    em arquivo temporário (SpooledText) é usada a quantidade de caracteres.
+    """
+    return sum(
+        len(value.encode("utf8")) if isinstance(value, str) else len(value)
+        for value in values.values()
+        if isinstance(value, (str, SpooledText))
+    )
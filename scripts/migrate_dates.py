@@ -0,0 +1,27 @@
+"""
+Normaliza as datas de sessão e de download do banco de coleta.
+
+Preenche a coluna data_sessao_iso a partir de data_sessao (dd/mm/aaaa),
+reescreve downloaded_at no formato ISO e registra em log os valores
+que não puderam ser convertidos.
+"""
+from pathlib import Path
+from scripts.dates import migrate_dates
+from scripts.core import initiate_db
+from scripts.schema import DOWNLOAD_INDEXES
+
+conn, cur = initiate_db("./db/acordaos-download.db")
+invalid_values = migrate_dates(
+    conn,
+    table_name="download_acordaos",
+    mapping={"data_sessao": "data_sessao_iso", "downloaded_at": "downloaded_at"},
+    chunk_size=5000,
+    indexes=[DOWNLOAD_INDEXES["datasessao"], DOWNLOAD_INDEXES["downloadedat"]],
+)
+conn.close()
+
+Path("./logs").mkdir(parents=True, exist_ok=True)
+with open("./logs/datas_invalidas.log", "w", encoding="utf8") as log:
+    for id_, col, value in invalid_values:
+        log.write(f"id {id_} com valor inválido na feature {col}: {value!r}\n")
+print(f"Migração concluída. {len(invalid_values)} valores não puderam ser convertidos.")
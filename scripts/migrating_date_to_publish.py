@@ -1,12 +1,13 @@
-from scripts.funcs import initiate_db, ResultIter, insert_into_db
+from scripts.core import initiate_db, ResultIter, insert_into_db
+from scripts.storage import detect_layout, document_source
 
 conn, cur = initiate_db("./db/acordaos-download.db")
 conn_pub, cur_pub = initiate_db("./db/tcu-acordaos.db")
 
-QUERY = """SELECT urn, urn_year, numero_acordao, relator, 
+QUERY = f"""SELECT urn, urn_year, numero_acordao, relator, 
         processo, tipo_processo, data_sessao, numero_ata, interessado_reponsavel_recorrente,
         entidade, representante_mp, unidade_tecnica, repr_legal, assunto, sumario,
-        acordao, quorum, relatorio, voto from download_acordaos"""
+        acordao, quorum, relatorio, voto from {document_source(detect_layout(cur))}"""
 
 cols_to_insert = [
     "urn",
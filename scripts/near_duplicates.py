@@ -0,0 +1,467 @@
+"""
+Detecção de quase-duplicatas com MinHash e LSH.
+
+Cada documento vira o conjunto dos seus shingles (sequências de
+`shingle_size` palavras de relatorio e voto) e é resumido por uma assinatura
+MinHash de `num_perm` inteiros de 32 bits, que estima a similaridade de Jaccard
+entre dois documentos sem compará-los por inteiro. As assinaturas são
+calculadas em paralelo e gravadas no banco como BLOB (uint32 little-endian,
+4 * num_perm bytes por documento).
+
+Para a busca, a assinatura é dividida em `bands` faixas; cada faixa gera uma
+chave de balde (minhash_bandas). Documentos que dividem ao menos um balde são
+candidatos e têm a similaridade estimada pelas assinaturas. Com 16 faixas de 8
+valores, pares com similaridade 0.8 viram candidatos em ~94,7% dos casos
+(1 - (1 - 0.8^8)^16) e pares com 0.4 em ~1%.
+
+A atualização é incremental: cada assinatura guarda a versão do conteúdo do
+documento (scripts.storage.corpus_versions); documentos novos ou alterados são
+assinados de novo, com os baldes antigos removidos, e as assinaturas de
+documentos que saíram do banco são apagadas. No banco publicado, recriado a
+cada build, as tabelas minhash* são copiadas do arquivo anterior por
+scripts.build_publication, e a atualização seguinte assina só as urns cujo
+hash mudou.
+
+Os grupos de quase-duplicatas (união dos pares acima do limiar) ficam em
+minhash_grupos, com a menor urn do grupo como representante.
+
+Uso:
+    python -m scripts.near_duplicates update [--db ./db/tcu-acordaos.db] [--workers 4] [--rebuild]
+    python -m scripts.near_duplicates similar <urn> [--threshold 0.8]
+    python -m scripts.near_duplicates clusters [--threshold 0.8]
+"""
+import argparse
+import os
+import re
+import sqlite3
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from scripts.storage import corpus_versions
+
+TEXT_COLUMNS = ("relatorio", "voto")
+NON_WORD = re.compile(r"\W+")
+MAX_HASH = np.uint32(0xFFFFFFFF)
+BLOCK_SIZE = 4096
+SHINGLE_BASE = np.uint64(1000003)
+
+MINHASH_TABLES = """
+CREATE TABLE IF NOT EXISTS minhash (
+        urn TEXT NOT NULL PRIMARY KEY,
+        shingles INTEGER NOT NULL,
+        assinatura BLOB NOT NULL,
+        versao TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS minhash_bandas (
+        banda INTEGER NOT NULL,
+        chave INTEGER NOT NULL,
+        urn TEXT NOT NULL,
+        PRIMARY KEY (banda, chave, urn)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS minhashbandasurn ON minhash_bandas(urn);
+CREATE TABLE IF NOT EXISTS minhash_parametros (
+        nome TEXT NOT NULL PRIMARY KEY,
+        valor INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS minhash_grupos (
+        urn TEXT NOT NULL PRIMARY KEY,
+        grupo TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS minhashgrupo ON minhash_grupos(grupo);
+"""
+
+
+class MinHasher:
+    """
+    Atributos:
+        num_perm: quantidade de funções de hash (tamanho da assinatura).
+        bands: faixas do LSH; num_perm deve ser múltiplo de bands.
+        shingle_size: palavras por shingle.
+        seed: semente das funções de hash; assinaturas só são comparáveis
+            quando geradas com os mesmos parâmetros.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 16, shingle_size: int = 5, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm deve ser múltiplo de bands.")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.seed = seed
+        rng = np.random.RandomState(seed)
+        # hashing multiplica-desloca: ((a * x + b) mod 2^64) >> 32, com a ímpar
+        self.a = rng.randint(0, 2 ** 63, size=(num_perm, 1), dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.randint(0, 2 ** 63, size=(num_perm, 1), dtype=np.uint64)
+        self.band_weights = rng.randint(0, 2 ** 63, size=self.rows, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+    @property
+    def parameters(self) -> Dict[str, int]:
+        return {
+            "num_perm": self.num_perm,
+            "bands": self.bands,
+            "shingle_size": self.shingle_size,
+            "seed": self.seed,
+        }
+
+    def shingles(self, text: str) -> np.ndarray:
+        """
+        Hashes (uint64) dos shingles distintos do texto.
+        """
+        words = NON_WORD.sub(" ", text.lower()).split()
+        if len(words) < self.shingle_size:
+            return np.empty(0, dtype=np.uint64)
+        hashes = np.fromiter(
+            map(zlib.crc32, map(str.encode, words)), dtype=np.uint64, count=len(words)
+        )
+        count = len(words) - self.shingle_size + 1
+        shingles = np.zeros(count, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            for offset in range(self.shingle_size):
+                shingles = shingles * SHINGLE_BASE + hashes[offset : offset + count]
+        return np.unique(shingles)
+
+    def signature(self, shingles: np.ndarray) -> np.ndarray:
+        signature = np.full(self.num_perm, MAX_HASH, dtype=np.uint32)
+        with np.errstate(over="ignore"):
+            for start in range(0, len(shingles), BLOCK_SIZE):
+                block = shingles[start : start + BLOCK_SIZE]
+                hashed = ((self.a * block + self.b) >> np.uint64(32)).astype(np.uint32)
+                np.minimum(signature, hashed.min(axis=1), out=signature)
+        return signature
+
+    def band_keys(self, signature: np.ndarray) -> List[int]:
+        """
+        Chave (int64, para caber no INTEGER do sqlite) de cada faixa da assinatura.
+        """
+        with np.errstate(over="ignore"):
+            keys = (signature.reshape(self.bands, self.rows).astype(np.uint64) * self.band_weights).sum(
+                axis=1, dtype=np.uint64
+            )
+        return keys.view(np.int64).tolist()
+
+
+def pack(signature: np.ndarray) -> bytes:
+    return signature.astype("<u4").tobytes()
+
+
+def unpack(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype="<u4")
+
+
+def similarity(signature: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """
+    Jaccard estimado entre uma assinatura e cada linha de `others`.
+    """
+    return (others == signature).mean(axis=1)
+
+
+def signature_batch(hasher: MinHasher, rows: Sequence[Tuple]) -> List[Tuple]:
+    """
+    Executado nos processos auxiliares: (urn, versão, relatorio, voto) ->
+    (urn, versão, quantidade de shingles, assinatura empacotada, chaves das faixas).
+    """
+    results = []
+    for urn, versao, *texts in rows:
+        shingles = hasher.shingles(" ".join(text for text in texts if text))
+        signature = hasher.signature(shingles)
+        keys = hasher.band_keys(signature) if len(shingles) else []
+        results.append((urn, versao, len(shingles), pack(signature), keys))
+    return results
+
+
+def create_minhash_tables(cursor: sqlite3.Cursor) -> None:
+    existing_cols = {row[1] for row in cursor.execute("PRAGMA table_info(minhash)")}
+    if existing_cols and "versao" not in existing_cols:
+        # tabelas anteriores à versão do conteúdo: documentos com versão conhecida são assinados de novo
+        cursor.execute("ALTER TABLE minhash ADD COLUMN versao TEXT")
+    cursor.executescript(MINHASH_TABLES)
+
+
+def load_hasher(cursor: sqlite3.Cursor, hasher: MinHasher = None) -> MinHasher:
+    """
+    Retorna o MinHasher com os parâmetros gravados no banco. Na primeira
+    execução grava os parâmetros de `hasher` (ou os padrões).
+    """
+    stored = dict(cursor.execute("SELECT nome, valor FROM minhash_parametros"))
+    if not stored:
+        hasher = hasher or MinHasher()
+        cursor.executemany(
+            "INSERT INTO minhash_parametros (nome, valor) VALUES (?, ?)", hasher.parameters.items()
+        )
+        return hasher
+    if hasher and hasher.parameters != stored:
+        raise ValueError(
+            f"As assinaturas do banco foram geradas com {stored}; use --rebuild para trocar os parâmetros."
+        )
+    return MinHasher(**stored)
+
+
+def iter_pending_batches(cursor: sqlite3.Cursor, batch_size: int) -> Iterator[List[Tuple]]:
+    """
+    Lotes de (urn, versão, relatorio, voto) dos documentos sem assinatura ou
+    com assinatura de outra versão do conteúdo.
+    """
+    source, condition, urn_column, version = corpus_versions(cursor)
+    ids = [
+        row[0]
+        for row in cursor.execute(
+            f"SELECT id FROM {source} WHERE {condition} AND NOT EXISTS "
+            f"(SELECT 1 FROM minhash WHERE minhash.urn = {urn_column} AND minhash.versao IS {version}) "
+            "ORDER BY id"
+        )
+    ]
+    select_string = f"SELECT urn, {version}, {', '.join(TEXT_COLUMNS)} FROM {source} WHERE id IN "
+    for start in range(0, len(ids), batch_size):
+        batch_ids = ids[start : start + batch_size]
+        yield cursor.execute(
+            select_string + f"({', '.join('?' for _ in batch_ids)})", batch_ids
+        ).fetchall()
+
+
+def store_signatures(conn: sqlite3.Connection, results: Iterable[Tuple]) -> int:
+    signatures = []
+    bands = []
+    for urn, versao, shingles, blob, keys in results:
+        signatures.append((urn, shingles, blob, versao))
+        bands.extend((band, key, urn) for band, key in enumerate(keys))
+    # baldes da assinatura anterior, quando o documento foi alterado
+    conn.executemany("DELETE FROM minhash_bandas WHERE urn = ?", [(row[0],) for row in signatures])
+    conn.executemany(
+        "INSERT OR REPLACE INTO minhash (urn, shingles, assinatura, versao) VALUES (?, ?, ?, ?)",
+        signatures,
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO minhash_bandas (banda, chave, urn) VALUES (?, ?, ?)", bands
+    )
+    conn.commit()
+    return len(signatures)
+
+
+def update_signatures(
+    strcnx: str,
+    workers: int = None,
+    batch_size: int = 200,
+    rebuild: bool = False,
+    hasher: MinHasher = None,
+) -> Dict[str, float]:
+    """
+    Calcula as assinaturas dos documentos novos ou alterados, atualiza os
+    baldes do LSH e remove as assinaturas dos documentos que saíram do banco.
+
+    Atributos:
+        workers: processos de cálculo (padrão: quantidade de CPUs).
+        batch_size: documentos enviados por vez a cada processo.
+        rebuild: apaga assinaturas, baldes e grupos e recalcula tudo.
+        hasher: parâmetros do MinHash (apenas na primeira execução ou com rebuild).
+    """
+    start = time.perf_counter()
+    conn = sqlite3.connect(strcnx)
+    cursor = conn.cursor()
+    if rebuild:
+        cursor.executescript(
+            "DROP TABLE IF EXISTS minhash; DROP TABLE IF EXISTS minhash_bandas; "
+            "DROP TABLE IF EXISTS minhash_parametros; DROP TABLE IF EXISTS minhash_grupos;"
+        )
+    create_minhash_tables(cursor)
+    hasher = load_hasher(cursor, hasher)
+    conn.commit()
+    removed = remove_missing(conn)
+
+    documents = 0
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # no máximo 2 lotes por processo aguardando, para limitar a memória
+        window = []
+        for batch in iter_pending_batches(conn.cursor(), batch_size):
+            window.append(executor.submit(signature_batch, hasher, batch))
+            if len(window) >= 2 * workers:
+                documents += store_signatures(conn, window.pop(0).result())
+        for future in window:
+            documents += store_signatures(conn, future.result())
+    conn.close()
+    return {"documentos": documents, "removidos": removed, "total_s": time.perf_counter() - start}
+
+
+def remove_missing(conn: sqlite3.Connection) -> int:
+    """
+    Apaga assinaturas e baldes das urns que não estão mais no banco.
+    """
+    source, condition, urn_column, _ = corpus_versions(conn.cursor())
+    missing = conn.execute(
+        f"SELECT urn FROM minhash WHERE NOT EXISTS "
+        f"(SELECT 1 FROM {source} WHERE {urn_column} = minhash.urn AND {condition})"
+    ).fetchall()
+    conn.executemany("DELETE FROM minhash_bandas WHERE urn = ?", missing)
+    conn.executemany("DELETE FROM minhash WHERE urn = ?", missing)
+    conn.commit()
+    return len(missing)
+
+
+def candidates(cursor: sqlite3.Cursor, hasher: MinHasher, signature: np.ndarray) -> List[str]:
+    """
+    Urns que dividem ao menos um balde com a assinatura.
+    """
+    found = set()
+    for band, key in enumerate(hasher.band_keys(signature)):
+        found.update(
+            row[0]
+            for row in cursor.execute(
+                "SELECT urn FROM minhash_bandas WHERE banda = ? AND chave = ?", (band, key)
+            )
+        )
+    return sorted(found)
+
+
+def load_signatures(cursor: sqlite3.Cursor, urns: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+    found_urns = []
+    blobs = []
+    # respeita o limite de variáveis por consulta das versões antigas do sqlite
+    for start in range(0, len(urns), 900):
+        chunk = urns[start : start + 900]
+        for urn, blob in cursor.execute(
+            f"SELECT urn, assinatura FROM minhash WHERE urn IN ({', '.join('?' for _ in chunk)})",
+            chunk,
+        ):
+            found_urns.append(urn)
+            blobs.append(blob)
+    if not blobs:
+        return [], np.empty((0, 0), dtype=np.uint32)
+    return found_urns, np.frombuffer(b"".join(blobs), dtype="<u4").reshape(len(blobs), -1)
+
+
+def similar(
+    cursor: sqlite3.Cursor, urn: str, threshold: float = 0.8
+) -> List[Tuple[str, float]]:
+    """
+    Quase-duplicatas da urn: (urn, similaridade estimada), da mais parecida para a menos.
+    """
+    hasher = load_hasher(cursor)
+    row = cursor.execute("SELECT shingles, assinatura FROM minhash WHERE urn = ?", (urn,)).fetchone()
+    if row is None:
+        raise KeyError(f"A urn {urn} não tem assinatura; rode o update antes.")
+    if not row[0]:
+        return []
+    signature = unpack(row[1])
+    urns, signatures = load_signatures(
+        cursor, [other for other in candidates(cursor, hasher, signature) if other != urn]
+    )
+    if not urns:
+        return []
+    scores = similarity(signature, signatures)
+    matches = [(other, float(score)) for other, score in zip(urns, scores) if score >= threshold]
+    return sorted(matches, key=lambda match: (-match[1], match[0]))
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item: str) -> str:
+        parent = self.parent.setdefault(item, item)
+        while parent != self.parent[parent]:
+            # compressão de caminho pela metade
+            self.parent[item] = self.parent[parent]
+            item, parent = parent, self.parent[parent]
+        return parent
+
+    def union(self, first: str, second: str) -> None:
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            # a menor urn fica como representante do grupo
+            if second < first:
+                first, second = second, first
+            self.parent[second] = first
+
+    def groups(self) -> Dict[str, str]:
+        return {item: self.find(item) for item in self.parent}
+
+
+def build_clusters(
+    strcnx: str, threshold: float = 0.8, max_bucket: int = 100
+) -> Dict[str, float]:
+    """
+    Agrupa os pares de quase-duplicatas e grava minhash_grupos.
+
+    Atributos:
+        threshold: similaridade estimada mínima para ligar dois documentos.
+        max_bucket: baldes maiores que isso comparam cada documento apenas
+            com o primeiro do balde, em vez de todos os pares.
+    """
+    start = time.perf_counter()
+    conn = sqlite3.connect(strcnx)
+    cursor = conn.cursor()
+    buckets = [
+        urns.split("\t")
+        for (urns,) in cursor.execute(
+            "SELECT group_concat(urn, char(9)) FROM minhash_bandas "
+            "GROUP BY banda, chave HAVING count(*) > 1"
+        )
+    ]
+    involved = sorted({urn for bucket in buckets for urn in bucket})
+    urns, signatures = load_signatures(cursor, involved)
+    index = {urn: position for position, urn in enumerate(urns)}
+
+    union_find = UnionFind()
+    compared = 0
+    for bucket in buckets:
+        rows = signatures[[index[urn] for urn in bucket]]
+        pivots = range(1) if len(bucket) > max_bucket else range(len(bucket) - 1)
+        for pivot in pivots:
+            scores = similarity(rows[pivot], rows[pivot + 1 :])
+            compared += len(scores)
+            for offset in np.nonzero(scores >= threshold)[0]:
+                union_find.union(bucket[pivot], bucket[pivot + 1 + offset])
+
+    groups = union_find.groups()
+    cursor.execute("DELETE FROM minhash_grupos")
+    cursor.executemany("INSERT INTO minhash_grupos (urn, grupo) VALUES (?, ?)", groups.items())
+    conn.commit()
+    conn.close()
+    return {
+        "baldes": len(buckets),
+        "comparacoes": compared,
+        "documentos_agrupados": len(groups),
+        "grupos": len(set(groups.values())),
+        "total_s": time.perf_counter() - start,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quase-duplicatas com MinHash/LSH.")
+    parser.add_argument("command", choices=("update", "similar", "clusters"))
+    parser.add_argument("urn", nargs="?")
+    parser.add_argument("--db", default="./db/tcu-acordaos.db")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--rebuild", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    if args.command == "update":
+        stats = update_signatures(args.db, args.workers, args.batch_size, args.rebuild)
+        print(
+            f"{stats['documentos']} assinaturas calculadas, {stats['removidos']} removidas "
+            f"em {stats['total_s']:.1f}s"
+        )
+    elif args.command == "clusters":
+        stats = build_clusters(args.db, args.threshold)
+        print(
+            f"{stats['grupos']} grupos com {stats['documentos_agrupados']} documentos "
+            f"({stats['baldes']} baldes, {stats['comparacoes']} comparações) em {stats['total_s']:.1f}s"
+        )
+    else:
+        if not args.urn:
+            parser.error("informe a urn")
+        conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+        for urn, score in similar(conn.cursor(), args.urn, args.threshold):
+            print(f"{urn}\t{score:.3f}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
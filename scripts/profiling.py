@@ -0,0 +1,139 @@
+"""
+Profiling por amostragem: apenas uma fração das chamadas roda sob cProfile e
+os resultados são agregados por chave (ex.: nome do callback do spider).
+
+Com taxas baixas (1% por padrão) o custo fica restrito às chamadas sorteadas;
+as demais pagam apenas o sorteio. Os relatórios trazem, para cada chave, as
+N funções com maior tempo acumulado.
+"""
+import cProfile
+import io
+import pstats
+import random
+import threading
+import time
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+
+class SampledProfiler:
+    """
+    Atributos:
+        sample_rate: fração das chamadas que roda sob cProfile (0 a 1).
+        top_n: quantidade de funções por chave nos relatórios.
+        sort_key: ordenação do pstats (cumulative, tottime, ...).
+    """
+
+    def __init__(
+        self, sample_rate: float = 0.01, top_n: int = 20, sort_key: str = "cumulative", seed: int = None
+    ):
+        self.sample_rate = sample_rate
+        self.top_n = top_n
+        self.sort_key = sort_key
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.calls = {}
+        self.sampled = {}
+        self.started_at = time.time()
+
+    def should_sample(self, key: str) -> bool:
+        with self.lock:
+            self.calls[key] = self.calls.get(key, 0) + 1
+            return self.rng.random() < self.sample_rate
+
+    def add(self, key: str, profile: cProfile.Profile) -> None:
+        profile.create_stats()
+        with self.lock:
+            self.sampled[key] = self.sampled.get(key, 0) + 1
+            if not profile.stats:
+                return
+            if key in self.stats:
+                self.stats[key].add(profile)
+            else:
+                self.stats[key] = pstats.Stats(profile)
+
+    def call(self, key: str, func: Callable, *args, **kwargs):
+        """
+        Executa func, sob cProfile quando a chamada é sorteada.
+        """
+        if not self.should_sample(key):
+            return func(*args, **kwargs)
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(func, *args, **kwargs)
+        finally:
+            self.add(key, profile)
+
+    def iterate(self, key: str, iterable: Iterable) -> Iterator:
+        """
+        Consome o iterável (ex.: callback gerador do scrapy) e, quando sorteado,
+        mede apenas o tempo gasto dentro dele: o profiler é desligado a cada
+        item retornado, para não contar o processamento feito por quem consome.
+        """
+        if not self.should_sample(key):
+            yield from iterable
+            return
+        profile = cProfile.Profile()
+        iterator = iter(iterable)
+        try:
+            while True:
+                profile.enable()
+                try:
+                    value = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    profile.disable()
+                yield value
+        finally:
+            self.add(key, profile)
+
+    def wrap(self, key: str, func: Callable, generator: bool = False) -> Callable:
+        if generator:
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                return self.iterate(key, func(*args, **kwargs) or ())
+
+        else:
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                return self.call(key, func, *args, **kwargs)
+
+        return wrapper
+
+    def report(self) -> str:
+        output = io.StringIO()
+        elapsed = time.time() - self.started_at
+        output.write(
+            f"Profiling por amostragem: taxa {self.sample_rate:.2%}, {elapsed:.0f}s de coleta\n"
+        )
+        with self.lock:
+            for key in sorted(self.stats):
+                stats = self.stats[key]
+                output.write(
+                    f"\n=== {key}: {self.sampled[key]} de {self.calls.get(key, 0)} chamadas amostradas, "
+                    f"{stats.total_tt:.3f}s medidos\n"
+                )
+                stats.stream = output
+                stats.sort_stats(self.sort_key).print_stats(self.top_n)
+        return output.getvalue()
+
+    def write_report(self, directory: str) -> Path:
+        """
+        Grava o relatório texto (report.txt) e um .prof por chave, que pode ser
+        aberto com pstats ou snakeviz.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        report_path = directory / "report.txt"
+        tmp_path = directory / "report.txt.tmp"
+        tmp_path.write_text(self.report(), encoding="utf8")
+        tmp_path.replace(report_path)
+        with self.lock:
+            for key, stats in self.stats.items():
+                stats.dump_stats(str(directory / f"{key}.prof"))
+        return report_path
@@ -0,0 +1,192 @@
+"""
+Roda EXPLAIN QUERY PLAN nas consultas conhecidas do projeto e aponta as que
+fazem varredura completa da tabela ou ordenação em árvore temporária.
+
+Uso:
+    python -m scripts.query_advisor [--download ./db/acordaos-download.db]
+        [--publish ./db/tcu-acordaos.db] [--create-indexes]
+
+Retorna código de saída 1 quando alguma consulta foi sinalizada.
+"""
+import argparse
+import sqlite3
+import sys
+from pathlib import Path
+from typing import List, NamedTuple, Tuple
+
+from scripts.schema import DOWNLOAD_INDEXES, PUBLISH_INDEXES, SPLIT_INDEXES, create_indexes
+from scripts.storage import LAYOUTS, SINGLE, SPLIT, detect_layout
+
+
+class KnownQuery(NamedTuple):
+    origem: str
+    query_string: str
+    params: Tuple = ()
+    # consultas que precisam ler a tabela inteira (ex.: cópia para publicação)
+    full_scan_expected: bool = False
+    # layouts do banco de coleta em que a consulta se aplica (scripts.storage)
+    layouts: Tuple = LAYOUTS
+
+
+DOWNLOAD_QUERIES = [
+    KnownQuery(
+        "ApiSpider.start_requests (com ano)",
+        "SELECT url_lexml from download_acordaos where urn_year = ? and was_downloaded = 0",
+        (2019,),
+    ),
+    KnownQuery(
+        "ApiSpider.start_requests / AcordaosTCU.get_urls / create_url_list_to_crawl",
+        "SELECT url_lexml from download_acordaos where was_downloaded = 0",
+    ),
+    KnownQuery(
+        "ApiacordaoPipeline.store_db / AcordaosTCU.update_a_record / parse_log_into_db",
+        "UPDATE download_acordaos SET was_downloaded = 1, downloaded_at = ? WHERE urn = ?",
+        ("2019-08-31", "urn:lex:br:tribunal.contas.uniao:acordao:2019-08-28;2000"),
+    ),
+    KnownQuery(
+        "delete_from_db",
+        "DELETE from download_acordaos WHERE urn = ?",
+        ("urn:lex:br:tribunal.contas.uniao:acordao:2019-08-28;2000",),
+    ),
+    KnownQuery(
+        "anonimizar_cpf",
+        "SELECT id, interessado_reponsavel_recorrente, repr_legal, sumario, acordao, quorum, "
+        "relatorio, voto from download_acordaos where urn_year = 2018 or urn_year = 2019",
+        layouts=(SINGLE,),
+    ),
+    KnownQuery(
+        "anonimizar_cpf",
+        "SELECT id, interessado_reponsavel_recorrente, repr_legal, sumario, acordao, quorum, "
+        "relatorio, voto from download_acordaos JOIN download_acordaos_corpo USING (id) "
+        "where urn_year = 2018 or urn_year = 2019",
+        layouts=(SPLIT,),
+    ),
+    KnownQuery(
+        "consulta por período da sessão",
+        "SELECT urn from download_acordaos where data_sessao_iso between ? and ?",
+        ("2019-01-01", "2019-12-31"),
+        layouts=(SINGLE,),
+    ),
+    KnownQuery(
+        "consulta por período da sessão",
+        "SELECT urn from download_acordaos JOIN download_acordaos_corpo USING (id) "
+        "where data_sessao_iso between ? and ?",
+        ("2019-01-01", "2019-12-31"),
+        layouts=(SPLIT,),
+    ),
+    KnownQuery(
+        "migrating_date_to_publish",
+        "SELECT urn, urn_year, numero_acordao from download_acordaos",
+        full_scan_expected=True,
+    ),
+]
+
+PUBLISH_QUERIES = [
+    KnownQuery(
+        "AcordaosReader.get (urn)",
+        "SELECT id, urn FROM acordaos WHERE urn = ? ORDER BY id LIMIT 1",
+        ("urn:lex:br:tribunal.contas.uniao:acordao:2019-08-28;2000",),
+    ),
+    KnownQuery(
+        "AcordaosReader.get_by (numero_acordao)",
+        "SELECT id, urn FROM acordaos WHERE numero_acordao = ? ORDER BY id LIMIT 1",
+        ("2000",),
+    ),
+    KnownQuery(
+        "AcordaosReader.select (ano)",
+        "SELECT id, urn FROM acordaos WHERE ano_acordao = ? AND id > ? ORDER BY id LIMIT 100",
+        (2019, 0),
+    ),
+    KnownQuery(
+        "AcordaosReader.select (relator)",
+        "SELECT id, urn FROM acordaos WHERE relator = ? AND id > ? ORDER BY id LIMIT 100",
+        ("BENJAMIN ZYMLER", 0),
+    ),
+    KnownQuery(
+        "AcordaosReader.select (unidade_tecnica)",
+        "SELECT id, urn FROM acordaos WHERE unidade_tecnica = ? AND id > ? ORDER BY id LIMIT 100",
+        ("SECEX-SP", 0),
+    ),
+    KnownQuery(
+        "AcordaosReader.select (listagem)",
+        "SELECT id, urn FROM acordaos WHERE id > ? ORDER BY id LIMIT 100",
+        (0,),
+    ),
+]
+
+
+def explain(cursor: sqlite3.Cursor, query: KnownQuery) -> List[str]:
+    rows = cursor.execute(f"EXPLAIN QUERY PLAN {query.query_string}", query.params).fetchall()
+    return [row[-1] for row in rows]
+
+
+def plan_problems(plan: List[str]) -> List[str]:
+    """
+    Passos do plano que indicam varredura completa ou ordenação sem índice.
+    """
+    problems = []
+    for step in plan:
+        if step.startswith("SCAN") and "INDEX" not in step:
+            problems.append(step)
+        elif "USE TEMP B-TREE" in step:
+            problems.append(step)
+    return problems
+
+
+def advise(strcnx: str, queries: List[KnownQuery]) -> int:
+    conn = sqlite3.connect(f"file:{Path(strcnx).resolve().as_posix()}?mode=ro", uri=True)
+    cursor = conn.cursor()
+    layout = detect_layout(cursor)
+    flagged = 0
+    print(f"== {strcnx}")
+    for query in queries:
+        if layout not in query.layouts:
+            continue
+        try:
+            plan = explain(cursor, query)
+        except sqlite3.OperationalError as error:
+            print(f"[ERRO] {query.origem}: {error}")
+            flagged += 1
+            continue
+        problems = [] if query.full_scan_expected else plan_problems(plan)
+        status = "ALERTA" if problems else "ok"
+        print(f"[{status}] {query.origem}")
+        for step in plan:
+            print(f"        {step}")
+        flagged += bool(problems)
+    conn.close()
+    return flagged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica o plano das consultas conhecidas.")
+    parser.add_argument("--download", default="./db/acordaos-download.db")
+    parser.add_argument("--publish", default="./db/tcu-acordaos.db")
+    parser.add_argument(
+        "--create-indexes", action="store_true", help="cria os índices ausentes antes da análise"
+    )
+    args = parser.parse_args()
+
+    flagged = 0
+    for strcnx, queries, indexes in (
+        (args.download, DOWNLOAD_QUERIES, DOWNLOAD_INDEXES),
+        (args.publish, PUBLISH_QUERIES, PUBLISH_INDEXES),
+    ):
+        if not Path(strcnx).is_file():
+            print(f"== {strcnx} não encontrado, ignorando.")
+            continue
+        if args.create_indexes:
+            conn = sqlite3.connect(strcnx)
+            if indexes is DOWNLOAD_INDEXES and detect_layout(conn.cursor()) == SPLIT:
+                indexes = SPLIT_INDEXES
+            create_indexes(conn.cursor(), indexes)
+            conn.execute("ANALYZE")
+            conn.commit()
+            conn.close()
+        flagged += advise(strcnx, queries)
+    print(f"{flagged} consulta(s) sinalizada(s).")
+    sys.exit(1 if flagged else 0)
+
+
+if __name__ == "__main__":
+    main()
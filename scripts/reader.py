@@ -0,0 +1,267 @@
+"""
+Camada de leitura do banco publicado (tcu-acordaos.db).
+
+As colunas de metadados são carregadas junto com a consulta, enquanto os
+textos longos (acordao, relatorio e voto) só são lidos do banco no primeiro
+acesso ao atributo correspondente.
+
+Observação: no sqlite as colunas são armazenadas na ordem do CREATE TABLE e
+`quorum` fica depois de `acordao`. Projetar `quorum` obriga o sqlite a
+percorrer as páginas de overflow de `acordao`; para listagens de todo o
+corpus, deixe-o fora da projeção.
+"""
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+TABLE_NAME = "acordaos"
+
+METADATA_COLUMNS = (
+    "id",
+    "urn",
+    "ano_acordao",
+    "numero_acordao",
+    "relator",
+    "processo",
+    "tipo_processo",
+    "data_sessao",
+    "numero_ata",
+    "interessado_reponsavel_recorrente",
+    "entidade",
+    "representante_mp",
+    "unidade_tecnica",
+    "repr_legal",
+    "assunto",
+    "sumario",
+    "quorum",
+)
+LAZY_COLUMNS = ("acordao", "relatorio", "voto")
+ALL_COLUMNS = METADATA_COLUMNS + LAZY_COLUMNS
+
+
+def database_version(strcnx: Union[str, Path]) -> str:
+    """
+    Identifica a versão do arquivo do banco (muda a cada rebuild ou escrita).
+    """
+    stat = os.stat(strcnx)
+    return f"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+
+class LazyColumn:
+    """
+    Descritor que busca a coluna de texto no banco no primeiro acesso.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.slot = f"_{name}"
+
+    def __get__(self, record, owner):
+        if record is None:
+            return self
+        try:
+            return getattr(record, self.slot)
+        except AttributeError:
+            value = record._reader.fetch_column(record.id, self.name)
+            setattr(record, self.slot, value)
+            return value
+
+    def __set__(self, record, value):
+        setattr(record, self.slot, value)
+
+
+class Acordao:
+    """
+    Registro de um acórdão. Colunas fora da projeção não são atribuídas e o
+    acesso a elas levanta AttributeError.
+    """
+
+    __slots__ = METADATA_COLUMNS + tuple(f"_{col}" for col in LAZY_COLUMNS) + (
+        "_reader",
+    )
+
+    acordao = LazyColumn("acordao")
+    relatorio = LazyColumn("relatorio")
+    voto = LazyColumn("voto")
+
+    def __init__(self, reader: "AcordaosReader", cols_names: Iterable[str], row: Tuple):
+        self._reader = reader
+        for col, value in zip(cols_names, row):
+            setattr(self, col, value)
+
+    def __repr__(self) -> str:
+        return f"Acordao(id={getattr(self, 'id', None)}, urn={getattr(self, 'urn', None)!r})"
+
+    def is_loaded(self, col: str) -> bool:
+        """
+        Indica se a coluna já está em memória (sem disparar a leitura lazy).
+        """
+        slot = f"_{col}" if col in LAZY_COLUMNS else col
+        return hasattr(self, slot)
+
+    def as_dict(self, cols_names: Iterable[str] = None) -> Dict:
+        """
+        Converte o registro em dicionário. Sem `cols_names`, inclui apenas as
+        colunas já carregadas.
+        """
+        if cols_names is None:
+            cols_names = [col for col in ALL_COLUMNS if self.is_loaded(col)]
+        return {col: getattr(self, col) for col in cols_names}
+
+
+class AcordaosReader:
+    """
+    Leitura tipada e em streaming da tabela de acórdãos publicada.
+
+    Atributos:
+        strcnx: caminho do arquivo sqlite3.
+        read_only: abre o banco com mode=ro.
+    """
+
+    def __init__(self, strcnx: str = "./db/tcu-acordaos.db", read_only: bool = True):
+        path = Path(strcnx)
+        if not path.is_file():
+            raise FileNotFoundError("O arquivo sqlite3 não existe.")
+        self.path = path
+        if read_only:
+            self.conn = sqlite3.connect(
+                f"file:{path.resolve().as_posix()}?mode=ro", uri=True, check_same_thread=False
+            )
+        else:
+            self.conn = sqlite3.connect(str(path), check_same_thread=False)
+
+    def __enter__(self) -> "AcordaosReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    @staticmethod
+    def projection(columns: Iterable[str] = None) -> List[str]:
+        """
+        Valida a projeção. O id é sempre incluído, pois é a chave das leituras lazy.
+        """
+        if columns is None:
+            return list(METADATA_COLUMNS)
+        invalid_cols = [col for col in columns if col not in ALL_COLUMNS]
+        if invalid_cols:
+            raise ValueError(f"Colunas inexistentes: {', '.join(invalid_cols)}.")
+        cols_names = [col for col in columns if col != "id"]
+        return ["id"] + cols_names
+
+    @staticmethod
+    def where_clause(
+        ano: Union[int, Iterable[int]] = None,
+        relator: str = None,
+        unidade_tecnica: str = None,
+        after_id: int = None,
+    ) -> Tuple[str, List]:
+        conditions = []
+        params = []
+        if ano is not None:
+            if isinstance(ano, int):
+                conditions.append("ano_acordao = ?")
+                params.append(ano)
+            else:
+                anos = list(ano)
+                conditions.append(f"ano_acordao IN ({','.join('?' for _ in anos)})")
+                params.extend(anos)
+        if relator is not None:
+            conditions.append("relator = ?")
+            params.append(relator)
+        if unidade_tecnica is not None:
+            conditions.append("unidade_tecnica = ?")
+            params.append(unidade_tecnica)
+        if after_id is not None:
+            conditions.append("id > ?")
+            params.append(after_id)
+        if not conditions:
+            return "", params
+        return f"WHERE {' AND '.join(conditions)}", params
+
+    def select(
+        self,
+        columns: Iterable[str] = None,
+        ano: Union[int, Iterable[int]] = None,
+        relator: str = None,
+        unidade_tecnica: str = None,
+        after_id: int = None,
+        limit: int = None,
+        batch_size: int = 1000,
+    ) -> Iterator[Acordao]:
+        """
+        Itera sobre os acórdãos em ordem de id, lendo `batch_size` linhas por vez.
+
+        Atributos:
+            columns: colunas carregadas de imediato (padrão: METADATA_COLUMNS).
+            ano, relator, unidade_tecnica: filtros por igualdade.
+            after_id: retorna apenas registros com id maior (paginação por chave).
+            limit: quantidade máxima de registros.
+            batch_size: tamanho do fetchmany.
+        """
+        cols_names = AcordaosReader.projection(columns)
+        where_string, params = AcordaosReader.where_clause(
+            ano, relator, unidade_tecnica, after_id
+        )
+        query_string = f"SELECT {', '.join(cols_names)} FROM {TABLE_NAME} {where_string} ORDER BY id"
+        if limit is not None:
+            query_string += " LIMIT ?"
+            params.append(limit)
+        cursor = self.conn.cursor()
+        cursor.execute(query_string, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield Acordao(self, cols_names, row)
+        finally:
+            cursor.close()
+
+    def get(self, urn: str, columns: Iterable[str] = None) -> Union[Acordao, None]:
+        """
+        Busca um acórdão pela urn.
+        """
+        return self.get_by("urn", urn, columns)
+
+    def get_by(self, col: str, value, columns: Iterable[str] = None) -> Union[Acordao, None]:
+        """
+        Busca o primeiro acórdão (menor id) com `col` igual a `value`.
+        """
+        if col not in METADATA_COLUMNS:
+            raise ValueError(f"Coluna inexistente: {col}.")
+        cols_names = AcordaosReader.projection(columns)
+        row = self.conn.execute(
+            f"SELECT {', '.join(cols_names)} FROM {TABLE_NAME} WHERE {col} = ? ORDER BY id LIMIT 1",
+            (value,),
+        ).fetchone()
+        if row is None:
+            return None
+        return Acordao(self, cols_names, row)
+
+    def fetch_column(self, id_: int, col: str) -> Union[str, None]:
+        if col not in ALL_COLUMNS:
+            raise ValueError(f"Coluna inexistente: {col}.")
+        row = self.conn.execute(
+            f"SELECT {col} FROM {TABLE_NAME} WHERE id = ?", (id_,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def load_texts(self, record: Acordao) -> Acordao:
+        """
+        Carrega de uma vez as colunas de texto ainda não lidas do registro.
+        """
+        missing_cols = [col for col in LAZY_COLUMNS if not record.is_loaded(col)]
+        if missing_cols:
+            row = self.conn.execute(
+                f"SELECT {', '.join(missing_cols)} FROM {TABLE_NAME} WHERE id = ?",
+                (record.id,),
+            ).fetchone()
+            for col, value in zip(missing_cols, row or [None] * len(missing_cols)):
+                setattr(record, col, value)
+        return record
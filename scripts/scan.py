@@ -0,0 +1,285 @@
+"""
+Varreduras do banco publicado (tcu-acordaos.db) em paralelo, somente leitura.
+
+O arquivo é aberto somente leitura (`mode=ro`) e com `mmap_size` grande, de
+forma que as páginas são lidas direto do cache do sistema operacional, sem
+cópia para o cache de páginas de cada conexão. A tabela é dividida em faixas
+de id com a mesma quantidade de linhas; cada processo do pool abre o arquivo
+uma vez e aplica a função do usuário às linhas da sua faixa. Os resultados
+parciais são combinados por `merge` na ordem das faixas, então o resultado
+não depende da quantidade de processos.
+
+O banco publicado também é alterado no lugar (triggers e refresh_aggregates de
+scripts/aggregates.py, `delta apply`). Cada faixa é lida em uma transação de
+leitura, mas faixas diferentes podem ver versões diferentes do banco: `scan`
+confere `PRAGMA data_version` antes e depois da varredura e levanta
+DatabaseChangedError se outra conexão gravou no arquivo nesse intervalo.
+
+As funções passadas para `scan` são enviadas aos processos pelo pickle: use
+funções de módulo (ou functools.partial delas), não lambdas.
+
+    from functools import partial
+    from scripts.scan import count_matches, scan
+    total = scan("./db/tcu-acordaos.db", partial(count_matches, r"art\\. 43"), ["acordao", "voto"])
+
+Uso:
+    python -m scripts.scan regex --pattern "débito" [--fields acordao,voto] [--ignore-case]
+    python -m scripts.scan stats [--fields sumario,acordao,relatorio,voto]
+        [--db ./db/tcu-acordaos.db] [--workers 4] [--mmap-size 1073741824] [--where "ano_acordao = 2019"]
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from scripts.reader import ALL_COLUMNS, TABLE_NAME
+
+MMAP_SIZE = 1024 ** 3
+TEXT_FIELDS = ("sumario", "acordao", "relatorio", "voto")
+
+# conexão de cada processo do pool (aberta uma vez por processo)
+_conn = None
+
+
+class DatabaseChangedError(Exception):
+    """
+    O banco foi alterado por outra conexão durante a leitura.
+    """
+
+
+def open_readonly(strcnx: str, mmap_size: int = MMAP_SIZE) -> sqlite3.Connection:
+    conn = sqlite3.connect(f"file:{Path(strcnx).resolve().as_posix()}?mode=ro", uri=True)
+    conn.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+    return conn
+
+
+def data_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+def check_unchanged(conn: sqlite3.Connection, version: int) -> None:
+    """
+    Levanta DatabaseChangedError se outra conexão gravou no banco desde `version`
+    (obtido pela mesma conexão).
+    """
+    if data_version(conn) != version:
+        raise DatabaseChangedError("O banco foi alterado durante a leitura; execute de novo.")
+
+
+def init_scanner(strcnx: str, mmap_size: int) -> None:
+    global _conn
+    _conn = open_readonly(strcnx, mmap_size)
+
+
+def id_ranges(conn: sqlite3.Connection, parts: int, where: str = None, params: Sequence = ()) -> List[Tuple[int, int]]:
+    """
+    Faixas [inicio, fim] de id com aproximadamente a mesma quantidade de linhas.
+    """
+    where_string = f"WHERE {where}" if where else ""
+    ids = [row[0] for row in conn.execute(f"SELECT id FROM {TABLE_NAME} {where_string} ORDER BY id", params)]
+    if not ids:
+        return []
+    parts = max(1, min(parts, len(ids)))
+    size = -(-len(ids) // parts)
+    return [(ids[start], ids[min(start + size, len(ids)) - 1]) for start in range(0, len(ids), size)]
+
+
+def merge_results(total: Any, partial_result: Any) -> Any:
+    """
+    Combinação padrão: soma números e Counters, concatena listas e combina
+    dicionários recursivamente. None é ignorado.
+    """
+    if total is None:
+        return partial_result
+    if partial_result is None:
+        return total
+    if isinstance(total, Counter):
+        total.update(partial_result)
+        return total
+    if isinstance(total, list):
+        total.extend(partial_result)
+        return total
+    if isinstance(total, dict):
+        for key, value in partial_result.items():
+            total[key] = merge_results(total.get(key), value)
+        return total
+    if isinstance(total, tuple):
+        return tuple(merge_results(a, b) for a, b in zip(total, partial_result))
+    return total + partial_result
+
+
+def scan_range(
+    columns: Sequence[str],
+    where: str,
+    params: Sequence,
+    start: int,
+    end: int,
+    func: Callable,
+    per_row: bool,
+    batch_size: int,
+    merge: Callable,
+) -> Any:
+    """
+    Aplica `func` às linhas de uma faixa de id, no processo do pool.
+    """
+    where_string = f" AND ({where})" if where else ""
+    cursor = _conn.execute(
+        f"SELECT {', '.join(columns)} FROM {TABLE_NAME} WHERE id BETWEEN ? AND ?{where_string} ORDER BY id",
+        (start, end, *params),
+    )
+    result = None
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        if per_row:
+            for row in rows:
+                result = merge(result, func(row))
+        else:
+            result = merge(result, func(rows))
+    cursor.close()
+    return result
+
+
+def scan(
+    strcnx: str,
+    func: Callable,
+    columns: Sequence[str],
+    where: str = None,
+    params: Sequence = (),
+    workers: int = None,
+    per_row: bool = False,
+    merge: Callable = merge_results,
+    batch_size: int = 200,
+    ranges_per_worker: int = 4,
+    mmap_size: int = MMAP_SIZE,
+) -> Any:
+    """
+    Varre a tabela acordaos em paralelo.
+
+    Atributos:
+        func: recebe a lista de linhas do lote (ou uma linha, com per_row) e
+            retorna o resultado parcial; precisa ser serializável pelo pickle.
+        columns: colunas de cada linha, na ordem em que func as recebe.
+        where, params: filtro opcional (ex.: "ano_acordao = ?", (2019,)).
+        workers: processos (padrão: quantidade de CPUs; 1 roda no processo atual).
+        merge: combina dois resultados parciais (padrão: merge_results).
+        ranges_per_worker: faixas por processo, para equilibrar documentos de
+            tamanhos diferentes.
+    """
+    invalid_cols = [col for col in columns if col not in ALL_COLUMNS]
+    if invalid_cols:
+        raise ValueError(f"Colunas inexistentes: {', '.join(invalid_cols)}.")
+    workers = workers or os.cpu_count()
+    # conexão mantida aberta durante a varredura, para conferir data_version ao final
+    conn = open_readonly(strcnx, mmap_size)
+    version = data_version(conn)
+    ranges = id_ranges(conn, workers * ranges_per_worker, where, params)
+    task = partial(scan_range, columns, where, params)
+    result = None
+    try:
+        if workers == 1:
+            init_scanner(strcnx, mmap_size)
+            for start, end in ranges:
+                result = merge(result, task(start, end, func, per_row, batch_size, merge))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=init_scanner, initargs=(strcnx, mmap_size)
+            ) as executor:
+                futures = [
+                    executor.submit(task, start, end, func, per_row, batch_size, merge)
+                    for start, end in ranges
+                ]
+                for future in futures:
+                    result = merge(result, future.result())
+        check_unchanged(conn, version)
+    finally:
+        conn.close()
+    return result
+
+
+def count_matches(pattern: str, rows: List[Tuple], flags: int = 0) -> Counter:
+    """
+    Ocorrências de `pattern` por coluna (posição na projeção) e documentos com ao menos uma.
+    """
+    regex = re.compile(pattern, flags)
+    counts = Counter()
+    for row in rows:
+        found = False
+        for position, text in enumerate(row):
+            if text:
+                matches = len(regex.findall(text))
+                counts[position] += matches
+                found = found or bool(matches)
+        counts["documentos"] += found
+    return counts
+
+
+def field_stats(rows: List[Tuple]) -> Dict[int, Dict[str, int]]:
+    """
+    Por coluna: linhas, nulos, caracteres e maior tamanho.
+    """
+    stats = {}
+    for row in rows:
+        for position, value in enumerate(row):
+            field = stats.setdefault(position, {"linhas": 0, "nulos": 0, "caracteres": 0, "maximo": Max(0)})
+            field["linhas"] += 1
+            if value is None:
+                field["nulos"] += 1
+                continue
+            size = len(value) if isinstance(value, str) else len(str(value))
+            field["caracteres"] += size
+            field["maximo"] = field["maximo"] + Max(size)
+    return stats
+
+
+class Max(int):
+    """
+    Inteiro cuja soma é o máximo (para combinar maiores tamanhos com merge_results).
+    """
+
+    def __add__(self, other):
+        return Max(max(int(self), int(other)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Varreduras paralelas do banco publicado.")
+    parser.add_argument("command", choices=("regex", "stats"))
+    parser.add_argument("--db", default="./db/tcu-acordaos.db")
+    parser.add_argument("--pattern", default=None)
+    parser.add_argument("--ignore-case", action="store_true")
+    parser.add_argument("--fields", default=",".join(TEXT_FIELDS))
+    parser.add_argument("--where", default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--mmap-size", type=int, default=MMAP_SIZE)
+    args = parser.parse_args()
+
+    fields = [field for field in args.fields.split(",") if field]
+    start = time.perf_counter()
+    if args.command == "regex":
+        if not args.pattern:
+            parser.error("informe --pattern")
+        flags = re.IGNORECASE if args.ignore_case else 0
+        func = partial(count_matches, args.pattern, flags=flags)
+        counts = scan(args.db, func, fields, args.where, workers=args.workers, mmap_size=args.mmap_size) or Counter()
+        result = {field: counts[position] for position, field in enumerate(fields)}
+        result["documentos"] = counts["documentos"]
+    else:
+        stats = scan(args.db, field_stats, fields, args.where, workers=args.workers, mmap_size=args.mmap_size) or {}
+        result = {
+            field: {key: int(value) for key, value in stats.get(position, {}).items()}
+            for position, field in enumerate(fields)
+        }
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    print(f"{time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Tabelas e índices dos bancos de coleta (acordaos-download.db) e de
+publicação (tcu-acordaos.db).
+
+Os índices parciais de pendência só são usados pelo sqlite quando a consulta
+contém literalmente o termo `was_downloaded = 0`; não troque o 0 por um
+parâmetro (?) nas consultas da fronteira de coleta.
+"""
+import sqlite3
+from typing import Dict, Iterable
+
+DOWNLOAD_TABLE = """
+CREATE TABLE download_acordaos (
+        id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+        urn TEXT NOT NULL,
+        url_lexml TEXT,
+        urn_year INTEGER,
+        numero_acordao TEXT,
+        numero_acordao_href TEXT,
+        relator TEXT,
+        processo TEXT,
+        processo_href TEXT,
+        tipo_processo TEXT,
+        data_sessao TEXT,
+        data_sessao_iso DATE,
+        numero_ata TEXT,
+        numero_ata_href TEXT,
+        interessado_reponsavel_recorrente TEXT,
+        entidade TEXT,
+        representante_mp TEXT,
+        unidade_tecnica TEXT,
+        repr_legal TEXT,
+        assunto TEXT,
+        sumario TEXT,
+        acordao TEXT,
+        quorum TEXT,
+        relatorio TEXT,
+        voto TEXT,
+        url_tcu TEXT,
+        was_downloaded  DEFAULT 0,
+        downloaded_at DATE
+);
+"""
+
+# layout split (scripts.storage): estado da coleta separado do corpo do documento
+DOWNLOAD_STATE_TABLE = """
+CREATE TABLE download_acordaos (
+        id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+        urn TEXT NOT NULL,
+        url_lexml TEXT,
+        urn_year INTEGER,
+        was_downloaded  DEFAULT 0,
+        downloaded_at DATE
+);
+"""
+
+DOWNLOAD_BODY_TABLE = """
+CREATE TABLE download_acordaos_corpo (
+        id INTEGER NOT NULL PRIMARY KEY REFERENCES download_acordaos(id),
+        numero_acordao TEXT,
+        numero_acordao_href TEXT,
+        relator TEXT,
+        processo TEXT,
+        processo_href TEXT,
+        tipo_processo TEXT,
+        data_sessao TEXT,
+        data_sessao_iso DATE,
+        numero_ata TEXT,
+        numero_ata_href TEXT,
+        interessado_reponsavel_recorrente TEXT,
+        entidade TEXT,
+        representante_mp TEXT,
+        unidade_tecnica TEXT,
+        repr_legal TEXT,
+        assunto TEXT,
+        sumario TEXT,
+        acordao TEXT,
+        quorum TEXT,
+        relatorio TEXT,
+        voto TEXT,
+        url_tcu TEXT
+);
+"""
+
+PUBLISH_TABLE = """
+CREATE TABLE acordaos (
+        id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+        urn TEXT NOT NULL,
+        ano_acordao INTEGER,
+        numero_acordao TEXT,
+        relator TEXT,
+        processo TEXT,
+        tipo_processo TEXT,
+        data_sessao DATE,
+        numero_ata TEXT,
+        interessado_reponsavel_recorrente TEXT,
+        entidade TEXT,
+        representante_mp TEXT,
+        unidade_tecnica TEXT,
+        repr_legal TEXT,
+        assunto TEXT,
+        sumario TEXT,
+        acordao TEXT,
+        quorum TEXT,
+        relatorio TEXT,
+        voto TEXT
+);
+"""
+
+DOWNLOAD_INDEXES = {
+    "urnindex": "CREATE INDEX IF NOT EXISTS urnindex ON download_acordaos(urn)",
+    "urnyear": "CREATE INDEX IF NOT EXISTS urnyear ON download_acordaos(urn_year)",
+    "datasessao": "CREATE INDEX IF NOT EXISTS datasessao ON download_acordaos(data_sessao_iso)",
+    "downloadedat": "CREATE INDEX IF NOT EXISTS downloadedat ON download_acordaos(downloaded_at)",
+    # fronteira de coleta: apenas as linhas pendentes, já com a url a ser visitada;
+    # was_downloaded entra nas colunas para o sqlite tratar o índice como de cobertura
+    "pendingyear": (
+        "CREATE INDEX IF NOT EXISTS pendingyear "
+        "ON download_acordaos(urn_year, url_lexml, was_downloaded) WHERE was_downloaded = 0"
+    ),
+    # chaves da api dos documentos baixados (scripts.membership), sem ler os textos
+    "urltcu": "CREATE INDEX IF NOT EXISTS urltcu ON download_acordaos(url_tcu) WHERE url_tcu IS NOT NULL",
+}
+
+SPLIT_INDEXES = {
+    "urnindex": DOWNLOAD_INDEXES["urnindex"],
+    "urnyear": DOWNLOAD_INDEXES["urnyear"],
+    "downloadedat": DOWNLOAD_INDEXES["downloadedat"],
+    "pendingyear": DOWNLOAD_INDEXES["pendingyear"],
+    "datasessao": (
+        "CREATE INDEX IF NOT EXISTS datasessao ON download_acordaos_corpo(data_sessao_iso)"
+    ),
+    "urltcu": (
+        "CREATE INDEX IF NOT EXISTS urltcu ON download_acordaos_corpo(url_tcu) WHERE url_tcu IS NOT NULL"
+    ),
+}
+
+PUBLISH_INDEXES = {
+    "urnindex": "CREATE INDEX IF NOT EXISTS urnindex ON acordaos(urn)",
+    "urnyear": "CREATE INDEX IF NOT EXISTS urnyear ON acordaos(ano_acordao)",
+    "numeroacordao": "CREATE INDEX IF NOT EXISTS numeroacordao ON acordaos(numero_acordao)",
+    "relator": "CREATE INDEX IF NOT EXISTS relator ON acordaos(relator)",
+    "unidadetecnica": "CREATE INDEX IF NOT EXISTS unidadetecnica ON acordaos(unidade_tecnica)",
+}
+
+
+def create_indexes(
+    cursor: sqlite3.Cursor, indexes: Dict[str, str], names: Iterable[str] = None
+) -> None:
+    """
+    Cria os índices que ainda não existem no banco.
+
+    Atributos:
+        indexes: DOWNLOAD_INDEXES ou PUBLISH_INDEXES.
+        names: subconjunto dos índices a criar (padrão: todos).
+    """
+    for name in names or indexes:
+        cursor.execute(indexes[name])
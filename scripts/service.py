@@ -0,0 +1,292 @@
+"""
+Serviço HTTP (asyncio) de consulta somente leitura ao banco publicado.
+
+Rotas:
+    GET /acordaos?after=<id>&limit=<n>&fields=a,b&ano=&relator=&unidade_tecnica=
+        listagem paginada por chave (id); `next` traz o cursor da próxima página.
+    GET /acordao?urn=<urn>
+    GET /acordao?numero_acordao=<numero>
+        busca de um acórdão. Sem `fields`, retorna também os textos.
+    GET /citacoes?urn=<urn>
+        acórdãos que citam a urn (entrada) e citados por ela (saida), a partir
+        do grafo de scripts/citations.py.
+    GET /agregados?por=ano_acordao,colegiado&relator=&ano_acordao=
+        contagens das tabelas de scripts/aggregates.py, sem ler a tabela acordaos.
+    GET /versao
+        versão do banco usada nas ETags.
+    GET /cache
+        estatísticas do cache de documentos (hit rate, evicções, memória).
+
+Uso:
+    python -m scripts.service --db ./db/tcu-acordaos.db --port 8080 --pool 4 --cache-mb 256
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from scripts.aggregates import DIMENSIONS, query_aggregates
+from scripts.cache import DocumentCache
+from scripts.citations import in_links, out_links
+from scripts.reader import ALL_COLUMNS, METADATA_COLUMNS, AcordaosReader, database_version
+
+MAX_PAGE_SIZE = 1000
+DEFAULT_PAGE_SIZE = 100
+MAX_HEADER_LINES = 100
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class ReaderPool:
+    """
+    Pool de conexões somente leitura. As consultas rodam em threads para não
+    bloquear o event loop; cada thread usa uma conexão exclusiva do pool.
+    Conexões abertas em uma versão anterior do banco são reabertas.
+    """
+
+    def __init__(self, strcnx: str, size: int = 4):
+        self.strcnx = strcnx
+        self.executor = ThreadPoolExecutor(max_workers=size)
+        self.readers = asyncio.Queue()
+        for _ in range(size):
+            self.readers.put_nowait(self.open_reader())
+
+    def open_reader(self) -> AcordaosReader:
+        reader = AcordaosReader(self.strcnx)
+        reader.version = database_version(self.strcnx)
+        return reader
+
+    async def run(self, func, *args):
+        reader = await self.readers.get()
+        try:
+            if reader.version != database_version(self.strcnx):
+                reader.close()
+                reader = self.open_reader()
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, reader, *args)
+        finally:
+            self.readers.put_nowait(reader)
+
+    def close(self) -> None:
+        while not self.readers.empty():
+            self.readers.get_nowait().close()
+        self.executor.shutdown(wait=False)
+
+
+def parse_fields(query: Dict[str, List[str]], default: Tuple[str, ...]) -> List[str]:
+    if "fields" not in query:
+        return list(default)
+    fields = [col for value in query["fields"] for col in value.split(",") if col]
+    try:
+        return AcordaosReader.projection(fields)
+    except ValueError as error:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, str(error))
+
+
+def parse_int(query: Dict[str, List[str]], name: str, default=None):
+    if name not in query:
+        return default
+    try:
+        return int(query[name][0])
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"O parâmetro {name} deve ser inteiro.")
+
+
+def list_acordaos(reader: AcordaosReader, query: Dict[str, List[str]]) -> Dict:
+    fields = parse_fields(query, METADATA_COLUMNS)
+    limit = parse_int(query, "limit", DEFAULT_PAGE_SIZE)
+    # LIMIT negativo no sqlite é "sem limite"
+    if limit < 1:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "O parâmetro limit deve ser maior que zero.")
+    limit = min(limit, MAX_PAGE_SIZE)
+    records = list(
+        reader.select(
+            columns=fields,
+            ano=parse_int(query, "ano"),
+            relator=query.get("relator", [None])[0],
+            unidade_tecnica=query.get("unidade_tecnica", [None])[0],
+            after_id=parse_int(query, "after"),
+            limit=limit,
+            batch_size=limit,
+        )
+    )
+    next_id = records[-1].id if len(records) == limit else None
+    return {"data": [record.as_dict(fields) for record in records], "next": next_id}
+
+
+def get_acordao(
+    reader: AcordaosReader, query: Dict[str, List[str]], cache: DocumentCache = None
+) -> Dict:
+    fields = parse_fields(query, ALL_COLUMNS)
+    for col in ("urn", "numero_acordao"):
+        if col in query:
+            if cache is not None:
+                record = cache.lookup(reader, col, query[col][0])
+            else:
+                record = reader.get_by(col, query[col][0], columns=fields)
+            break
+    else:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Informe urn ou numero_acordao.")
+    if record is None:
+        raise HTTPError(HTTPStatus.NOT_FOUND, "Acórdão não encontrado.")
+    return record.as_dict(fields)
+
+
+def get_citations(reader: AcordaosReader, query: Dict[str, List[str]]) -> Dict:
+    if "urn" not in query:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Informe a urn.")
+    urn = query["urn"][0]
+    cursor = reader.conn.cursor()
+    try:
+        links = {"entrada": in_links(cursor, urn), "saida": out_links(cursor, urn)}
+    except sqlite3.OperationalError:
+        raise HTTPError(HTTPStatus.NOT_FOUND, "O grafo de citações não foi gerado neste banco.")
+    return {
+        direction: [
+            {"urn": linked, "campo": campo, "ocorrencias": count} for linked, campo, count in rows
+        ]
+        for direction, rows in links.items()
+    }
+
+
+def get_aggregates(reader: AcordaosReader, query: Dict[str, List[str]]) -> Dict:
+    by = [col for value in query.get("por", ["ano_acordao"]) for col in value.split(",") if col]
+    filters = {col: query[col][0] for col in DIMENSIONS if col in query}
+    if "ano_acordao" in filters:
+        filters["ano_acordao"] = parse_int(query, "ano_acordao")
+    try:
+        rows = query_aggregates(reader.conn.cursor(), by, **filters)
+    except ValueError as error:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, str(error))
+    except sqlite3.OperationalError:
+        raise HTTPError(HTTPStatus.NOT_FOUND, "As tabelas de contagem não foram geradas neste banco.")
+    return {"data": [dict(zip([*by, "total"], row)) for row in rows]}
+
+
+class AcordaosService:
+    def __init__(self, strcnx: str, pool_size: int = 4, cache_bytes: int = 256 * 1024 ** 2):
+        self.strcnx = strcnx
+        self.pool = ReaderPool(strcnx, pool_size)
+        self.cache = DocumentCache(cache_bytes) if cache_bytes else None
+        self.routes = {
+            "/acordaos": list_acordaos,
+            "/acordao": partial(get_acordao, cache=self.cache),
+            "/citacoes": get_citations,
+            "/agregados": get_aggregates,
+        }
+
+    def etag(self, target: str) -> str:
+        digest = hashlib.sha1(
+            f"{database_version(self.strcnx)}|{target}".encode("utf8")
+        ).hexdigest()
+        return f'"{digest[:20]}"'
+
+    async def dispatch(self, method: str, target: str, headers: Dict[str, str]) -> Tuple:
+        if method not in ("GET", "HEAD"):
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Apenas GET.")
+        url = urlsplit(target)
+        path = unquote(url.path).rstrip("/") or "/"
+        if path == "/versao":
+            return HTTPStatus.OK, {"versao": database_version(self.strcnx)}, None
+        if path == "/cache":
+            return HTTPStatus.OK, self.cache.stats() if self.cache else {}, None
+        if path not in self.routes:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Rota inexistente.")
+        etag = self.etag(target)
+        if headers.get("if-none-match") == etag:
+            return HTTPStatus.NOT_MODIFIED, None, etag
+        query = parse_qs(url.query)
+        body = await self.pool.run(self.routes[path], query)
+        return HTTPStatus.OK, body, etag
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin1").split()
+                except ValueError:
+                    break
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = (
+                    headers.get("connection", "").lower() != "close"
+                    and version == "HTTP/1.1"
+                )
+                try:
+                    status, body, etag = await self.dispatch(method, target, headers)
+                except HTTPError as error:
+                    status, body, etag = error.status, {"erro": error.message}, None
+                except Exception as error:
+                    status, body, etag = HTTPStatus.INTERNAL_SERVER_ERROR, {"erro": str(error)}, None
+                payload = b""
+                if body is not None:
+                    payload = json.dumps(body, ensure_ascii=False).encode("utf8")
+                response_headers = [
+                    f"HTTP/1.1 {status.value} {status.phrase}",
+                    "Content-Type: application/json; charset=utf-8",
+                    f"Content-Length: {len(payload)}",
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                ]
+                if etag:
+                    response_headers.append(f"ETag: {etag}")
+                writer.write(("\r\n".join(response_headers) + "\r\n\r\n").encode("latin1"))
+                if method != "HEAD":
+                    writer.write(payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviço de consulta aos acórdãos.")
+    parser.add_argument("--db", default="./db/tcu-acordaos.db")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--pool", type=int, default=4)
+    parser.add_argument("--cache-mb", type=int, default=256, help="0 desativa o cache")
+    args = parser.parse_args()
+
+    async def run():
+        service = AcordaosService(args.db, args.pool, args.cache_mb * 1024 ** 2)
+        print(f"Servindo {args.db} em http://{args.host}:{args.port}")
+        try:
+            await service.serve(args.host, args.port)
+        finally:
+            service.pool.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
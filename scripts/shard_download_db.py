@@ -0,0 +1,12 @@
+"""
+Divide o banco de coleta em um arquivo por urn_year em ./db/shards
+(acordaos-download-<ano>.db), preservando ids e o layout da origem. O banco
+original não é alterado. Para coletar nos shards, defina DB_SHARDS_DIR nas
+settings do projeto scrapy (caminho relativo ao diretório do projeto).
+"""
+from scripts.shards import split_into_shards
+
+copied = split_into_shards("./db/acordaos-download.db", "./db/shards")
+for year, rows in copied.items():
+    print(f"{year}: {rows} registros")
+print(f"{sum(copied.values())} registros em {len(copied)} shards.")
@@ -0,0 +1,257 @@
+"""
+Layout opcional do banco de coleta com um arquivo por ano da urn (urn_year).
+
+Cada shard é um banco de coleta comum (layout single ou split, ver
+scripts.storage) em `<base_dir>/acordaos-download-<ano>.db`. Coletas de anos
+diferentes escrevem em arquivos diferentes e não disputam o lock de escrita
+do sqlite; manutenções por ano (nova coleta, deletes) tocam apenas um arquivo.
+
+As leituras entre anos usam ATTACH: `ShardRouter.union` anexa os shards a uma
+conexão em memória e cria a view temporária `download_acordaos` com a união
+das tabelas. O sqlite limita a quantidade de bancos anexados (10 por padrão);
+para consultar mais anos que o limite, use `ShardRouter.query_all`, que executa
+a consulta em lotes de shards.
+"""
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from scripts.storage import (
+    BODY_COLUMNS,
+    BODY_TABLE,
+    SINGLE,
+    SPLIT,
+    STATE_COLUMNS,
+    STATE_TABLE,
+    create_tables,
+    detect_layout,
+    document_source,
+    insert_documents,
+    update_document,
+)
+from scripts.urn import urn_year
+
+SHARD_PATTERN = "acordaos-download-{year}.db"
+
+
+def shard_layout(conn: sqlite3.Connection, schema: str) -> str:
+    """
+    Layout (scripts.storage) do banco anexado com o nome `schema`.
+    """
+    is_split = conn.execute(
+        f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?",
+        (BODY_TABLE,),
+    ).fetchone()
+    return SPLIT if is_split else SINGLE
+
+
+class ShardRouter:
+    """
+    Direciona leituras e escritas para o shard do ano correspondente.
+
+    Atributos:
+        base_dir: diretório dos shards.
+        layout: layout usado na criação de novos shards (single ou split).
+    """
+
+    def __init__(self, base_dir: str = "./db/shards", layout: str = SINGLE):
+        self.base_dir = Path(base_dir)
+        self.layout = layout
+        self.connections = {}
+
+    def shard_path(self, year: int) -> Path:
+        return self.base_dir / SHARD_PATTERN.format(year=int(year))
+
+    def years(self) -> List[int]:
+        """
+        Anos que já possuem shard.
+        """
+        prefix, suffix = SHARD_PATTERN.split("{year}")
+        return sorted(
+            int(path.name[len(prefix) : -len(suffix)])
+            for path in self.base_dir.glob(SHARD_PATTERN.format(year="*"))
+        )
+
+    def connect(self, year: int, create: bool = True) -> sqlite3.Connection:
+        """
+        Conexão com o shard do ano, criando o arquivo e as tabelas se necessário.
+        """
+        year = int(year)
+        if year in self.connections:
+            return self.connections[year]
+        path = self.shard_path(year)
+        is_new = not path.is_file()
+        if is_new and not create:
+            raise FileNotFoundError(f"Não há shard para o ano {year}.")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path))
+        # WAL permite leituras (ex.: union) enquanto a coleta do ano escreve
+        conn.execute("PRAGMA journal_mode = WAL")
+        if is_new:
+            create_tables(conn.cursor(), self.layout)
+            conn.commit()
+        self.connections[year] = conn
+        return conn
+
+    def close(self) -> None:
+        for conn in self.connections.values():
+            conn.close()
+        self.connections = {}
+
+    def update_document(self, urn: str, values: Dict, commit: bool = True) -> None:
+        """
+        Atualiza o documento no shard do ano da urn. Como no banco único, uma
+        urn que não foi inserida não é alterada: sem shard para o ano, nenhum
+        arquivo é criado.
+        """
+        try:
+            conn = self.connect(urn_year(urn), create=False)
+        except FileNotFoundError:
+            return
+        cursor = conn.cursor()
+        update_document(cursor, detect_layout(cursor), urn, values)
+        if commit:
+            conn.commit()
+
+    def insert_documents(self, cols_names: Sequence[str], data: Iterable[Tuple]) -> None:
+        """
+        Insere documentos agrupando as linhas por ano (coluna urn_year ou data da urn).
+        """
+        cols_names = list(cols_names)
+        year_index = cols_names.index("urn_year") if "urn_year" in cols_names else None
+        urn_index = cols_names.index("urn")
+        rows_by_year = {}
+        for row in data:
+            year = row[year_index] if year_index is not None else urn_year(row[urn_index])
+            rows_by_year.setdefault(int(year), []).append(row)
+        for year, rows in rows_by_year.items():
+            conn = self.connect(year)
+            cursor = conn.cursor()
+            insert_documents(cursor, detect_layout(cursor), cols_names, rows)
+            conn.commit()
+
+    @contextmanager
+    def union(self, years: Iterable[int] = None, documents: bool = False) -> Iterator[sqlite3.Connection]:
+        """
+        Conexão com os shards anexados e a view temporária download_acordaos
+        (união de todos os anos).
+
+        Atributos:
+            years: anos a anexar (padrão: todos os shards existentes).
+            documents: inclui as colunas do corpo do documento na view (join no layout split).
+        """
+        years = sorted(self.years() if years is None else years)
+        conn = sqlite3.connect(":memory:", uri=True)
+        limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        if len(years) > limit:
+            conn.close()
+            raise ValueError(
+                f"{len(years)} shards excedem o limite de {limit} bancos anexados; use query_all."
+            )
+        try:
+            cols_names = ("id",) + STATE_COLUMNS + (BODY_COLUMNS if documents else ())
+            selects = []
+            for year in years:
+                schema = f"s{year}"
+                conn.execute(
+                    "ATTACH DATABASE ? AS " + schema,
+                    (f"file:{self.shard_path(year).resolve().as_posix()}?mode=ro",),
+                )
+                if documents and shard_layout(conn, schema) == SPLIT:
+                    source = f"{schema}.{STATE_TABLE} JOIN {schema}.{BODY_TABLE} USING (id)"
+                else:
+                    source = f"{schema}.{STATE_TABLE}"
+                # colunas explícitas: a ordem física difere entre os layouts
+                selects.append(f"SELECT {', '.join(cols_names)} FROM {source}")
+            if selects:
+                conn.execute(f"CREATE TEMP VIEW {STATE_TABLE} AS {' UNION ALL '.join(selects)}")
+            yield conn
+        finally:
+            conn.close()
+
+    def query_all(
+        self, query_string: str, params: Sequence = (), documents: bool = False
+    ) -> Iterator[Tuple]:
+        """
+        Executa a consulta sobre a view download_acordaos em lotes de shards
+        (respeitando o limite de ATTACH) e retorna as linhas de todos os lotes.
+        Agregações (count, group by) são calculadas por lote.
+        """
+        years = self.years()
+        probe = sqlite3.connect(":memory:")
+        limit = probe.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        probe.close()
+        for start in range(0, len(years), limit):
+            with self.union(years[start : start + limit], documents) as conn:
+                for row in conn.execute(query_string, params):
+                    yield row
+
+
+def split_into_shards(
+    source: str, base_dir: str = "./db/shards", layout: str = None
+) -> Dict[int, int]:
+    """
+    Copia o banco de coleta único para um shard por urn_year, preservando os ids.
+
+    Atributos:
+        source: banco de coleta (layout single ou split).
+        base_dir: diretório dos shards.
+        layout: layout dos shards (padrão: o mesmo da origem).
+
+    Retorna a quantidade de linhas copiadas por ano. Falha antes de criar
+    qualquer shard se houver linhas sem urn_year, que não teriam shard.
+    """
+    conn = sqlite3.connect(source)
+    cursor = conn.cursor()
+    without_year = cursor.execute(
+        f"SELECT count(*) FROM {STATE_TABLE} WHERE urn_year IS NULL"
+    ).fetchone()[0]
+    if without_year:
+        conn.close()
+        raise ValueError(
+            f"{without_year} registros de {source} sem urn_year; "
+            "preencha a coluna antes de dividir o banco."
+        )
+    source_layout = detect_layout(cursor)
+    router = ShardRouter(base_dir, layout or source_layout)
+    years = [
+        row[0]
+        for row in cursor.execute(
+            f"SELECT DISTINCT urn_year FROM {STATE_TABLE} ORDER BY urn_year"
+        ).fetchall()
+    ]
+    state_cols = ", ".join(("id",) + STATE_COLUMNS)
+    body_cols = ", ".join(("id",) + BODY_COLUMNS)
+    all_cols = ", ".join(("id",) + STATE_COLUMNS + BODY_COLUMNS)
+    copied = {}
+    for year in years:
+        if router.shard_path(year).exists():
+            raise FileExistsError(f"O shard {router.shard_path(year)} já existe.")
+        # cria o arquivo com as tabelas e índices e libera a conexão antes do ATTACH
+        router.connect(year)
+        router.close()
+        cursor.execute("ATTACH DATABASE ? AS shard", (str(router.shard_path(year)),))
+        if router.layout == SPLIT:
+            cursor.execute(
+                f"INSERT INTO shard.{STATE_TABLE} ({state_cols}) "
+                f"SELECT {state_cols} FROM main.{STATE_TABLE} WHERE urn_year = ?",
+                (year,),
+            )
+            copied[year] = cursor.rowcount
+            cursor.execute(
+                f"INSERT INTO shard.{BODY_TABLE} ({body_cols}) "
+                f"SELECT {body_cols} FROM {document_source(source_layout)} WHERE urn_year = ?",
+                (year,),
+            )
+        else:
+            cursor.execute(
+                f"INSERT INTO shard.{STATE_TABLE} ({all_cols}) "
+                f"SELECT {all_cols} FROM {document_source(source_layout)} WHERE urn_year = ?",
+                (year,),
+            )
+            copied[year] = cursor.rowcount
+        conn.commit()
+        cursor.execute("DETACH DATABASE shard")
+    conn.close()
+    return copied
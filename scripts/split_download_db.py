@@ -0,0 +1,13 @@
+"""
+Converte o banco de coleta para o layout split: a tabela download_acordaos
+passa a guardar apenas o estado da coleta e os dados dos documentos vão para
+download_acordaos_corpo (mesmo id). Depois da migração, altere `layout` em
+config.ini para split, para que novos bancos sejam criados no mesmo formato.
+"""
+from scripts.core import initiate_db
+from scripts.storage import migrate_to_split
+
+conn, cur = initiate_db("./db/acordaos-download.db")
+for step in migrate_to_split(conn, chunk_size=2000):
+    print(step)
+conn.close()
@@ -0,0 +1,259 @@
+"""
+Leitura e escrita no banco de coleta nos dois layouts suportados.
+
+    single: uma única tabela download_acordaos com o estado da coleta e os textos.
+    split: download_acordaos guarda apenas o estado da coleta (colunas estreitas)
+        e download_acordaos_corpo guarda os dados do documento, com o mesmo id.
+
+No layout split a tabela de estado mantém o nome e as colunas usadas pela
+fronteira de coleta, então as consultas de urls pendentes e de atualização de
+status não mudam. O layout é identificado pela existência da tabela de corpo.
+"""
+import sqlite3
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from scripts.schema import (
+    DOWNLOAD_BODY_TABLE,
+    DOWNLOAD_INDEXES,
+    DOWNLOAD_STATE_TABLE,
+    DOWNLOAD_TABLE,
+    SPLIT_INDEXES,
+    create_indexes,
+)
+
+STATE_TABLE = "download_acordaos"
+BODY_TABLE = "download_acordaos_corpo"
+
+SINGLE = "single"
+SPLIT = "split"
+LAYOUTS = (SINGLE, SPLIT)
+
+STATE_COLUMNS = ("urn", "url_lexml", "urn_year", "was_downloaded", "downloaded_at")
+BODY_COLUMNS = (
+    "numero_acordao",
+    "numero_acordao_href",
+    "relator",
+    "processo",
+    "processo_href",
+    "tipo_processo",
+    "data_sessao",
+    "data_sessao_iso",
+    "numero_ata",
+    "numero_ata_href",
+    "interessado_reponsavel_recorrente",
+    "entidade",
+    "representante_mp",
+    "unidade_tecnica",
+    "repr_legal",
+    "assunto",
+    "sumario",
+    "acordao",
+    "quorum",
+    "relatorio",
+    "voto",
+    "url_tcu",
+)
+
+
+def detect_layout(cursor: sqlite3.Cursor) -> str:
+    is_split = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (BODY_TABLE,)
+    ).fetchone()
+    return SPLIT if is_split else SINGLE
+
+
+def document_source(layout: str) -> str:
+    """
+    Cláusula FROM que expõe todas as colunas do documento no layout indicado.
+    """
+    if layout == SPLIT:
+        return f"{STATE_TABLE} JOIN {BODY_TABLE} USING (id)"
+    return STATE_TABLE
+
+
+def corpus_source(cursor: sqlite3.Cursor) -> Tuple[str, str]:
+    """
+    Cláusula FROM e filtro dos documentos baixados, tanto no banco publicado
+    (tabela acordaos) quanto no banco de coleta (layouts single e split).
+    """
+    is_published = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'acordaos'"
+    ).fetchone()
+    if is_published:
+        return "acordaos", "1 = 1"
+    return document_source(detect_layout(cursor)), "was_downloaded = 1"
+
+
+def corpus_versions(cursor: sqlite3.Cursor) -> Tuple[str, str, str, str]:
+    """
+    Como corpus_source, mais a expressão que muda quando o conteúdo do
+    documento muda, para reprocessar só os documentos alterados: o hash da urn
+    em versao_hash (scripts.delta) no banco publicado e downloaded_at no banco
+    de coleta. NULL quando o banco publicado não tem versão.
+
+    Retorna (FROM, filtro, coluna urn qualificada, expressão da versão).
+    """
+    source, condition = corpus_source(cursor)
+    if source != "acordaos":
+        return source, condition, f"{STATE_TABLE}.urn", "downloaded_at"
+    has_hashes = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'versao_hash'"
+    ).fetchone()
+    if not has_hashes:
+        return source, condition, "acordaos.urn", "NULL"
+    return "acordaos LEFT JOIN versao_hash USING (urn)", condition, "acordaos.urn", "hex(versao_hash.hash)"
+
+
+def body_table(layout: str) -> str:
+    """
+    Tabela onde ficam as colunas de texto (chaveadas por id).
+    """
+    return BODY_TABLE if layout == SPLIT else STATE_TABLE
+
+
+def split_values(values: Dict) -> Tuple[Dict, Dict]:
+    state = {col: value for col, value in values.items() if col in STATE_COLUMNS}
+    body = {col: value for col, value in values.items() if col in BODY_COLUMNS}
+    return state, body
+
+
+def update_document(cursor: sqlite3.Cursor, layout: str, urn: str, values: Dict) -> None:
+    """
+    Atualiza o documento identificado pela urn com os valores informados.
+    """
+    state, body = split_values(values)
+    if layout != SPLIT:
+        state.update(body)
+        body = {}
+    if state:
+        set_string = ", ".join(f"{col} = ?" for col in state)
+        cursor.execute(
+            f"UPDATE {STATE_TABLE} SET {set_string} WHERE urn = ?",
+            (*state.values(), urn),
+        )
+    if body:
+        cols_names = list(body)
+        upsert_string = (
+            f"INSERT INTO {BODY_TABLE} (id, {', '.join(cols_names)}) "
+            f"SELECT id, {', '.join('?' for _ in cols_names)} FROM {STATE_TABLE} WHERE urn = ? "
+            f"ON CONFLICT(id) DO UPDATE SET "
+            + ", ".join(f"{col} = excluded.{col}" for col in cols_names)
+        )
+        cursor.execute(upsert_string, (*body.values(), urn))
+
+
+def insert_documents(
+    cursor: sqlite3.Cursor, layout: str, cols_names: Sequence[str], data: Iterable[Tuple]
+) -> None:
+    """
+    Insere documentos completos (estado e corpo) no layout indicado.
+    """
+    cols_names = list(cols_names)
+    if layout != SPLIT:
+        cursor.executemany(
+            f"INSERT INTO {STATE_TABLE} ({', '.join(cols_names)}) "
+            f"VALUES ({', '.join('?' for _ in cols_names)})",
+            data,
+        )
+        return
+    state_index = [i for i, col in enumerate(cols_names) if col in STATE_COLUMNS]
+    body_index = [i for i, col in enumerate(cols_names) if col in BODY_COLUMNS]
+    state_string = (
+        f"INSERT INTO {STATE_TABLE} ({', '.join(cols_names[i] for i in state_index)}) "
+        f"VALUES ({', '.join('?' for _ in state_index)})"
+    )
+    body_string = (
+        f"INSERT INTO {BODY_TABLE} (id, {', '.join(cols_names[i] for i in body_index)}) "
+        f"VALUES (?, {', '.join('?' for _ in body_index)})"
+    )
+    for row in data:
+        cursor.execute(state_string, [row[i] for i in state_index])
+        if body_index:
+            cursor.execute(body_string, [cursor.lastrowid, *[row[i] for i in body_index]])
+
+
+def delete_document(cursor: sqlite3.Cursor, layout: str, urn: str) -> None:
+    if layout == SPLIT:
+        cursor.execute(
+            f"DELETE FROM {BODY_TABLE} WHERE id IN (SELECT id FROM {STATE_TABLE} WHERE urn = ?)",
+            (urn,),
+        )
+    cursor.execute(f"DELETE FROM {STATE_TABLE} WHERE urn = ?", (urn,))
+
+
+def create_tables(cursor: sqlite3.Cursor, layout: str) -> None:
+    """
+    Cria as tabelas e os índices do banco de coleta no layout indicado.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Layout inválido: {layout}. Use {', '.join(LAYOUTS)}.")
+    if layout == SPLIT:
+        cursor.execute(DOWNLOAD_STATE_TABLE)
+        cursor.execute(DOWNLOAD_BODY_TABLE)
+        create_indexes(cursor, SPLIT_INDEXES)
+    else:
+        cursor.execute(DOWNLOAD_TABLE)
+        create_indexes(cursor, DOWNLOAD_INDEXES)
+
+
+def migrate_to_split(conn: sqlite3.Connection, chunk_size: int = 2000) -> List[str]:
+    """
+    Converte um banco no layout single para o layout split.
+
+    Os corpos são copiados em blocos de `chunk_size` linhas e a tabela de
+    estado é reconstruída apenas com as colunas estreitas, tudo na mesma
+    transação: uma migração interrompida não deixa a tabela de corpo pela
+    metade (que detect_layout tomaria por layout split). Um banco deixado
+    nesse estado por versões anteriores (tabela de corpo criada e tabela de
+    estado ainda com os textos) é migrado de novo. Retorna as etapas
+    executadas, para log.
+    """
+    cursor = conn.cursor()
+    existing_cols = {row[1] for row in cursor.execute(f"PRAGMA table_info({STATE_TABLE})")}
+    body_cols = [col for col in BODY_COLUMNS if col in existing_cols]
+    if detect_layout(cursor) == SPLIT and not body_cols:
+        return ["O banco já está no layout split."]
+    steps = []
+
+    conn.commit()
+    cursor.execute("BEGIN")
+    try:
+        if detect_layout(cursor) == SPLIT:
+            cursor.execute(f"DROP TABLE {BODY_TABLE}")
+            steps.append(f"Migração incompleta encontrada: {BODY_TABLE} descartada.")
+        cursor.execute(DOWNLOAD_BODY_TABLE)
+        last_id = 0
+        copied = 0
+        while True:
+            ids = cursor.execute(
+                f"SELECT id FROM {STATE_TABLE} WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, chunk_size),
+            ).fetchall()
+            if not ids:
+                break
+            first_id, last_id = ids[0][0], ids[-1][0]
+            cursor.execute(
+                f"INSERT INTO {BODY_TABLE} (id, {', '.join(body_cols)}) "
+                f"SELECT id, {', '.join(body_cols)} FROM {STATE_TABLE} WHERE id BETWEEN ? AND ?",
+                (first_id, last_id),
+            )
+            copied += len(ids)
+        steps.append(f"{copied} corpos copiados para {BODY_TABLE}.")
+
+        state_table = DOWNLOAD_STATE_TABLE.replace(STATE_TABLE, f"{STATE_TABLE}_novo", 1)
+        state_cols = ", ".join(("id",) + STATE_COLUMNS)
+        cursor.execute(state_table)
+        cursor.execute(
+            f"INSERT INTO {STATE_TABLE}_novo ({state_cols}) SELECT {state_cols} FROM {STATE_TABLE}"
+        )
+        cursor.execute(f"DROP TABLE {STATE_TABLE}")
+        cursor.execute(f"ALTER TABLE {STATE_TABLE}_novo RENAME TO {STATE_TABLE}")
+        create_indexes(cursor, SPLIT_INDEXES)
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    steps.append(f"Tabela {STATE_TABLE} reconstruída com as colunas {', '.join(STATE_COLUMNS)}.")
+    cursor.execute("VACUUM")
+    steps.append("VACUUM concluído.")
+    return steps
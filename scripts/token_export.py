@@ -0,0 +1,307 @@
+"""
+Exporta o corpus tokenizado em arrays uint32 mapeados em memória (.npy), para
+treinamento de modelos sem carregar o banco ou o corpus inteiro na RAM.
+
+Duas passadas em paralelo sobre sumario, acordao, relatorio e voto:
+    1. contagem: vocabulário (frequência de cada token) e quantidade de tokens
+       de cada campo de cada documento, que define as posições no arquivo;
+    2. codificação: cada processo grava os ids dos seus documentos diretamente
+       na sua fatia de tokens.npy (aberto com mmap), sem passar os tokens de
+       volta ao processo principal.
+
+As duas passadas leem o banco na mesma transação de leitura, então veem o mesmo
+conteúdo mesmo que outra conexão grave no banco durante a exportação (no modo
+de journal padrão, a gravação espera a exportação terminar). Cada documento
+ainda é conferido com as posições calculadas na primeira passada.
+
+Arquivos do diretório de saída:
+    tokens.npy     uint32, todos os tokens em sequência (ordem de id do banco).
+    index.npy      uint64 (documentos, campos + 1): início de cada campo e fim
+                   do documento em tokens.npy.
+    urns.txt       urn de cada documento, na ordem de index.npy.
+    vocab.txt      um token por linha; o número da linha (a partir de 0) é o id.
+                   O id 0 (<unk>) representa os tokens abaixo de min_count.
+    metadata.json  parâmetros, contagens e versão do banco de origem.
+
+Leitura (memória constante):
+    corpus = TokenCorpus("./db/tokens")
+    ids = corpus.document(10, "voto")
+
+Uso:
+    python -m scripts.token_export [--db ./db/tcu-acordaos.db] [--output ./db/tokens]
+        [--workers 4] [--min-count 2]
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sqlite3
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from scripts.reader import database_version
+from scripts.storage import corpus_source
+
+FIELDS = ("sumario", "acordao", "relatorio", "voto")
+TOKEN = re.compile(r"\w+|[^\w\s]")
+UNKNOWN = "<unk>"
+
+# vocabulário dos processos da segunda passada (carregado uma vez por processo)
+_vocab = None
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN.findall(text.lower()) if text else []
+
+
+def count_batch(rows: Sequence[Tuple]) -> Tuple[Counter, List[List[int]]]:
+    """
+    Primeira passada: frequência dos tokens do lote e tamanho de cada campo.
+    """
+    counts = Counter()
+    lengths = []
+    for _, *texts in rows:
+        sizes = []
+        for text in texts:
+            tokens = tokenize(text)
+            counts.update(tokens)
+            sizes.append(len(tokens))
+        lengths.append(sizes)
+    return counts, lengths
+
+
+def init_encoder(vocab_path: str) -> None:
+    global _vocab
+    with open(vocab_path, encoding="utf8") as f:
+        _vocab = {token: index for index, token in enumerate(f.read().split("\n"))}
+
+
+def encode_batch(tokens_path: str, bounds: Sequence[Sequence[int]], rows: Sequence[Tuple]) -> int:
+    """
+    Segunda passada: grava os ids do lote em tokens.npy nas posições `bounds`
+    (linhas de index.npy dos documentos do lote).
+    """
+    if len(bounds) != len(rows):
+        raise RuntimeError(f"Lote com {len(rows)} documentos, {len(bounds)} esperados.")
+    tokens = np.load(tokens_path, mmap_mode="r+")
+    written = 0
+    for (id_, *texts), row_bounds in zip(rows, bounds):
+        for column, text in enumerate(texts):
+            ids = [_vocab.get(token, 0) for token in tokenize(text)]
+            begin, end = row_bounds[column], row_bounds[column + 1]
+            if len(ids) != end - begin:
+                raise RuntimeError(
+                    f"O documento {id_} mudou entre as passadas ({len(ids)} tokens, {end - begin} esperados)."
+                )
+            tokens[begin:end] = ids
+            written += len(ids)
+    tokens.flush()
+    del tokens
+    return written
+
+
+def iter_batches(cursor: sqlite3.Cursor, ids: Sequence[int], batch_size: int) -> Iterator[List[Tuple]]:
+    source, _ = corpus_source(cursor)
+    select_string = f"SELECT id, {', '.join(FIELDS)} FROM {source} WHERE id IN "
+    for start in range(0, len(ids), batch_size):
+        batch_ids = ids[start : start + batch_size]
+        rows = cursor.execute(
+            select_string + f"({', '.join('?' for _ in batch_ids)}) ORDER BY id", batch_ids
+        ).fetchall()
+        yield rows
+
+
+def run_bounded(executor: ProcessPoolExecutor, func, tasks, window_size: int) -> Iterator:
+    """
+    Submete as tarefas mantendo no máximo `window_size` pendentes e devolve os
+    resultados na ordem de submissão.
+    """
+    window = []
+    for args in tasks:
+        window.append(executor.submit(func, *args))
+        if len(window) >= window_size:
+            yield window.pop(0).result()
+    for future in window:
+        yield future.result()
+
+
+def export_tokens(
+    strcnx: str,
+    output: str,
+    workers: int = None,
+    batch_size: int = 100,
+    min_count: int = 2,
+) -> Dict[str, float]:
+    """
+    Gera o diretório de saída (ver docstring do módulo).
+
+    Atributos:
+        workers: processos de tokenização (padrão: quantidade de CPUs).
+        batch_size: documentos por tarefa.
+        min_count: frequência mínima para o token entrar no vocabulário.
+    """
+    start = time.perf_counter()
+    output_path = Path(output)
+    if output_path.exists():
+        raise FileExistsError(f"O diretório {output_path} já existe.")
+    build_path = output_path.with_name(f"{output_path.name}.build")
+    if build_path.exists():
+        shutil.rmtree(build_path)
+    build_path.mkdir(parents=True)
+
+    conn = sqlite3.connect(
+        f"file:{Path(strcnx).resolve().as_posix()}?mode=ro", uri=True, isolation_level=None
+    )
+    cursor = conn.cursor()
+    # uma única transação de leitura para as duas passadas
+    cursor.execute("BEGIN")
+    source, condition = corpus_source(cursor)
+    rows = cursor.execute(f"SELECT id, urn FROM {source} WHERE {condition} ORDER BY id").fetchall()
+    ids = [row[0] for row in rows]
+    with open(build_path / "urns.txt", "w", encoding="utf8") as f:
+        f.writelines(f"{row[1]}\n" for row in rows)
+    del rows
+
+    workers = workers or os.cpu_count()
+    counts = Counter()
+    lengths = np.zeros((len(ids), len(FIELDS)), dtype=np.uint64)
+    position = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        tasks = ((batch,) for batch in iter_batches(cursor, ids, batch_size))
+        for batch_counts, batch_lengths in run_bounded(executor, count_batch, tasks, 2 * workers):
+            counts.update(batch_counts)
+            lengths[position : position + len(batch_lengths)] = batch_lengths
+            position += len(batch_lengths)
+    count_time = time.perf_counter() - start
+
+    vocab = [UNKNOWN] + sorted(
+        (token for token, count in counts.items() if count >= min_count),
+        key=lambda token: (-counts[token], token),
+    )
+    unknown_tokens = sum(count for count in counts.values() if count < min_count)
+    del counts
+    with open(build_path / "vocab.txt", "w", encoding="utf8") as f:
+        f.write("\n".join(vocab))
+
+    index = np.zeros((len(ids), len(FIELDS) + 1), dtype=np.uint64)
+    ends = np.cumsum(lengths.reshape(-1), dtype=np.uint64).reshape(lengths.shape)
+    index[:, 1:] = ends
+    index[1:, 0] = ends[:-1, -1]
+    total_tokens = int(index[-1, -1]) if len(ids) else 0
+    np.save(build_path / "index.npy", index)
+    tokens_path = str(build_path / "tokens.npy")
+    tokens = np.lib.format.open_memmap(tokens_path, mode="w+", dtype=np.uint32, shape=(total_tokens,))
+    del tokens
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=init_encoder, initargs=(str(build_path / "vocab.txt"),)
+    ) as executor:
+        tasks = (
+            (tokens_path, index[offset : offset + len(batch)].tolist(), batch)
+            for offset, batch in zip(range(0, len(ids), batch_size), iter_batches(cursor, ids, batch_size))
+        )
+        written = sum(run_bounded(executor, encode_batch, tasks, 2 * workers))
+    cursor.execute("COMMIT")
+    conn.close()
+    if written != total_tokens:
+        raise RuntimeError(
+            f"O banco mudou durante a exportação ({written} tokens gravados, {total_tokens} esperados)."
+        )
+
+    metadata = {
+        "fonte": str(strcnx),
+        "versao_fonte": database_version(strcnx),
+        "criado_em": datetime.now().isoformat(timespec="seconds"),
+        "campos": list(FIELDS),
+        "documentos": len(ids),
+        "tokens": total_tokens,
+        "vocabulario": len(vocab),
+        "min_count": min_count,
+        "tokens_desconhecidos": unknown_tokens,
+        "tokenizador": {"regex": TOKEN.pattern, "minusculas": True},
+        "dtype": "uint32",
+    }
+    with open(build_path / "metadata.json", "w", encoding="utf8") as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+    build_path.rename(output_path)
+    return {
+        **metadata,
+        "contagem_s": count_time,
+        "total_s": time.perf_counter() - start,
+    }
+
+
+class TokenCorpus:
+    """
+    Acesso aleatório ao corpus exportado; tokens.npy é lido via mmap.
+
+    Atributos:
+        directory: diretório gerado por export_tokens.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        with open(self.directory / "metadata.json", encoding="utf8") as f:
+            self.metadata = json.load(f)
+        self.tokens = np.load(self.directory / "tokens.npy", mmap_mode="r")
+        self.index = np.load(self.directory / "index.npy", mmap_mode="r")
+        self.fields = self.metadata["campos"]
+        self._urns = None
+        self._vocab = None
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def document(self, position: int, field: str = None) -> np.ndarray:
+        """
+        Tokens do documento (ou de um campo dele), sem cópia.
+        """
+        row = self.index[position]
+        if field is None:
+            return self.tokens[int(row[0]) : int(row[-1])]
+        column = self.fields.index(field)
+        return self.tokens[int(row[column]) : int(row[column + 1])]
+
+    @property
+    def urns(self) -> List[str]:
+        if self._urns is None:
+            with open(self.directory / "urns.txt", encoding="utf8") as f:
+                self._urns = f.read().split("\n")[:-1]
+        return self._urns
+
+    @property
+    def vocab(self) -> List[str]:
+        if self._vocab is None:
+            with open(self.directory / "vocab.txt", encoding="utf8") as f:
+                self._vocab = f.read().split("\n")
+        return self._vocab
+
+    def decode(self, ids: Sequence[int]) -> str:
+        vocab = self.vocab
+        return " ".join(vocab[token] for token in ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta o corpus tokenizado em .npy.")
+    parser.add_argument("--db", default="./db/tcu-acordaos.db")
+    parser.add_argument("--output", default="./db/tokens")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--min-count", type=int, default=2)
+    args = parser.parse_args()
+    stats = export_tokens(args.db, args.output, args.workers, args.batch_size, args.min_count)
+    print(
+        f"{stats['documentos']} documentos, {stats['tokens']} tokens, vocabulário de "
+        f"{stats['vocabulario']} em {stats['total_s']:.1f}s (contagem {stats['contagem_s']:.1f}s)"
+    )
+
+
+if __name__ == "__main__":
+    main()